@@ -19,6 +19,9 @@ migrate = Migrate()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.config['DOCUMENT_LIBRARY_ALLOWED_EXTENSIONS_SET'] = frozenset(
+        str(ext).lower().strip() for ext in (app.config.get('DOCUMENT_LIBRARY_ALLOWED_EXTENSIONS') or [])
+    )
 
     sentry_dsn = (os.environ.get('SENTRY_DSN') or '').strip()
     if sentry_dsn:
@@ -61,6 +64,8 @@ def create_app(config_class=Config):
             return "0"
 
     db.init_app(app)
+    from app import lazy_load_guard
+    lazy_load_guard.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
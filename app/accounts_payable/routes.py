@@ -8,6 +8,7 @@ from flask import render_template, redirect, url_for, flash, request, current_ap
 from flask_login import login_required
 
 from fpdf import FPDF
+from sqlalchemy.orm import selectinload
 
 from app import db
 from app.accounts_payable import bp
@@ -156,7 +157,7 @@ def _update_bill_status(bill: Bill) -> None:
 @bp.route('/bills')
 @login_required
 def bills():
-    bill_list = Bill.query.order_by(Bill.date.desc()).all()
+    bill_list = Bill.query.options(selectinload(Bill.vendor), selectinload(Bill.payments)).order_by(Bill.date.desc()).all()
     delete_form = DeleteForm()
     return render_template('ap/bills.html', title='Bills', bills=bill_list, delete_form=delete_form)
 
@@ -183,6 +184,7 @@ def pay_bills():
     if vendor:
         bill_list = (
             Bill.query
+            .options(selectinload(Bill.payments))
             .filter(Bill.vendor_id == vendor.id)
             .order_by(Bill.date.desc())
             .all()
@@ -306,8 +308,8 @@ def create_vendor():
 @login_required
 def view_vendor(id):
     vendor = Vendor.query.get_or_404(id)
-    bill_list = vendor.bills.order_by(Bill.date.desc()).all()
-    payment_list = vendor.payments.order_by(VendorPayment.date.desc()).all()
+    bill_list = vendor.bills.options(selectinload(Bill.payments)).order_by(Bill.date.desc()).all()
+    payment_list = vendor.payments.options(selectinload(VendorPayment.bill)).order_by(VendorPayment.date.desc()).all()
     return render_template(
         'ap/view_vendor.html',
         title=f'Vendor {vendor.name}',
@@ -338,7 +340,11 @@ def edit_vendor(id):
 @bp.route('/payments')
 @login_required
 def payments():
-    payment_list = VendorPayment.query.order_by(VendorPayment.date.desc()).all()
+    payment_list = (
+        VendorPayment.query.options(selectinload(VendorPayment.vendor), selectinload(VendorPayment.bill))
+        .order_by(VendorPayment.date.desc())
+        .all()
+    )
     return render_template('ap/payments.html', title='Payments', payments=payment_list)
 
 
@@ -523,8 +529,8 @@ def view_bill(id):
     if bill.status != 'paid' and bill.is_overdue and bill.balance > 0:
         bill.status = 'overdue'
         db.session.commit()
-    item_list = bill.items.order_by(BillItem.id.asc()).all()
-    payment_list = bill.payments.order_by(VendorPayment.date.desc()).all()
+    item_list = bill.items.options(selectinload(BillItem.product)).order_by(BillItem.id.asc()).all()
+    payment_list = VendorPayment.query.filter_by(bill_id=bill.id).order_by(VendorPayment.date.desc()).all()
     delete_form = DeleteForm()
     return render_template(
         'ap/view_bill.html',
@@ -658,7 +664,7 @@ def delete_bill(id):
         flash('Unable to delete bill.', 'danger')
         return redirect(url_for('ap.view_bill', id=bill.id))
 
-    if bill.payments.count() > 0:
+    if bill.payments:
         flash('Cannot delete a bill that has payments recorded.', 'warning')
         return redirect(url_for('ap.view_bill', id=bill.id))
 
@@ -7,6 +7,7 @@ from flask import render_template, redirect, url_for, flash, request, send_file,
 from flask_login import login_required
 from fpdf import FPDF
 from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
 
 from app import db
 from app.accounts_receivable import bp
@@ -15,10 +16,11 @@ from app.auth.email import send_email_with_attachments_sync
 from app.models import Customer, Invoice, Quote, Payment, InvoiceItem, QuoteItem, Product, AppSetting
 
 
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
 def _digits_only(value: str) -> str:
-    raw = (value or '').strip()
-    digits = ''.join([c for c in raw if c.isdigit()])
-    return digits
+    return _NON_DIGIT_RE.sub('', value or '')
 
 
 def _compute_due_date(invoice_date, terms: str):
@@ -788,7 +790,7 @@ def _next_invoice_number():
 @bp.route('/invoices')
 @login_required
 def invoices():
-    invoice_list = Invoice.query.order_by(Invoice.date.desc()).all()
+    invoice_list = Invoice.query.options(selectinload(Invoice.customer), selectinload(Invoice.payments)).order_by(Invoice.date.desc()).all()
     delete_form = DeleteForm()
     return render_template('ar/invoices.html', title='Invoices', invoices=invoice_list, delete_form=delete_form)
 
@@ -796,7 +798,7 @@ def invoices():
 @bp.route('/quotes')
 @login_required
 def quotes():
-    quote_list = Quote.query.order_by(Quote.date.desc()).all()
+    quote_list = Quote.query.options(selectinload(Quote.customer)).order_by(Quote.date.desc()).all()
     delete_form = DeleteForm()
     return render_template('ar/quotes.html', title='Quotes', quotes=quote_list, delete_form=delete_form)
 
@@ -812,8 +814,8 @@ def customers():
 @login_required
 def view_customer(id):
     customer = Customer.query.get_or_404(id)
-    invoice_list = customer.invoices.order_by(Invoice.date.desc()).all()
-    payment_list = customer.payments.order_by(Payment.date.desc()).all()
+    invoice_list = customer.invoices.options(selectinload(Invoice.payments)).order_by(Invoice.date.desc()).all()
+    payment_list = customer.payments.options(selectinload(Payment.invoice)).order_by(Payment.date.desc()).all()
     delete_form = DeleteForm()
     return render_template(
         'ar/view_customer.html',
@@ -897,7 +899,11 @@ def create_customer():
 @bp.route('/payments')
 @login_required
 def payments():
-    payment_list = Payment.query.order_by(Payment.date.desc()).all()
+    payment_list = (
+        Payment.query.options(selectinload(Payment.customer), selectinload(Payment.invoice))
+        .order_by(Payment.date.desc())
+        .all()
+    )
     return render_template('ar/payments.html', title='Payments', payments=payment_list)
 
 
@@ -1188,7 +1194,7 @@ def create_quote():
 @login_required
 def view_quote(id):
     quote = Quote.query.get_or_404(id)
-    item_list = quote.items.order_by(QuoteItem.id.asc()).all()
+    item_list = quote.items.options(selectinload(QuoteItem.product)).order_by(QuoteItem.id.asc()).all()
     delete_form = DeleteForm()
     return render_template(
         'ar/view_quote.html',
@@ -1527,7 +1533,7 @@ def delete_invoice(id):
         flash('Unable to delete invoice.', 'danger')
         return redirect(url_for('ar.view_invoice', id=invoice.id))
 
-    if invoice.payments.count() > 0:
+    if invoice.payments:
         flash('Cannot delete an invoice that has payments recorded.', 'warning')
         return redirect(url_for('ar.view_invoice', id=invoice.id))
 
@@ -1624,8 +1630,8 @@ def view_invoice(id):
     if invoice.status != 'paid' and invoice.is_overdue and invoice.balance > 0:
         invoice.status = 'overdue'
         db.session.commit()
-    item_list = invoice.items.order_by(InvoiceItem.id.asc()).all()
-    payment_list = invoice.payments.order_by(Payment.date.desc()).all()
+    item_list = invoice.items.options(selectinload(InvoiceItem.product)).order_by(InvoiceItem.id.asc()).all()
+    payment_list = Payment.query.filter_by(invoice_id=invoice.id).order_by(Payment.date.desc()).all()
 
     revenue_total = 0.0
     cost_total = 0.0
@@ -1659,7 +1665,7 @@ def view_invoice(id):
 @login_required
 def invoice_pdf(id):
     invoice = Invoice.query.get_or_404(id)
-    items = invoice.items.order_by(InvoiceItem.id.asc()).all()
+    items = invoice.items.options(selectinload(InvoiceItem.product)).order_by(InvoiceItem.id.asc()).all()
     pdf_data = _build_invoice_pdf(invoice, items)
     return send_file(
         BytesIO(pdf_data),
@@ -1673,7 +1679,7 @@ def invoice_pdf(id):
 @login_required
 def quote_pdf(id):
     quote = Quote.query.get_or_404(id)
-    items = quote.items.order_by(QuoteItem.id.asc()).all()
+    items = quote.items.options(selectinload(QuoteItem.product)).order_by(QuoteItem.id.asc()).all()
     pdf_data = _build_quote_pdf(quote, items)
     return send_file(
         BytesIO(pdf_data),
@@ -1687,7 +1693,7 @@ def quote_pdf(id):
 @login_required
 def email_invoice(id):
     invoice = Invoice.query.get_or_404(id)
-    items = invoice.items.order_by(InvoiceItem.id.asc()).all()
+    items = invoice.items.options(selectinload(InvoiceItem.product)).order_by(InvoiceItem.id.asc()).all()
     form = EmailInvoiceForm()
 
     if request.method == 'GET':
@@ -3,6 +3,9 @@ from app import mail
 from threading import Thread
 from flask_mail import Message
 import base64
+from contextlib import ExitStack, contextmanager
+import mmap
+import os
 import requests
 import socket
 import smtplib
@@ -21,6 +24,47 @@ def _mail_config_summary(app):
     }
 
 
+# Base64 turns every 3 input bytes into 4 characters, so encoding chunks whose size is
+# a multiple of 3 and joining the results matches encoding the whole file at once;
+# this is the largest such size under 64 KiB
+_ATTACHMENT_CHUNK_SIZE = (64 * 1024 // 3) * 3
+
+
+@contextmanager
+def _attachment_data(data):
+    # Path attachments are memory-mapped; the mapping is closed when the block exits
+    if isinstance(data, str):
+        yield data.encode('utf-8')
+        return
+    if not isinstance(data, os.PathLike):
+        yield data
+        return
+    with open(data, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def _attachment_b64(data):
+    if not isinstance(data, os.PathLike):
+        with _attachment_data(data) as raw:
+            return base64.b64encode(raw).decode('ascii')
+    parts = []
+    with open(data, 'rb') as f:
+        while True:
+            chunk = f.read(_ATTACHMENT_CHUNK_SIZE)
+            if not chunk:
+                break
+            parts.append(base64.b64encode(chunk).decode('ascii'))
+    return ''.join(parts)
+
+
 def _decode_smtp_bytes(value):
     if value is None:
         return None
@@ -73,6 +117,18 @@ def _format_mail_send_error(app, exc):
 
     return f"Email send failed. Config: {cfg}. Original error: {exc}"
 
+# Raised while opening the SMTP connection, before any message data is sent, so
+# sending again cannot deliver the same email twice
+_SMTP_CONNECT_ERRORS = (smtplib.SMTPConnectError, ConnectionRefusedError)
+
+
+def is_smtp_connect_error(exc):
+    while exc is not None:
+        if isinstance(exc, _SMTP_CONNECT_ERRORS):
+            return True
+        exc = exc.__cause__
+    return False
+
 def send_async_email(app, msg):
     with app.app_context():
         try:
@@ -176,26 +232,28 @@ def send_email_with_attachments_sync(subject, sender, recipients, text_body, htm
     if sendgrid_key and not sendgrid_from:
         current_app.logger.error('SENDGRID_API_KEY is set but SENDGRID_FROM is not set; skipping SendGrid')
 
-    msg = Message(subject, sender=sender, recipients=recipients)
-    msg.body = text_body
-    msg.html = html_body
-
-    for attachment in attachments or []:
-        filename, content_type, data = attachment
-        msg.attach(filename, content_type, data)
-
     if not (current_app.config.get('MAIL_SERVER') or '').strip():
         raise RuntimeError(
             'Email is not configured. Set RESEND_API_KEY+RESEND_FROM, or SENDGRID_API_KEY+SENDGRID_FROM, '
             'or MAIL_SERVER/MAIL_PORT (SMTP).'
         )
 
-    try:
-        socket.setdefaulttimeout(int(current_app.config.get('MAIL_TIMEOUT') or 10))
-        mail.send(msg)
-    except Exception as e:
-        current_app.logger.exception('Email send failed')
-        raise RuntimeError(_format_mail_send_error(current_app, e)) from e
+    msg = Message(subject, sender=sender, recipients=recipients)
+    msg.body = text_body
+    msg.html = html_body
+
+    # Memory-mapped attachments must stay open until mail.send() has encoded them
+    with ExitStack() as stack:
+        for attachment in attachments or []:
+            filename, content_type, data = attachment
+            msg.attach(filename, content_type, stack.enter_context(_attachment_data(data)))
+
+        try:
+            socket.setdefaulttimeout(int(current_app.config.get('MAIL_TIMEOUT') or 10))
+            mail.send(msg)
+        except Exception as e:
+            current_app.logger.exception('Email send failed')
+            raise RuntimeError(_format_mail_send_error(current_app, e)) from e
 
 
 def _send_via_sendgrid(api_key, subject, sender, recipients, text_body, html_body, attachments):
@@ -216,11 +274,9 @@ def _send_via_sendgrid(api_key, subject, sender, recipients, text_body, html_bod
     if attachments:
         sg_attachments = []
         for filename, content_type, data in attachments:
-            if isinstance(data, str):
-                data = data.encode('utf-8')
             sg_attachments.append(
                 {
-                    'content': base64.b64encode(data).decode('ascii'),
+                    'content': _attachment_b64(data),
                     'type': content_type,
                     'filename': filename,
                     'disposition': 'attachment',
@@ -264,12 +320,10 @@ def _send_via_resend(api_key, subject, sender, recipients, text_body, html_body,
     if attachments:
         rs_attachments = []
         for filename, content_type, data in attachments:
-            if isinstance(data, str):
-                data = data.encode('utf-8')
             rs_attachments.append(
                 {
                     'filename': filename,
-                    'content': base64.b64encode(data).decode('ascii'),
+                    'content': _attachment_b64(data),
                     'content_type': content_type,
                 }
             )
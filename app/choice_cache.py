@@ -0,0 +1,76 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Customer, Project, User, Vendor
+
+
+_CHOICES_TTL = 60
+_NO_PROJECT_CHOICE = ((0, '-- None --'),)
+_choices = {}
+_choices_lock = threading.Lock()
+
+
+def _cached_choices(key, load):
+    now = time.monotonic()
+    with _choices_lock:
+        cached = _choices.get(key)
+    if cached is None or cached[0] <= now:
+        cached = (now + _CHOICES_TTL, load())
+        with _choices_lock:
+            _choices[key] = cached
+    return cached[1]
+
+
+def _id_name_choices(id_col, name_col, **filters):
+    return tuple(tuple(row) for row in db.session.query(id_col, name_col).filter_by(**filters).order_by(name_col.asc()))
+
+
+def owner_choices():
+    return _cached_choices('owners', lambda: _id_name_choices(User.id, User.username))
+
+
+def project_choices():
+    return _cached_choices('projects', lambda: _NO_PROJECT_CHOICE + _id_name_choices(Project.id, Project.name, active=True))
+
+
+def customer_choices():
+    return _cached_choices('customers', lambda: _id_name_choices(Customer.id, Customer.name))
+
+
+def vendor_choices():
+    return _cached_choices('vendors', lambda: _id_name_choices(Vendor.id, Vendor.name))
+
+
+# The cache lives in this process only (production runs a single gunicorn
+# worker); other processes see changes once their TTL expires.
+_CHOICE_KEYS = {User: 'owners', Project: 'projects', Customer: 'customers', Vendor: 'vendors'}
+_STALE_KEYS = '_stale_choice_keys'
+
+
+def _collect_stale_keys(session, flush_context):
+    # Flushed rows are not visible to other sessions until commit, so only note them here
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        key = _CHOICE_KEYS.get(type(obj))
+        if key:
+            session.info.setdefault(_STALE_KEYS, set()).add(key)
+
+
+def _clear_stale_keys(session):
+    keys = session.info.pop(_STALE_KEYS, ())
+    if keys:
+        with _choices_lock:
+            for key in keys:
+                _choices.pop(key, None)
+
+
+def _discard_stale_keys(session):
+    session.info.pop(_STALE_KEYS, None)
+
+
+event.listen(Session, 'after_flush', _collect_stale_keys)
+event.listen(Session, 'after_commit', _clear_stale_keys)
+event.listen(Session, 'after_rollback', _discard_stale_keys)
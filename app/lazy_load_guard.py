@@ -0,0 +1,34 @@
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+def _check_lazy_load(orm_execute_state):
+    # load_options (and so lazy_loaded_from) raises for INSERT/UPDATE/DELETE; check is_select first
+    if not orm_execute_state.is_select or not orm_execute_state.is_relationship_load:
+        return
+    if not has_request_context() or not current_app.config.get('RAISE_ON_N_PLUS_ONE'):
+        return
+    # Only plain lazy loads carry lazy_loaded_from; selectin/joined eager loads do not
+    parent = orm_execute_state.lazy_loaded_from
+    if parent is None:
+        return
+    key = (parent.mapper, orm_execute_state.bind_mapper)
+    seen = g.setdefault('_lazy_loads_seen', set())
+    if key in seen:
+        raise NPlusOneError(
+            f'Repeated lazy load of {key[1].class_.__name__} from {key[0].class_.__name__} '
+            f'in one request; eager-load it with selectinload()'
+        )
+    seen.add(key)
+
+
+def init_app(app):
+    app.config.setdefault('RAISE_ON_N_PLUS_ONE', app.debug or app.testing)
+    # The listener is global to Session, so production apps never install it
+    if app.config['RAISE_ON_N_PLUS_ONE'] and not event.contains(Session, 'do_orm_execute', _check_lazy_load):
+        event.listen(Session, 'do_orm_execute', _check_lazy_load)
@@ -5,6 +5,7 @@ from app.main import bp
 from app.models import AppSetting, Invoice, Quote, Bill, Customer, Vendor, Payment, PurchaseOrder, VendorPayment
 from datetime import datetime, timedelta
 from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
 
 
 def _get_app_setting(key: str) -> str:
@@ -19,8 +20,7 @@ def _get_app_setting(key: str) -> str:
 
 
 def _is_marketing_landing_enabled() -> bool:
-    val = _get_app_setting('show_marketing_landing').lower()
-    return val in ('1', 'true', 't', 'yes', 'y', 'on')
+    return AppSetting.parse_bool(_get_app_setting('show_marketing_landing'))
 
 @bp.route('/')
 @bp.route('/index')
@@ -52,13 +52,13 @@ def dashboard():
     vendor_count = Vendor.query.count()
     
     # Get recent invoices and bills
-    recent_invoices = Invoice.query.order_by(Invoice.date.desc()).limit(5).all()
+    recent_invoices = Invoice.query.options(selectinload(Invoice.customer)).order_by(Invoice.date.desc()).limit(5).all()
     try:
-        recent_quotes = Quote.query.order_by(Quote.date.desc()).limit(5).all()
+        recent_quotes = Quote.query.options(selectinload(Quote.customer)).order_by(Quote.date.desc()).limit(5).all()
     except Exception:
         db.session.rollback()
         recent_quotes = []
-    recent_bills = Bill.query.order_by(Bill.date.desc()).limit(5).all()
+    recent_bills = Bill.query.options(selectinload(Bill.vendor)).order_by(Bill.date.desc()).limit(5).all()
     recent_purchase_orders = PurchaseOrder.query.order_by(PurchaseOrder.date.desc()).limit(5).all()
 
     try:
@@ -89,7 +89,8 @@ def dashboard():
 
     try:
         quotes_due_list = (
-            Quote.query.filter(Quote.status.in_(['draft', 'sent']))
+            Quote.query.options(selectinload(Quote.customer))
+            .filter(Quote.status.in_(['draft', 'sent']))
             .filter(Quote.due_date.isnot(None))
             .order_by(Quote.due_date.asc(), Quote.date.desc())
             .limit(6)
@@ -4,6 +4,8 @@ from time import time
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from flask import current_app
+from sqlalchemy import func, inspect, select
+from sqlalchemy.ext.hybrid import hybrid_property
 import jwt
 from app import db, login_manager
 
@@ -42,9 +44,29 @@ class AppSetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(80), unique=True, index=True)
     value = db.Column(db.Text)
-    updated_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def parse_bool(value):
+        return value == '1'
+
+    @staticmethod
+    def format_bool(enabled):
+        return '1' if enabled else '0'
+
+    @staticmethod
+    def table_exists():
+        # Memoized per app; only a positive answer is cached so a later migration is picked up
+        if current_app.extensions.get('_app_setting_table'):
+            return True
+        exists_now = inspect(db.engine).has_table('app_setting')
+        if exists_now:
+            current_app.extensions['_app_setting_table'] = True
+        return exists_now
 
 class Customer(db.Model):
+    __table_args__ = (db.Index('ix_customer_lower_name', db.text('lower(name)')),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), index=True)
     address = db.Column(db.String(200))
@@ -86,7 +108,7 @@ class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.String(20), unique=True, index=True)
     date = db.Column(db.Date, index=True, default=datetime.utcnow)
-    due_date = db.Column(db.Date)
+    due_date = db.Column(db.Date, index=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))
 
     customer_po = db.Column(db.String(50))
@@ -111,18 +133,28 @@ class Invoice(db.Model):
     notes = db.Column(db.Text)
     side_notes = db.Column(db.Text)
     items = db.relationship('InvoiceItem', backref='invoice', lazy='dynamic')
-    payments = db.relationship('Payment', backref='invoice', lazy='dynamic')
+    payments = db.relationship('Payment', backref='invoice')
 
     @property
     def paid_amount(self):
         return float(sum(((p.amount or Decimal('0')) for p in self.payments), Decimal('0')))
 
-    @property
+    @hybrid_property
     def balance(self):
         total = self.total or Decimal('0')
         paid = sum(((p.amount or Decimal('0')) for p in self.payments), Decimal('0'))
         return float(total - paid)
 
+    @balance.inplace.expression
+    @classmethod
+    def _balance_expression(cls):
+        paid = (
+            select(func.coalesce(func.sum(Payment.amount), 0))
+            .where(Payment.invoice_id == cls.id)
+            .scalar_subquery()
+        )
+        return func.coalesce(cls.total, 0) - paid
+
     @property
     def is_overdue(self):
         if not self.due_date:
@@ -177,6 +209,8 @@ class QuoteItem(db.Model):
 
 
 class PurchaseOrder(db.Model):
+    __table_args__ = (db.Index('ix_purchase_order_date_id', 'date', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.String(20), unique=True, index=True)
     po_type = db.Column(db.String(20), default='vendor')  # vendor, customer
@@ -189,10 +223,17 @@ class PurchaseOrder(db.Model):
     status = db.Column(db.String(20), default='draft')  # draft, sent, closed
     terms = db.Column(db.String(50))
     notes = db.Column(db.Text)
-    items = db.relationship('PurchaseOrderItem', backref='purchase_order', lazy='dynamic')
+    items = db.relationship(
+        'PurchaseOrderItem',
+        backref='purchase_order',
+        order_by='PurchaseOrderItem.id',
+        cascade='all, delete-orphan',
+    )
 
 
 class PurchaseOrderItem(db.Model):
+    __table_args__ = (db.Index('ix_purchase_order_item_po_id_id', 'purchase_order_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     purchase_order_id = db.Column(db.Integer, db.ForeignKey('purchase_order.id'))
     description = db.Column(db.String(200))
@@ -204,7 +245,7 @@ class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, index=True, default=datetime.utcnow)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'))
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), index=True)
     amount = db.Column(db.Numeric(10, 2))
     payment_method = db.Column(db.String(50))
     reference = db.Column(db.String(50))
@@ -223,7 +264,7 @@ class Bill(db.Model):
     terms = db.Column(db.String(50))
     notes = db.Column(db.Text)
     items = db.relationship('BillItem', backref='bill', lazy='dynamic')
-    payments = db.relationship('VendorPayment', backref='bill', lazy='dynamic')
+    payments = db.relationship('VendorPayment', backref='bill')
 
     @property
     def paid_amount(self):
@@ -276,6 +317,17 @@ class Meeting(db.Model):
 
 
 class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_user_ref', 'user_id', 'ref_type', 'ref_id', 'type', unique=True),
+        db.Index(
+            'ix_notification_user_unread',
+            'user_id',
+            postgresql_where=db.text('read_at IS NULL'),
+            sqlite_where=db.text('read_at IS NULL'),
+        ),
+        db.Index('ix_notification_user_created', 'user_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     user = db.relationship('User')
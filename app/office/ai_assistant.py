@@ -1,28 +1,48 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import os
 import re
+import threading
+import time
 import unicodedata
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
 
+import orjson
 import requests
 from dateutil import parser
-from flask import current_app, url_for, session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, g, url_for, session
 from fpdf import FPDF
-from sqlalchemy import inspect
+from sqlalchemy import func, inspect, literal_column, select, update
+from sqlalchemy.orm import selectinload
 
 from app import db
-from app.auth.email import send_email_with_attachments_sync
+from app.auth.email import is_smtp_connect_error, send_email_with_attachments_sync
 from app.models import AppSetting, Bill, BillItem, Customer, Invoice, InvoiceItem, LibraryDocument, Meeting, Notification, Payment, Project, PurchaseOrder, PurchaseOrderItem, Quote, QuoteItem, User, Vendor
 from app.office.library_storage import get_document_abs_path
+from app.office.notification_cache import invalidate_unread_count
 
 
 def _utc_now() -> datetime:
     return datetime.utcnow()
 
 
+def utc_today_bounds() -> Tuple[Any, Any]:
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        start = func.date_trunc('day', func.timezone('UTC', func.now()))
+        return start, start + literal_column("interval '1 day'")
+    if dialect == 'sqlite':
+        return func.datetime('now', 'start of day'), func.datetime('now', 'start of day', '+1 day')
+    now = _utc_now()
+    start = datetime(now.year, now.month, now.day)
+    return start, start + timedelta(days=1)
+
+
 def _is_es(lang: str) -> bool:
     return (lang or '').strip().lower().startswith('es')
 
@@ -184,6 +204,17 @@ def _format_action_readback(tool_name: str, args: Dict[str, Any], lang: str) ->
     )
 
 
+def _cached_get(model: Any, pk: Any) -> Any:
+    cache = g.setdefault('_ai_row_cache', {})
+    key = (model.__name__, pk)
+    row = cache.get(key)
+    if row is None:
+        row = db.session.get(model, pk)
+        if row is not None:
+            cache[key] = row
+    return row
+
+
 def _normalize_name(value: str) -> str:
     value = (value or '').strip().lower()
     if not value:
@@ -285,10 +316,18 @@ def _find_vendor_by_name(name: str) -> Optional[Vendor]:
     return None
 
 
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
 def _digits_only(value: str) -> str:
-    raw = (value or '').strip()
-    digits = ''.join([c for c in raw if c.isdigit()])
-    return digits
+    return _NON_DIGIT_RE.sub('', value or '')
+
+
+def _safe_float(value: Any, default: float = 0.0, lo: float = 0.0) -> float:
+    try:
+        return max(lo, float(value))
+    except (TypeError, ValueError, OverflowError):
+        return default
 
 
 def _next_invoice_number() -> str:
@@ -328,7 +367,9 @@ def _next_bill_number() -> str:
 
 
 def _next_po_number() -> str:
-    last = PurchaseOrder.query.order_by(PurchaseOrder.id.desc()).first()
+    last = db.session.execute(
+        select(PurchaseOrder.id, PurchaseOrder.number).order_by(PurchaseOrder.id.desc()).limit(1)
+    ).first()
     if not last or not last.number:
         return '0001'
     try:
@@ -344,7 +385,7 @@ def _find_purchase_order_by_number_or_id(number_or_id: str) -> Optional[Purchase
     if not raw:
         return None
     if raw.isdigit():
-        return PurchaseOrder.query.get(int(raw))
+        return _cached_get(PurchaseOrder, int(raw))
     return PurchaseOrder.query.filter_by(number=raw).first()
 
 
@@ -376,42 +417,47 @@ def _extract_customer_name_for_balance(text: str, lang: str) -> Optional[str]:
 
 
 def _tool_meetings_today(lang: str) -> Dict[str, Any]:
-    now = _utc_now()
-    start = datetime(now.year, now.month, now.day)
-    end = start + timedelta(days=1)
+    es = _is_es(lang)
+    start, end = utc_today_bounds()
 
     meetings = (
-        Meeting.query.filter(Meeting.start_at >= start, Meeting.start_at < end)
+        db.session.query(Meeting.title, Meeting.start_at)
+        .filter(Meeting.start_at >= start, Meeting.start_at < end)
         .order_by(Meeting.start_at.asc())
+        .limit(5)
         .all()
     )
 
     if not meetings:
         return {
-            'speak': 'No tienes reuniones hoy.' if _is_es(lang) else 'You have no meetings today.',
+            'speak': 'No tienes reuniones hoy.' if es else 'You have no meetings today.',
             'redirect_url': url_for('office.meetings'),
         }
 
     parts = []
-    for m in meetings[:5]:
-        parts.append(f"{m.title} at {m.start_at.strftime('%H:%M')}")
+    for title, start_at in meetings:
+        parts.append(f"{title} at {start_at.strftime('%H:%M')}")
 
-    speak = ('Hoy tienes: ' if _is_es(lang) else 'Today you have: ') + '; '.join(parts)
+    speak = ('Hoy tienes: ' if es else 'Today you have: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('office.meetings')}
 
 
 def _tool_overdue_invoices(lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     today = _utc_now().date()
-    invoices = Invoice.query.filter(Invoice.due_date.isnot(None)).all()
-    overdue = [inv for inv in invoices if inv.due_date and inv.due_date < today and inv.balance > 0.01]
+    n = (
+        db.session.query(func.count(Invoice.id))
+        .filter(Invoice.due_date.isnot(None), Invoice.due_date < today, Invoice.balance > 0.01)
+        .scalar()
+    )
 
-    if not overdue:
+    if n == 0:
         return {
-            'speak': 'No tienes facturas vencidas.' if _is_es(lang) else 'You have no overdue invoices.',
+            'speak': 'No tienes facturas vencidas.' if es else 'You have no overdue invoices.',
             'redirect_url': url_for('ar.invoices'),
         }
 
-    speak = f"Tienes {len(overdue)} facturas vencidas." if _is_es(lang) else f"You have {len(overdue)} overdue invoices."
+    speak = f"Tienes {n} facturas vencidas." if es else f"You have {n} overdue invoices."
     return {'speak': speak, 'redirect_url': url_for('ar.invoices')}
 
 
@@ -420,14 +466,12 @@ def _tool_payments_to_collect_this_week(lang: str) -> Dict[str, Any]:
     start = today
     end = today + timedelta(days=7)
 
-    invoices = (
-        Invoice.query.filter(Invoice.due_date.isnot(None))
-        .filter(Invoice.due_date >= start)
-        .filter(Invoice.due_date <= end)
-        .all()
+    count, total_balance = (
+        db.session.query(func.count(Invoice.id), func.coalesce(func.sum(Invoice.balance), 0))
+        .filter(Invoice.due_date >= start, Invoice.due_date <= end, Invoice.balance > 0.01)
+        .one()
     )
-    total_balance = sum((inv.balance or 0.0) for inv in invoices if (inv.balance or 0.0) > 0.01)
-    count = sum(1 for inv in invoices if (inv.balance or 0.0) > 0.01)
+    total_balance = float(total_balance or 0)
 
     if _is_es(lang):
         speak = f"Esta semana debes cobrar aproximadamente ${total_balance:,.2f} en {count} facturas."
@@ -438,30 +482,31 @@ def _tool_payments_to_collect_this_week(lang: str) -> Dict[str, Any]:
 
 
 def _tool_open_section(section: str, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     section = (section or '').strip().lower()
 
     if section in ('agenda', 'meetings', 'calendario'):
         return {
-            'speak': 'Abriendo agenda.' if _is_es(lang) else 'Opening agenda.',
+            'speak': 'Abriendo agenda.' if es else 'Opening agenda.',
             'redirect_url': url_for('office.meetings'),
         }
     if section in ('invoices', 'facturas'):
         return {
-            'speak': 'Abriendo facturas.' if _is_es(lang) else 'Opening invoices.',
+            'speak': 'Abriendo facturas.' if es else 'Opening invoices.',
             'redirect_url': url_for('ar.invoices'),
         }
     if section in ('notifications', 'notificaciones'):
         return {
-            'speak': 'Abriendo notificaciones.' if _is_es(lang) else 'Opening notifications.',
+            'speak': 'Abriendo notificaciones.' if es else 'Opening notifications.',
             'redirect_url': url_for('office.notifications'),
         }
     if section in ('dashboard', 'inicio', 'panel', 'tablero'):
         return {
-            'speak': 'Abriendo tablero.' if _is_es(lang) else 'Opening dashboard.',
+            'speak': 'Abriendo tablero.' if es else 'Opening dashboard.',
             'redirect_url': url_for('main.dashboard'),
         }
 
-    return {'speak': 'No entendí qué abrir.' if _is_es(lang) else "I didn't understand what to open."}
+    return {'speak': 'No entendí qué abrir.' if es else "I didn't understand what to open."}
 
 
 def _parse_dt(value: str) -> Optional[datetime]:
@@ -477,13 +522,14 @@ def _parse_dt(value: str) -> Optional[datetime]:
 
 
 def _tool_create_meeting(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     title = (args.get('title') or '').strip()
     if not title:
-        return {'speak': 'Falta el título.' if _is_es(lang) else 'Missing title.'}
+        return {'speak': 'Falta el título.' if es else 'Missing title.'}
 
     start_at = _parse_dt((args.get('start_at') or '').strip())
     if not start_at:
-        return {'speak': 'Falta la fecha/hora de inicio.' if _is_es(lang) else 'Missing start date/time.'}
+        return {'speak': 'Falta la fecha/hora de inicio.' if es else 'Missing start date/time.'}
 
     end_at = _parse_dt((args.get('end_at') or '').strip())
 
@@ -509,12 +555,13 @@ def _tool_create_meeting(args: Dict[str, Any], user: User, lang: str) -> Dict[st
     db.session.commit()
 
     return {
-        'speak': 'Reunión creada.' if _is_es(lang) else 'Meeting created.',
+        'speak': 'Reunión creada.' if es else 'Meeting created.',
         'redirect_url': url_for('office.meetings'),
     }
 
 
 def _tool_list_customers(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     limit = args.get('limit')
     try:
         limit_int = int(limit) if limit is not None else 10
@@ -524,22 +571,23 @@ def _tool_list_customers(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
     customers = Customer.query.order_by(Customer.name.asc()).limit(limit_int).all()
     if not customers:
-        return {'speak': 'No hay clientes.' if _is_es(lang) else 'There are no customers.'}
+        return {'speak': 'No hay clientes.' if es else 'There are no customers.'}
 
     parts = [c.name for c in customers if c.name]
-    speak = ('Clientes: ' if _is_es(lang) else 'Customers: ') + ', '.join(parts)
+    speak = ('Clientes: ' if es else 'Customers: ') + ', '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('ar.customers')}
 
 
 def _tool_create_customer(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     name = (args.get('name') or '').strip()
     if not name:
-        return {'speak': 'Falta el nombre del cliente.' if _is_es(lang) else 'Missing customer name.'}
+        return {'speak': 'Falta el nombre del cliente.' if es else 'Missing customer name.'}
 
     existing = _find_customer_by_name(name)
     if existing:
         return {
-            'speak': (f'El cliente {existing.name} ya existe.' if _is_es(lang) else f'Customer {existing.name} already exists.'),
+            'speak': (f'El cliente {existing.name} ya existe.' if es else f'Customer {existing.name} already exists.'),
             'redirect_url': url_for('ar.customers'),
         }
 
@@ -570,7 +618,7 @@ def _tool_create_customer(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     db.session.commit()
 
     return {
-        'speak': ('Cliente creado.' if _is_es(lang) else 'Customer created.'),
+        'speak': ('Cliente creado.' if es else 'Customer created.'),
         'redirect_url': url_for('ar.customers'),
     }
 
@@ -580,29 +628,26 @@ def _format_questions(questions: list[str]) -> str:
 
 
 def _tool_create_invoice(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     customer_name = (args.get('customer_name') or '').strip()
-    amount = args.get('amount')
-    try:
-        amount_val = float(amount)
-    except Exception:
-        amount_val = 0.0
+    amount_val = _safe_float(args.get('amount'))
 
     missing_questions = []
     if not customer_name:
-        missing_questions.append('¿Cuál es el nombre del cliente?' if _is_es(lang) else 'What is the customer name?')
+        missing_questions.append('¿Cuál es el nombre del cliente?' if es else 'What is the customer name?')
     if amount_val <= 0:
-        missing_questions.append('¿Cuál es el monto?' if _is_es(lang) else 'What is the amount?')
+        missing_questions.append('¿Cuál es el monto?' if es else 'What is the amount?')
     if missing_questions:
         return {'speak': _format_questions(missing_questions)}
 
     customer = _find_customer_by_name(customer_name)
     if not customer:
         return {
-            'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.",
+            'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.",
             'redirect_url': url_for('ar.customers'),
         }
 
-    description = (args.get('description') or '').strip() or ('Servicio' if _is_es(lang) else 'Service')
+    description = (args.get('description') or '').strip() or ('Servicio' if es else 'Service')
 
     inv_date_raw = (args.get('date') or '').strip()
     inv_date = None
@@ -622,12 +667,7 @@ def _tool_create_invoice(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         except Exception:
             due_date = None
 
-    tax = args.get('tax')
-    try:
-        tax_val = float(tax) if tax is not None else 0.0
-    except Exception:
-        tax_val = 0.0
-    tax_val = max(0.0, tax_val)
+    tax_val = _safe_float(args.get('tax'))
 
     subtotal = float(amount_val)
     total = float(subtotal + tax_val)
@@ -658,7 +698,7 @@ def _tool_create_invoice(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     db.session.add(item)
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Factura creada para {customer.name} por ${total:,.2f}."
     else:
         speak = f"Invoice created for {customer.name} for ${total:,.2f}."
@@ -865,11 +905,11 @@ def _build_purchase_order_pdf(po: PurchaseOrder, items: list[PurchaseOrderItem])
     pdf.cell(0, 6, f"PO #: {po.number}", ln=True)
     pdf.cell(0, 6, f"PO Date: {po.date.strftime('%Y-%m-%d') if po.date else ''}", ln=True)
     if po.po_type == 'vendor' and po.vendor_id:
-        vendor = Vendor.query.get(po.vendor_id)
+        vendor = _cached_get(Vendor, po.vendor_id)
         if vendor:
             pdf.cell(0, 6, f"Vendor: {vendor.name}", ln=True)
     if po.po_type == 'customer' and po.customer_id:
-        customer = Customer.query.get(po.customer_id)
+        customer = _cached_get(Customer, po.customer_id)
         if customer:
             pdf.cell(0, 6, f"Customer: {customer.name}", ln=True)
     pdf.ln(4)
@@ -1051,36 +1091,33 @@ def _find_quote_by_number_or_id(number_or_id: str) -> Optional[Quote]:
         return None
     quote = None
     if number_or_id.isdigit():
-        quote = Quote.query.get(int(number_or_id))
+        quote = _cached_get(Quote, int(number_or_id))
     if quote is None:
         quote = Quote.query.filter_by(number=number_or_id).first()
     return quote
 
 
 def _tool_create_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     customer_name = (args.get('customer_name') or '').strip()
-    amount = args.get('amount')
-    try:
-        amount_val = float(amount)
-    except Exception:
-        amount_val = 0.0
+    amount_val = _safe_float(args.get('amount'))
 
     missing_questions = []
     if not customer_name:
-        missing_questions.append('¿Cuál es el nombre del cliente?' if _is_es(lang) else 'What is the customer name?')
+        missing_questions.append('¿Cuál es el nombre del cliente?' if es else 'What is the customer name?')
     if amount_val <= 0:
-        missing_questions.append('¿Cuál es el monto?' if _is_es(lang) else 'What is the amount?')
+        missing_questions.append('¿Cuál es el monto?' if es else 'What is the amount?')
     if missing_questions:
         return {'speak': _format_questions(missing_questions)}
 
     customer = _find_customer_by_name(customer_name)
     if not customer:
         return {
-            'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.",
+            'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.",
             'redirect_url': url_for('ar.customers'),
         }
 
-    description = (args.get('description') or '').strip() or ('Servicio' if _is_es(lang) else 'Service')
+    description = (args.get('description') or '').strip() or ('Servicio' if es else 'Service')
 
     quote_date_raw = (args.get('date') or '').strip()
     quote_date = None
@@ -1100,12 +1137,7 @@ def _tool_create_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         except Exception:
             valid_until = None
 
-    tax = args.get('tax')
-    try:
-        tax_val = float(tax) if tax is not None else 0.0
-    except Exception:
-        tax_val = 0.0
-    tax_val = max(0.0, tax_val)
+    tax_val = _safe_float(args.get('tax'))
 
     subtotal = float(amount_val)
     total = float(subtotal + tax_val)
@@ -1136,7 +1168,7 @@ def _tool_create_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     db.session.add(item)
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Cotización creada para {customer.name} por ${total:,.2f}."
     else:
         speak = f"Quote created for {customer.name} for ${total:,.2f}."
@@ -1145,30 +1177,27 @@ def _tool_create_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
 
 def _tool_create_bill(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     vendor_name = (args.get('vendor_name') or '').strip()
 
-    amount = args.get('amount')
-    try:
-        amount_val = float(amount)
-    except Exception:
-        amount_val = 0.0
+    amount_val = _safe_float(args.get('amount'))
 
     missing_questions = []
     if not vendor_name:
-        missing_questions.append('¿Cuál es el nombre del proveedor?' if _is_es(lang) else 'What is the vendor name?')
+        missing_questions.append('¿Cuál es el nombre del proveedor?' if es else 'What is the vendor name?')
     if amount_val <= 0:
-        missing_questions.append('¿Cuál es el monto?' if _is_es(lang) else 'What is the amount?')
+        missing_questions.append('¿Cuál es el monto?' if es else 'What is the amount?')
     if missing_questions:
         return {'speak': _format_questions(missing_questions)}
 
     vendor = _find_vendor_by_name(vendor_name)
     if not vendor:
         return {
-            'speak': 'No encontré ese proveedor.' if _is_es(lang) else "I couldn't find that vendor.",
+            'speak': 'No encontré ese proveedor.' if es else "I couldn't find that vendor.",
             'redirect_url': url_for('ap.vendors'),
         }
 
-    description = (args.get('description') or '').strip() or ('Servicio' if _is_es(lang) else 'Service')
+    description = (args.get('description') or '').strip() or ('Servicio' if es else 'Service')
 
     bill_date_raw = (args.get('date') or '').strip()
     bill_date = None
@@ -1188,12 +1217,7 @@ def _tool_create_bill(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         except Exception:
             due_date = None
 
-    tax = args.get('tax')
-    try:
-        tax_val = float(tax) if tax is not None else 0.0
-    except Exception:
-        tax_val = 0.0
-    tax_val = max(0.0, tax_val)
+    tax_val = _safe_float(args.get('tax'))
 
     subtotal = float(amount_val)
     total = float(subtotal + tax_val)
@@ -1225,7 +1249,7 @@ def _tool_create_bill(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     )
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Cuenta creada para {vendor.name} por ${total:,.2f}."
     else:
         speak = f"Bill created for {vendor.name} for ${total:,.2f}."
@@ -1234,6 +1258,7 @@ def _tool_create_bill(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
 
 def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     po_type = (args.get('po_type') or '').strip().lower()
     if po_type not in ('vendor', 'customer'):
         po_type = ''
@@ -1241,21 +1266,17 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
     vendor_name = (args.get('vendor_name') or '').strip()
     customer_name = (args.get('customer_name') or '').strip()
 
-    amount = args.get('amount')
-    try:
-        amount_val = float(amount)
-    except Exception:
-        amount_val = 0.0
+    amount_val = _safe_float(args.get('amount'))
 
     missing_questions = []
     if not po_type:
-        missing_questions.append('¿Es para proveedor o cliente? (vendor/customer)' if _is_es(lang) else 'Is this for a vendor or a customer? (vendor/customer)')
+        missing_questions.append('¿Es para proveedor o cliente? (vendor/customer)' if es else 'Is this for a vendor or a customer? (vendor/customer)')
     if po_type == 'vendor' and not vendor_name:
-        missing_questions.append('¿Cuál es el nombre del proveedor?' if _is_es(lang) else 'What is the vendor name?')
+        missing_questions.append('¿Cuál es el nombre del proveedor?' if es else 'What is the vendor name?')
     if po_type == 'customer' and not customer_name:
-        missing_questions.append('¿Cuál es el nombre del cliente?' if _is_es(lang) else 'What is the customer name?')
+        missing_questions.append('¿Cuál es el nombre del cliente?' if es else 'What is the customer name?')
     if amount_val <= 0:
-        missing_questions.append('¿Cuál es el monto?' if _is_es(lang) else 'What is the amount?')
+        missing_questions.append('¿Cuál es el monto?' if es else 'What is the amount?')
     if missing_questions:
         return {'speak': _format_questions(missing_questions)}
 
@@ -1265,7 +1286,7 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
         vendor = _find_vendor_by_name(vendor_name)
         if not vendor:
             return {
-                'speak': 'No encontré ese proveedor.' if _is_es(lang) else "I couldn't find that vendor.",
+                'speak': 'No encontré ese proveedor.' if es else "I couldn't find that vendor.",
                 'redirect_url': url_for('ap.vendors'),
             }
         vendor_id = vendor.id
@@ -1273,12 +1294,12 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
         customer = _find_customer_by_name(customer_name)
         if not customer:
             return {
-                'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.",
+                'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.",
                 'redirect_url': url_for('ar.customers'),
             }
         customer_id = customer.id
 
-    description = (args.get('description') or '').strip() or ('Servicio' if _is_es(lang) else 'Service')
+    description = (args.get('description') or '').strip() or ('Servicio' if es else 'Service')
 
     po_date_raw = (args.get('date') or '').strip()
     po_date = None
@@ -1290,12 +1311,7 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
     if po_date is None:
         po_date = date.today()
 
-    tax = args.get('tax')
-    try:
-        tax_val = float(tax) if tax is not None else 0.0
-    except Exception:
-        tax_val = 0.0
-    tax_val = max(0.0, tax_val)
+    tax_val = _safe_float(args.get('tax'))
 
     subtotal = float(amount_val)
     total = float(subtotal + tax_val)
@@ -1327,7 +1343,7 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
     )
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Orden de compra creada {po.number} por ${total:,.2f}."
     else:
         speak = f"Purchase order created {po.number} for ${total:,.2f}."
@@ -1336,17 +1352,18 @@ def _tool_create_purchase_order(args: Dict[str, Any], lang: str) -> Dict[str, An
 
 
 def _tool_edit_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     if not number_or_id:
-        return {'speak': 'Falta el número de cotización.' if _is_es(lang) else 'Missing quote number.'}
+        return {'speak': 'Falta el número de cotización.' if es else 'Missing quote number.'}
 
     quote = _find_quote_by_number_or_id(number_or_id)
     if not quote:
-        return {'speak': 'No encontré esa cotización.' if _is_es(lang) else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
+        return {'speak': 'No encontré esa cotización.' if es else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
 
     if quote.invoice_id:
         return {
-            'speak': 'Esa cotización ya fue facturada y no se puede editar.' if _is_es(lang) else 'That quote has already been invoiced and cannot be edited.',
+            'speak': 'Esa cotización ya fue facturada y no se puede editar.' if es else 'That quote has already been invoiced and cannot be edited.',
             'redirect_url': url_for('ar.view_quote', id=quote.id),
         }
 
@@ -1354,7 +1371,7 @@ def _tool_edit_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     if customer_name:
         customer = _find_customer_by_name(customer_name)
         if not customer:
-            return {'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
+            return {'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
         quote.customer_id = customer.id
 
     quote_date_raw = (args.get('date') or '').strip()
@@ -1388,17 +1405,8 @@ def _tool_edit_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
     should_reprice = amount is not None or tax is not None or args.get('description') is not None
     if should_reprice:
-        try:
-            amount_val = float(amount) if amount is not None else float(quote.subtotal or 0)
-        except Exception:
-            amount_val = float(quote.subtotal or 0)
-        try:
-            tax_val = float(tax) if tax is not None else float(quote.tax or 0)
-        except Exception:
-            tax_val = float(quote.tax or 0)
-
-        amount_val = max(0.0, amount_val)
-        tax_val = max(0.0, tax_val)
+        amount_val = _safe_float(amount, default=float(quote.subtotal or 0))
+        tax_val = _safe_float(tax, default=float(quote.tax or 0))
         quote.subtotal = amount_val
         quote.tax = tax_val
         quote.total = float(amount_val + tax_val)
@@ -1416,7 +1424,7 @@ def _tool_edit_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
                 db.session.delete(extra)
         else:
             if not description:
-                description = 'Servicio' if _is_es(lang) else 'Service'
+                description = 'Servicio' if es else 'Service'
             db.session.add(
                 QuoteItem(
                     quote=quote,
@@ -1431,30 +1439,31 @@ def _tool_edit_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     db.session.commit()
 
     return {
-        'speak': 'Cotización actualizada.' if _is_es(lang) else 'Quote updated.',
+        'speak': 'Cotización actualizada.' if es else 'Quote updated.',
         'redirect_url': url_for('ar.view_quote', id=quote.id),
     }
 
 
 def _tool_delete_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     confirm = bool(args.get('confirm'))
 
     if not number_or_id:
-        return {'speak': 'Falta el número de cotización.' if _is_es(lang) else 'Missing quote number.'}
+        return {'speak': 'Falta el número de cotización.' if es else 'Missing quote number.'}
 
     quote = _find_quote_by_number_or_id(number_or_id)
     if not quote:
-        return {'speak': 'No encontré esa cotización.' if _is_es(lang) else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
+        return {'speak': 'No encontré esa cotización.' if es else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
 
     if quote.invoice_id:
         return {
-            'speak': 'No se puede borrar una cotización ya facturada.' if _is_es(lang) else 'Cannot delete a quote that has been invoiced.',
+            'speak': 'No se puede borrar una cotización ya facturada.' if es else 'Cannot delete a quote that has been invoiced.',
             'redirect_url': url_for('ar.view_quote', id=quote.id),
         }
 
     if not confirm:
-        if _is_es(lang):
+        if es:
             speak = f"Confirmar: ¿Quieres borrar la cotización {quote.number}? Repite y di confirm=true."
         else:
             speak = f"Confirmation needed: delete quote {quote.number}? Repeat with confirm=true."
@@ -1465,32 +1474,33 @@ def _tool_delete_quote(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         db.session.delete(q_item)
     db.session.delete(quote)
     db.session.commit()
-    return {'speak': 'Cotización borrada.' if _is_es(lang) else 'Quote deleted.', 'redirect_url': url_for('ar.quotes')}
+    return {'speak': 'Cotización borrada.' if es else 'Quote deleted.', 'redirect_url': url_for('ar.quotes')}
 
 
 def _tool_convert_quote_to_invoice(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     confirm = bool(args.get('confirm'))
 
     if not number_or_id:
-        return {'speak': 'Falta el número de cotización.' if _is_es(lang) else 'Missing quote number.'}
+        return {'speak': 'Falta el número de cotización.' if es else 'Missing quote number.'}
 
     quote = _find_quote_by_number_or_id(number_or_id)
     if not quote:
-        return {'speak': 'No encontré esa cotización.' if _is_es(lang) else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
+        return {'speak': 'No encontré esa cotización.' if es else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
 
     if quote.invoice_id:
         return {
-            'speak': 'Esa cotización ya fue convertida.' if _is_es(lang) else 'That quote has already been converted.',
+            'speak': 'Esa cotización ya fue convertida.' if es else 'That quote has already been converted.',
             'redirect_url': url_for('ar.view_invoice', id=quote.invoice_id),
         }
 
     item_list = quote.items.order_by(QuoteItem.id.asc()).all()
     if not item_list:
-        return {'speak': 'No se puede convertir una cotización sin artículos.' if _is_es(lang) else 'Cannot convert a quote with no items.', 'redirect_url': url_for('ar.view_quote', id=quote.id)}
+        return {'speak': 'No se puede convertir una cotización sin artículos.' if es else 'Cannot convert a quote with no items.', 'redirect_url': url_for('ar.view_quote', id=quote.id)}
 
     if not confirm:
-        if _is_es(lang):
+        if es:
             speak = f"Confirmar: ¿Quieres convertir la cotización {quote.number} a factura? Repite y di confirm=true."
         else:
             speak = f"Confirmation needed: convert quote {quote.number} to an invoice? Repeat with confirm=true."
@@ -1530,7 +1540,7 @@ def _tool_convert_quote_to_invoice(args: Dict[str, Any], lang: str) -> Dict[str,
     quote.status = 'invoiced'
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Cotización {quote.number} convertida a factura {invoice.number}."
     else:
         speak = f"Quote {quote.number} converted to invoice {invoice.number}."
@@ -1538,6 +1548,7 @@ def _tool_convert_quote_to_invoice(args: Dict[str, Any], lang: str) -> Dict[str,
 
 
 def _tool_email_quote(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     to_email = (args.get('to_email') or '').strip()
     to_name = (args.get('to_name') or '').strip()
@@ -1546,18 +1557,18 @@ def _tool_email_quote(args: Dict[str, Any], user: User, lang: str) -> Dict[str,
     save_contact = bool(args.get('save_contact'))
 
     if not number_or_id:
-        return {'speak': 'Falta el número de cotización.' if _is_es(lang) else 'Missing quote number.'}
+        return {'speak': 'Falta el número de cotización.' if es else 'Missing quote number.'}
 
     quote = _find_quote_by_number_or_id(number_or_id)
     if not quote:
-        return {'speak': 'No encontré esa cotización.' if _is_es(lang) else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
+        return {'speak': 'No encontré esa cotización.' if es else "I couldn't find that quote.", 'redirect_url': url_for('ar.quotes')}
 
     if not to_email and quote.customer and quote.customer.email:
         to_email = (quote.customer.email or '').strip()
 
     if not to_email:
         contact_name = (quote.customer.name if quote.customer else '').strip() or (quote.number or number_or_id)
-        if _is_es(lang):
+        if es:
             speak = (
                 f"Necesito el correo para enviar la cotización {quote.number}.\n"
                 f"1. ¿Cuál es el correo de {contact_name}?\n"
@@ -1572,23 +1583,19 @@ def _tool_email_quote(args: Dict[str, Any], user: User, lang: str) -> Dict[str,
         return {'speak': speak, 'redirect_url': url_for('ar.view_quote', id=quote.id)}
 
     if not confirm:
-        if _is_es(lang):
+        if es:
             speak = f"Confirmar: ¿Quieres enviar la cotización {quote.number} a {to_email}?"
         else:
             speak = f"Confirmation needed: email quote {quote.number} to {to_email}?"
         return {'speak': speak, 'redirect_url': url_for('ar.view_quote', id=quote.id), 'needs_confirm': True}
 
-    items = quote.items.order_by(QuoteItem.id.asc()).all()
+    items = quote.items.options(selectinload(QuoteItem.product)).order_by(QuoteItem.id.asc()).all()
     pdf_bytes = _build_quote_pdf(quote, items)
 
     subject = f"Quote {quote.number or quote.id}"
-    text_body = message or ('Adjunto la cotización.' if _is_es(lang) else 'Attached is the quote.')
+    text_body = message or ('Adjunto la cotización.' if es else 'Attached is the quote.')
     html_body = f"<p>{text_body}</p>"
-    sender = (
-        (current_app.config.get('MAIL_DEFAULT_SENDER') or '').strip()
-        or (user.email or '').strip()
-        or 'noreply@example.com'
-    )
+    sender = _resolve_sender(user)
 
     send_email_with_attachments_sync(
         subject=subject,
@@ -1602,16 +1609,17 @@ def _tool_email_quote(args: Dict[str, Any], user: User, lang: str) -> Dict[str,
     if save_contact and quote.customer and to_email:
         current = (quote.customer.email or '').strip()
         if current != to_email:
-            quote.customer.email = to_email
+            db.session.execute(update(Customer).where(Customer.id == quote.customer_id).values(email=to_email))
             db.session.commit()
 
     return {
-        'speak': 'Correo enviado.' if _is_es(lang) else 'Email sent.',
+        'speak': 'Correo enviado.' if es else 'Email sent.',
         'redirect_url': url_for('ar.view_quote', id=quote.id),
     }
 
 
 def _tool_email_invoice(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     to_email = (args.get('to_email') or '').strip()
     to_name = (args.get('to_name') or '').strip()
@@ -1620,16 +1628,16 @@ def _tool_email_invoice(args: Dict[str, Any], user: User, lang: str) -> Dict[str
     save_contact = bool(args.get('save_contact'))
 
     if not number_or_id:
-        return {'speak': 'Falta el número de factura.' if _is_es(lang) else 'Missing invoice number.'}
+        return {'speak': 'Falta el número de factura.' if es else 'Missing invoice number.'}
 
     invoice = None
     if number_or_id.isdigit():
-        invoice = Invoice.query.get(int(number_or_id))
+        invoice = _cached_get(Invoice, int(number_or_id))
     if invoice is None:
         invoice = Invoice.query.filter_by(number=number_or_id).first()
 
     if invoice is None:
-        return {'speak': 'No encontré esa factura.' if _is_es(lang) else "I couldn't find that invoice.", 'redirect_url': url_for('ar.invoices')}
+        return {'speak': 'No encontré esa factura.' if es else "I couldn't find that invoice.", 'redirect_url': url_for('ar.invoices')}
 
     if not to_email and to_name:
         customer = _find_customer_by_name(to_name)
@@ -1641,7 +1649,7 @@ def _tool_email_invoice(args: Dict[str, Any], user: User, lang: str) -> Dict[str
 
     if not to_email:
         contact_name = (invoice.customer.name if invoice.customer else '').strip() or (invoice.number or number_or_id)
-        if _is_es(lang):
+        if es:
             speak = (
                 f"Necesito el correo para enviar la factura {invoice.number}.\n"
                 f"1. ¿Cuál es el correo de {contact_name}?\n"
@@ -1656,23 +1664,19 @@ def _tool_email_invoice(args: Dict[str, Any], user: User, lang: str) -> Dict[str
         return {'speak': speak, 'redirect_url': url_for('ar.view_invoice', id=invoice.id)}
 
     if not confirm:
-        if _is_es(lang):
+        if es:
             speak = f"Confirmar: ¿Quieres enviar la factura {invoice.number} a {to_email}?"
         else:
             speak = f"Confirmation needed: email invoice {invoice.number} to {to_email}?"
         return {'speak': speak, 'redirect_url': url_for('ar.view_invoice', id=invoice.id), 'needs_confirm': True}
 
-    items = InvoiceItem.query.filter_by(invoice_id=invoice.id).order_by(InvoiceItem.id.asc()).all()
+    items = InvoiceItem.query.options(selectinload(InvoiceItem.product)).filter_by(invoice_id=invoice.id).order_by(InvoiceItem.id.asc()).all()
     pdf_bytes = _build_invoice_pdf(invoice, items)
 
     subject = f"Invoice {invoice.number or invoice.id}"
-    text_body = message or ('Adjunto la factura.' if _is_es(lang) else 'Attached is the invoice.')
+    text_body = message or ('Adjunto la factura.' if es else 'Attached is the invoice.')
     html_body = f"<p>{text_body}</p>"
-    sender = (
-        (current_app.config.get('MAIL_DEFAULT_SENDER') or '').strip()
-        or (user.email or '').strip()
-        or 'noreply@example.com'
-    )
+    sender = _resolve_sender(user)
 
     send_email_with_attachments_sync(
         subject=subject,
@@ -1686,16 +1690,17 @@ def _tool_email_invoice(args: Dict[str, Any], user: User, lang: str) -> Dict[str
     if save_contact and invoice.customer and to_email:
         current = (invoice.customer.email or '').strip()
         if current != to_email:
-            invoice.customer.email = to_email
+            db.session.execute(update(Customer).where(Customer.id == invoice.customer_id).values(email=to_email))
             db.session.commit()
 
     return {
-        'speak': 'Correo enviado.' if _is_es(lang) else 'Email sent.',
+        'speak': 'Correo enviado.' if es else 'Email sent.',
         'redirect_url': url_for('ar.view_invoice', id=invoice.id),
     }
 
 
 def _tool_email_purchase_order(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     to_email = (args.get('to_email') or '').strip()
     to_name = (args.get('to_name') or '').strip()
@@ -1704,14 +1709,14 @@ def _tool_email_purchase_order(args: Dict[str, Any], user: User, lang: str) -> D
     save_contact = bool(args.get('save_contact'))
 
     if not number_or_id:
-        return {'speak': 'Falta el número de orden de compra.' if _is_es(lang) else 'Missing purchase order number.'}
+        return {'speak': 'Falta el número de orden de compra.' if es else 'Missing purchase order number.'}
 
     po = _find_purchase_order_by_number_or_id(number_or_id)
     if not po:
-        return {'speak': 'No encontré esa orden de compra.' if _is_es(lang) else "I couldn't find that purchase order.", 'redirect_url': url_for('po.purchase_orders')}
+        return {'speak': 'No encontré esa orden de compra.' if es else "I couldn't find that purchase order.", 'redirect_url': url_for('po.purchase_orders')}
 
-    po_customer = Customer.query.get(po.customer_id) if po.customer_id else None
-    po_vendor = Vendor.query.get(po.vendor_id) if po.vendor_id else None
+    po_customer = _cached_get(Customer, po.customer_id) if po.customer_id else None
+    po_vendor = _cached_get(Vendor, po.vendor_id) if po.vendor_id else None
     po_contact = po_vendor if po.po_type == 'vendor' else po_customer
 
     if not to_email and to_name:
@@ -1729,7 +1734,7 @@ def _tool_email_purchase_order(args: Dict[str, Any], user: User, lang: str) -> D
 
     if not to_email:
         contact_name = (po_contact.name if po_contact else '').strip() or (po.number or number_or_id)
-        if _is_es(lang):
+        if es:
             speak = (
                 f"Necesito el correo para enviar la orden de compra {po.number}.\n"
                 f"1. ¿Cuál es el correo de {contact_name}?\n"
@@ -1744,23 +1749,18 @@ def _tool_email_purchase_order(args: Dict[str, Any], user: User, lang: str) -> D
         return {'speak': speak, 'redirect_url': url_for('po.view_purchase_order', id=po.id)}
 
     if not confirm:
-        if _is_es(lang):
+        if es:
             speak = f"Confirmar: ¿Quieres enviar la orden de compra {po.number} a {to_email}?"
         else:
             speak = f"Confirmation needed: email purchase order {po.number} to {to_email}?"
         return {'speak': speak, 'redirect_url': url_for('po.view_purchase_order', id=po.id), 'needs_confirm': True}
 
-    items = PurchaseOrderItem.query.filter_by(purchase_order_id=po.id).order_by(PurchaseOrderItem.id.asc()).all()
-    pdf_bytes = _build_purchase_order_pdf(po, items)
+    pdf_bytes = _build_purchase_order_pdf(po, po.items)
 
     subject = f"Purchase Order {po.number or po.id}"
-    text_body = message or ('Adjunto la orden de compra.' if _is_es(lang) else 'Attached is the purchase order.')
+    text_body = message or ('Adjunto la orden de compra.' if es else 'Attached is the purchase order.')
     html_body = f"<p>{text_body}</p>"
-    sender = (
-        (current_app.config.get('MAIL_DEFAULT_SENDER') or '').strip()
-        or (user.email or '').strip()
-        or 'noreply@example.com'
-    )
+    sender = _resolve_sender(user)
 
     send_email_with_attachments_sync(
         subject=subject,
@@ -1774,31 +1774,29 @@ def _tool_email_purchase_order(args: Dict[str, Any], user: User, lang: str) -> D
     if save_contact and po_contact and to_email:
         current = (po_contact.email or '').strip()
         if current != to_email:
-            po_contact.email = to_email
+            contact_model = type(po_contact)
+            db.session.execute(update(contact_model).where(contact_model.id == po_contact.id).values(email=to_email))
             db.session.commit()
 
     return {
-        'speak': 'Correo enviado.' if _is_es(lang) else 'Email sent.',
+        'speak': 'Correo enviado.' if es else 'Email sent.',
         'redirect_url': url_for('po.view_purchase_order', id=po.id),
     }
 
 
 def _tool_record_payment(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     customer_name = (args.get('customer_name') or '').strip()
     if not customer_name:
-        return {'speak': 'Falta el nombre del cliente.' if _is_es(lang) else 'Missing customer name.'}
+        return {'speak': 'Falta el nombre del cliente.' if es else 'Missing customer name.'}
 
-    amount = args.get('amount')
-    try:
-        amount_val = float(amount)
-    except Exception:
-        amount_val = 0.0
+    amount_val = _safe_float(args.get('amount'))
     if amount_val <= 0:
-        return {'speak': 'Falta el monto.' if _is_es(lang) else 'Missing amount.'}
+        return {'speak': 'Falta el monto.' if es else 'Missing amount.'}
 
     customer = _find_customer_by_name(customer_name)
     if not customer:
-        return {'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
+        return {'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
 
     pay_date_raw = (args.get('date') or '').strip()
     pay_date = None
@@ -1822,7 +1820,7 @@ def _tool_record_payment(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     db.session.add(payment)
     db.session.commit()
 
-    if _is_es(lang):
+    if es:
         speak = f"Pago registrado para {customer.name} por ${amount_val:,.2f}."
     else:
         speak = f"Payment recorded for {customer.name} for ${amount_val:,.2f}."
@@ -1830,27 +1828,32 @@ def _tool_record_payment(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
 
 def _tool_customer_balance(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     name = (args.get('customer_name') or '').strip()
     if not name:
-        return {'speak': 'Falta el nombre del cliente.' if _is_es(lang) else 'Missing customer name.'}
+        return {'speak': 'Falta el nombre del cliente.' if es else 'Missing customer name.'}
 
     customer = _find_customer_by_name(name)
     if not customer:
-        return {'speak': 'No encontré ese cliente.' if _is_es(lang) else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
+        return {'speak': 'No encontré ese cliente.' if es else "I couldn't find that customer.", 'redirect_url': url_for('ar.customers')}
 
-    invoices = Invoice.query.filter_by(customer_id=customer.id).order_by(Invoice.date.desc()).limit(500).all()
-    open_invoices = [inv for inv in invoices if (inv.balance or 0.0) > 0.01]
-    open_balance = float(sum((inv.balance or 0.0) for inv in open_invoices))
+    open_count, open_balance = (
+        db.session.query(func.count(Invoice.id), func.coalesce(func.sum(Invoice.balance), 0))
+        .filter(Invoice.customer_id == customer.id, Invoice.balance > 0.01)
+        .one()
+    )
+    open_balance = float(open_balance or 0)
 
-    if _is_es(lang):
-        speak = f"El balance abierto de {customer.name} es ${open_balance:,.2f} en {len(open_invoices)} facturas."
+    if es:
+        speak = f"El balance abierto de {customer.name} es ${open_balance:,.2f} en {open_count} facturas."
     else:
-        speak = f"{customer.name}'s open balance is ${open_balance:,.2f} across {len(open_invoices)} invoices."
+        speak = f"{customer.name}'s open balance is ${open_balance:,.2f} across {open_count} invoices."
 
     return {'speak': speak, 'redirect_url': url_for('ar.customers')}
 
 
 def _tool_list_open_invoices(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     limit = args.get('limit')
     try:
         limit_int = int(limit) if limit is not None else 10
@@ -1858,37 +1861,42 @@ def _tool_list_open_invoices(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         limit_int = 10
     limit_int = max(1, min(limit_int, 25))
 
-    invoices = Invoice.query.order_by(Invoice.date.desc()).limit(200).all()
-    open_invoices = [inv for inv in invoices if (inv.balance or 0.0) > 0.01]
-    open_invoices = open_invoices[:limit_int]
+    open_invoices = (
+        db.session.query(Invoice.id, Invoice.number, Customer.name, Invoice.balance)
+        .outerjoin(Customer, Customer.id == Invoice.customer_id)
+        .filter(Invoice.balance > 0.01)
+        .order_by(Invoice.date.desc())
+        .limit(limit_int)
+        .all()
+    )
 
     if not open_invoices:
-        return {'speak': 'No hay facturas abiertas.' if _is_es(lang) else 'There are no open invoices.', 'redirect_url': url_for('ar.invoices')}
+        return {'speak': 'No hay facturas abiertas.' if es else 'There are no open invoices.', 'redirect_url': url_for('ar.invoices')}
 
     parts = []
-    for inv in open_invoices:
-        num = inv.number or f"#{inv.id}"
-        cust = getattr(inv.customer, 'name', None) if getattr(inv, 'customer', None) else None
-        bal = float(inv.balance or 0.0)
+    for inv_id, inv_number, cust, balance in open_invoices:
+        num = inv_number or f"#{inv_id}"
+        bal = float(balance or 0.0)
         if cust:
             parts.append(f"{num} ({cust}) balance ${bal:,.2f}")
         else:
             parts.append(f"{num} balance ${bal:,.2f}")
 
-    speak = ('Facturas abiertas: ' if _is_es(lang) else 'Open invoices: ') + '; '.join(parts)
+    speak = ('Facturas abiertas: ' if es else 'Open invoices: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('ar.invoices')}
 
 
 def _tool_invoice_summary(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     number_or_id = (args.get('number_or_id') or '').strip()
     invoice = None
     if number_or_id.isdigit():
-        invoice = Invoice.query.get(int(number_or_id))
+        invoice = _cached_get(Invoice, int(number_or_id))
     if invoice is None and number_or_id:
         invoice = Invoice.query.filter_by(number=number_or_id).first()
 
     if invoice is None:
-        return {'speak': 'No encontré esa factura.' if _is_es(lang) else "I couldn't find that invoice.", 'redirect_url': url_for('ar.invoices')}
+        return {'speak': 'No encontré esa factura.' if es else "I couldn't find that invoice.", 'redirect_url': url_for('ar.invoices')}
 
     num = invoice.number or f"#{invoice.id}"
     total = float(invoice.total or 0.0)
@@ -1896,7 +1904,7 @@ def _tool_invoice_summary(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
     status = invoice.status or 'open'
     cust = getattr(invoice.customer, 'name', None) if getattr(invoice, 'customer', None) else None
 
-    if _is_es(lang):
+    if es:
         speak = f"Factura {num}" + (f" de {cust}" if cust else '') + f": total ${total:,.2f}, saldo ${bal:,.2f}, estado {status}."
     else:
         speak = f"Invoice {num}" + (f" for {cust}" if cust else '') + f": total ${total:,.2f}, balance ${bal:,.2f}, status {status}."
@@ -1904,6 +1912,7 @@ def _tool_invoice_summary(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
 
 def _tool_list_quotes(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     limit = args.get('limit')
     try:
         limit_int = int(limit) if limit is not None else 10
@@ -1913,7 +1922,7 @@ def _tool_list_quotes(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
 
     quotes = Quote.query.order_by(Quote.date.desc()).limit(limit_int).all()
     if not quotes:
-        return {'speak': 'No hay cotizaciones.' if _is_es(lang) else 'There are no quotes.', 'redirect_url': url_for('ar.quotes')}
+        return {'speak': 'No hay cotizaciones.' if es else 'There are no quotes.', 'redirect_url': url_for('ar.quotes')}
 
     parts = []
     for q in quotes:
@@ -1926,11 +1935,12 @@ def _tool_list_quotes(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         else:
             parts.append(f"{num} ${total:,.2f} {st}")
 
-    speak = ('Cotizaciones: ' if _is_es(lang) else 'Quotes: ') + '; '.join(parts)
+    speak = ('Cotizaciones: ' if es else 'Quotes: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('ar.quotes')}
 
 
 def _tool_list_bills(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     limit = args.get('limit')
     try:
         limit_int = int(limit) if limit is not None else 10
@@ -1938,9 +1948,9 @@ def _tool_list_bills(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
         limit_int = 10
     limit_int = max(1, min(limit_int, 25))
 
-    bills = Bill.query.order_by(Bill.date.desc()).limit(limit_int).all()
+    bills = Bill.query.options(selectinload(Bill.payments)).order_by(Bill.date.desc()).limit(limit_int).all()
     if not bills:
-        return {'speak': 'No hay cuentas por pagar.' if _is_es(lang) else 'There are no bills.', 'redirect_url': url_for('ap.bills')}
+        return {'speak': 'No hay cuentas por pagar.' if es else 'There are no bills.', 'redirect_url': url_for('ap.bills')}
 
     parts = []
     for b in bills:
@@ -1954,11 +1964,12 @@ def _tool_list_bills(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
             label += f" ({vendor})"
         parts.append(f"{label} total ${total:,.2f} balance ${bal:,.2f} {st}")
 
-    speak = ('Cuentas: ' if _is_es(lang) else 'Bills: ') + '; '.join(parts)
+    speak = ('Cuentas: ' if es else 'Bills: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('ap.bills')}
 
 
 def _tool_list_unread_notifications(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     limit = args.get('limit')
     try:
         limit_int = int(limit) if limit is not None else 10
@@ -1967,21 +1978,20 @@ def _tool_list_unread_notifications(args: Dict[str, Any], user: User, lang: str)
     limit_int = max(1, min(limit_int, 25))
 
     notifs = (
-        Notification.query.filter_by(user_id=user.id)
-        .filter(Notification.read_at.is_(None))
+        db.session.query(Notification.title, Notification.type)
+        .filter(Notification.user_id == user.id, Notification.read_at.is_(None))
         .order_by(Notification.created_at.desc())
         .limit(limit_int)
         .all()
     )
     if not notifs:
-        return {'speak': 'No tienes notificaciones nuevas.' if _is_es(lang) else 'You have no new notifications.', 'redirect_url': url_for('office.notifications')}
+        return {'speak': 'No tienes notificaciones nuevas.' if es else 'You have no new notifications.', 'redirect_url': url_for('office.notifications')}
 
     parts = []
-    for n in notifs:
-        title = (n.title or '').strip() or (n.type or 'notification')
-        parts.append(title)
+    for title, notif_type in notifs:
+        parts.append((title or '').strip() or (notif_type or 'notification'))
 
-    speak = ('Notificaciones: ' if _is_es(lang) else 'Notifications: ') + '; '.join(parts)
+    speak = ('Notificaciones: ' if es else 'Notifications: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('office.notifications')}
 
 
@@ -1990,6 +2000,7 @@ def _tool_mark_all_notifications_read(args: Dict[str, Any], user: User, lang: st
     q = Notification.query.filter_by(user_id=user.id).filter(Notification.read_at.is_(None))
     updated = q.update({'read_at': now}, synchronize_session=False)
     db.session.commit()
+    invalidate_unread_count(user.id)
     if _is_es(lang):
         speak = f"Marqué {updated} notificaciones como leídas."
     else:
@@ -1998,6 +2009,7 @@ def _tool_mark_all_notifications_read(args: Dict[str, Any], user: User, lang: st
 
 
 def _tool_search_library_documents(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     query = (args.get('query') or '').strip().lower()
     limit = args.get('limit')
     try:
@@ -2012,33 +2024,66 @@ def _tool_search_library_documents(args: Dict[str, Any], lang: str) -> Dict[str,
     docs = docs[:limit_int]
 
     if not docs:
-        return {'speak': 'No encontré documentos.' if _is_es(lang) else "I couldn't find any documents.", 'redirect_url': url_for('office.library')}
+        return {'speak': 'No encontré documentos.' if es else "I couldn't find any documents.", 'redirect_url': url_for('office.library')}
 
     parts = []
     for d in docs:
         title = d.title or d.original_filename or f"#{d.id}"
         parts.append(f"{d.id}: {title}")
 
-    speak = ('Documentos: ' if _is_es(lang) else 'Documents: ') + '; '.join(parts)
+    speak = ('Documentos: ' if es else 'Documents: ') + '; '.join(parts)
     return {'speak': speak, 'redirect_url': url_for('office.library')}
 
 
 def _tool_create_library_project(args: Dict[str, Any], lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     name = (args.get('name') or '').strip()
     if not name:
-        return {'speak': 'Falta el nombre.' if _is_es(lang) else 'Missing name.'}
+        return {'speak': 'Falta el nombre.' if es else 'Missing name.'}
 
     existing = Project.query.filter_by(name=name).first()
     if existing:
-        return {'speak': 'Ese proyecto ya existe.' if _is_es(lang) else 'That project already exists.', 'redirect_url': url_for('office.library_projects')}
+        return {'speak': 'Ese proyecto ya existe.' if es else 'That project already exists.', 'redirect_url': url_for('office.library_projects')}
 
     project = Project(name=name, active=True)
     db.session.add(project)
     db.session.commit()
-    return {'speak': 'Proyecto creado.' if _is_es(lang) else 'Project created.', 'redirect_url': url_for('office.library_projects')}
+    return {'speak': 'Proyecto creado.' if es else 'Project created.', 'redirect_url': url_for('office.library_projects')}
+
+
+_LIBRARY_EMAIL_MAX_ATTEMPTS = 3
+_LIBRARY_EMAIL_RETRY_DELAY = 5
+
+
+def _send_library_document_email(app, doc_id: int, to_email: str, subject: str, text_body: str, html_body: str, sender: str) -> None:
+    with app.app_context():
+        for attempt in range(1, _LIBRARY_EMAIL_MAX_ATTEMPTS + 1):
+            try:
+                doc = db.session.get(LibraryDocument, doc_id)
+                if not doc:
+                    app.logger.error('Library document %s no longer exists; email to %s dropped', doc_id, to_email)
+                    return
+                send_email_with_attachments_sync(
+                    subject=subject,
+                    sender=sender,
+                    recipients=[to_email],
+                    text_body=text_body,
+                    html_body=html_body,
+                    attachments=[(doc.original_filename or 'document', doc.content_type or 'application/octet-stream', Path(get_document_abs_path(doc.stored_filename)))],
+                )
+                return
+            except Exception as e:
+                # Only a refused connection is retried; any later failure may already have delivered the email
+                if attempt < _LIBRARY_EMAIL_MAX_ATTEMPTS and is_smtp_connect_error(e):
+                    app.logger.warning('Library document %s email to %s could not connect (attempt %s); retrying', doc_id, to_email, attempt)
+                    time.sleep(_LIBRARY_EMAIL_RETRY_DELAY)
+                    continue
+                app.logger.exception('Library document %s email to %s failed after %s attempt(s)', doc_id, to_email, attempt)
+                return
 
 
 def _tool_email_library_document(args: Dict[str, Any], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
     doc_id = args.get('document_id')
     to_email = (args.get('to_email') or '').strip()
     message = (args.get('message') or '').strip()
@@ -2048,67 +2093,440 @@ def _tool_email_library_document(args: Dict[str, Any], user: User, lang: str) ->
         doc_id_int = None
 
     if not doc_id_int:
-        return {'speak': 'Falta el ID del documento.' if _is_es(lang) else 'Missing document id.'}
+        return {'speak': 'Falta el ID del documento.' if es else 'Missing document id.'}
     if not to_email:
-        return {'speak': 'Falta el correo.' if _is_es(lang) else 'Missing recipient email.'}
+        return {'speak': 'Falta el correo.' if es else 'Missing recipient email.'}
 
-    doc = LibraryDocument.query.get(doc_id_int)
+    doc = _cached_get(LibraryDocument, doc_id_int)
     if not doc:
-        return {'speak': 'No encontré el documento.' if _is_es(lang) else "I couldn't find the document.", 'redirect_url': url_for('office.library')}
+        return {'speak': 'No encontré el documento.' if es else "I couldn't find the document.", 'redirect_url': url_for('office.library')}
 
     abs_path = get_document_abs_path(doc.stored_filename)
-    try:
-        with open(abs_path, 'rb') as f:
-            data = f.read()
-    except Exception:
-        return {'speak': 'No pude leer el archivo.' if _is_es(lang) else "I couldn't read the file.", 'redirect_url': url_for('office.view_library_document', id=doc.id)}
+    if not os.path.isfile(abs_path):
+        return {'speak': 'No pude leer el archivo.' if es else "I couldn't read the file.", 'redirect_url': url_for('office.view_library_document', id=doc.id)}
 
     subject = doc.title or doc.original_filename or 'Document'
-    text_body = message or ("Adjunto el documento." if _is_es(lang) else 'Attached is the document.')
+    text_body = message or ("Adjunto el documento." if es else 'Attached is the document.')
     html_body = f"<p>{text_body}</p>"
-    sender = (
-        (current_app.config.get('MAIL_DEFAULT_SENDER') or '').strip()
+    sender = _resolve_sender(user)
+
+    threading.Thread(
+        target=_send_library_document_email,
+        args=(current_app._get_current_object(), doc.id, to_email, subject, text_body, html_body, sender),
+    ).start()
+
+    return {
+        'speak': 'Correo encolado.' if es else 'Email queued.',
+        'redirect_url': url_for('office.view_library_document', id=doc.id),
+    }
+
+
+_TOOL_DISPATCH: Dict[str, Callable[[Dict[str, Any], User, str], Dict[str, Any]]] = {
+    'meetings_today': lambda args, user, lang: _tool_meetings_today(lang),
+    'customer_balance': lambda args, user, lang: _tool_customer_balance(args, lang),
+    'overdue_invoices': lambda args, user, lang: _tool_overdue_invoices(lang),
+    'payments_to_collect_this_week': lambda args, user, lang: _tool_payments_to_collect_this_week(lang),
+    'open_section': lambda args, user, lang: _tool_open_section(args.get('section') or '', lang),
+    'create_meeting': _tool_create_meeting,
+    'list_customers': lambda args, user, lang: _tool_list_customers(args, lang),
+    'create_customer': lambda args, user, lang: _tool_create_customer(args, lang),
+    'create_invoice': lambda args, user, lang: _tool_create_invoice(args, lang),
+    'create_bill': lambda args, user, lang: _tool_create_bill(args, lang),
+    'email_invoice': _tool_email_invoice,
+    'email_quote': _tool_email_quote,
+    'email_purchase_order': _tool_email_purchase_order,
+    'record_payment': lambda args, user, lang: _tool_record_payment(args, lang),
+    'list_open_invoices': lambda args, user, lang: _tool_list_open_invoices(args, lang),
+    'invoice_summary': lambda args, user, lang: _tool_invoice_summary(args, lang),
+    'list_quotes': lambda args, user, lang: _tool_list_quotes(args, lang),
+    'create_quote': lambda args, user, lang: _tool_create_quote(args, lang),
+    'create_purchase_order': lambda args, user, lang: _tool_create_purchase_order(args, lang),
+    'edit_quote': lambda args, user, lang: _tool_edit_quote(args, lang),
+    'delete_quote': lambda args, user, lang: _tool_delete_quote(args, lang),
+    'convert_quote_to_invoice': lambda args, user, lang: _tool_convert_quote_to_invoice(args, lang),
+    'list_bills': lambda args, user, lang: _tool_list_bills(args, lang),
+    'list_unread_notifications': _tool_list_unread_notifications,
+    'mark_all_notifications_read': _tool_mark_all_notifications_read,
+    'search_library_documents': lambda args, user, lang: _tool_search_library_documents(args, lang),
+    'create_library_project': lambda args, user, lang: _tool_create_library_project(args, lang),
+    'email_library_document': _tool_email_library_document,
+}
+
+
+def _tool(name: str, description: str, properties: Optional[Dict[str, Any]] = None, required: Optional[list[str]] = None) -> Dict[str, Any]:
+    parameters: Dict[str, Any] = {'type': 'object', 'properties': properties or {}}
+    if required:
+        parameters['required'] = required
+    parameters['additionalProperties'] = False
+    return {'type': 'function', 'function': {'name': name, 'description': description, 'parameters': parameters}}
+
+
+_LIMIT_PARAMS = {'limit': {'type': 'integer'}}
+_EMAIL_DOC_PARAMS = {
+    'number_or_id': {'type': 'string'},
+    'to_email': {'type': 'string'},
+    'to_name': {'type': 'string'},
+    'message': {'type': 'string'},
+    'confirm': {'type': 'boolean'},
+    'save_contact': {'type': 'boolean'},
+}
+_CONFIRM_DOC_PARAMS = {
+    'number_or_id': {'type': 'string'},
+    'confirm': {'type': 'boolean'},
+}
+_INVOICE_LIKE_PARAMS = {
+    'amount': {'type': 'number'},
+    'description': {'type': 'string'},
+    'date': {'type': 'string'},
+    'due_date': {'type': 'string'},
+    'tax': {'type': 'number'},
+    'terms': {'type': 'string'},
+    'notes': {'type': 'string'},
+}
+_QUOTE_PARAMS = {
+    'customer_name': {'type': 'string'},
+    'amount': {'type': 'number'},
+    'description': {'type': 'string'},
+    'date': {'type': 'string'},
+    'valid_until': {'type': 'string'},
+    'tax': {'type': 'number'},
+    'status': {'type': 'string'},
+    'terms': {'type': 'string'},
+    'notes': {'type': 'string'},
+}
+
+# _TOOLS_SCHEMA and _SYSTEM_PROMPT form the prompt prefix OpenAI caches; keep them static and in a
+# stable order, and put anything request-specific in the user message.
+_TOOLS_SCHEMA = [
+    _tool('meetings_today', 'List today meetings from the agenda.'),
+    _tool(
+        'customer_balance',
+        'Get the open balance for a customer by name.',
+        {'customer_name': {'type': 'string'}},
+        ['customer_name'],
+    ),
+    _tool('overdue_invoices', 'Check how many overdue invoices exist.'),
+    _tool(
+        'payments_to_collect_this_week',
+        'Compute how much should be collected this week (sum of balances for invoices due in next 7 days).',
+    ),
+    _tool(
+        'open_section',
+        'Navigate the user to a section of the app (agenda, invoices, notifications, dashboard).',
+        {'section': {'type': 'string'}},
+        ['section'],
+    ),
+    _tool(
+        'create_meeting',
+        'Create a meeting in the agenda. Prefer ISO 8601 for start_at/end_at.',
+        {
+            'title': {'type': 'string'},
+            'start_at': {'type': 'string'},
+            'end_at': {'type': 'string'},
+            'location': {'type': 'string'},
+            'notes': {'type': 'string'},
+            'reminder_minutes': {'type': 'integer'},
+        },
+        ['title', 'start_at'],
+    ),
+    _tool('list_customers', 'List customers.', _LIMIT_PARAMS),
+    _tool(
+        'create_customer',
+        'Create a new customer (client).',
+        {
+            'name': {'type': 'string'},
+            'email': {'type': 'string'},
+            'phone': {'type': 'string'},
+            'address': {'type': 'string'},
+            'tax_id': {'type': 'string'},
+            'credit_limit': {'type': 'number'},
+        },
+        ['name'],
+    ),
+    _tool(
+        'create_invoice',
+        'Create an invoice for a customer (simple single-line invoice).',
+        {'customer_name': {'type': 'string'}, **_INVOICE_LIKE_PARAMS},
+        ['customer_name', 'amount'],
+    ),
+    _tool(
+        'create_bill',
+        'Create a bill for a vendor (simple single-line bill).',
+        {'vendor_name': {'type': 'string'}, **_INVOICE_LIKE_PARAMS},
+        ['vendor_name', 'amount'],
+    ),
+    _tool('email_invoice', 'Email an invoice PDF to a recipient.', _EMAIL_DOC_PARAMS, ['number_or_id']),
+    _tool('email_quote', 'Email a quote PDF to a recipient.', _EMAIL_DOC_PARAMS, ['number_or_id']),
+    _tool('email_purchase_order', 'Email a purchase order (PO) PDF to a recipient.', _EMAIL_DOC_PARAMS, ['number_or_id']),
+    _tool(
+        'record_payment',
+        'Record a customer payment (not tied to a specific invoice).',
+        {
+            'customer_name': {'type': 'string'},
+            'amount': {'type': 'number'},
+            'date': {'type': 'string'},
+            'payment_method': {'type': 'string'},
+            'reference': {'type': 'string'},
+            'notes': {'type': 'string'},
+        },
+        ['customer_name', 'amount'],
+    ),
+    _tool('list_open_invoices', 'List open invoices (balance > 0).', _LIMIT_PARAMS),
+    _tool(
+        'invoice_summary',
+        'Get a summary for an invoice by number or id.',
+        {'number_or_id': {'type': 'string'}},
+        ['number_or_id'],
+    ),
+    _tool('list_quotes', 'List recent quotes.', _LIMIT_PARAMS),
+    _tool(
+        'create_quote',
+        'Create a quote for a customer (simple single-line quote).',
+        _QUOTE_PARAMS,
+        ['customer_name', 'amount'],
+    ),
+    _tool(
+        'create_purchase_order',
+        'Create a purchase order (simple single-line PO).',
+        {
+            'po_type': {'type': 'string', 'description': 'vendor or customer'},
+            'vendor_name': {'type': 'string'},
+            'customer_name': {'type': 'string'},
+            'amount': {'type': 'number'},
+            'description': {'type': 'string'},
+            'date': {'type': 'string'},
+            'tax': {'type': 'number'},
+            'status': {'type': 'string'},
+            'terms': {'type': 'string'},
+            'notes': {'type': 'string'},
+        },
+        ['po_type', 'amount'],
+    ),
+    _tool(
+        'edit_quote',
+        'Edit a quote by number or id (header fields and optionally simple amount/description).',
+        {'number_or_id': {'type': 'string'}, **_QUOTE_PARAMS},
+        ['number_or_id'],
+    ),
+    _tool(
+        'delete_quote',
+        'Delete a quote by number or id. Requires confirm=true to execute.',
+        _CONFIRM_DOC_PARAMS,
+        ['number_or_id'],
+    ),
+    _tool(
+        'convert_quote_to_invoice',
+        'Convert a quote to an invoice. Requires confirm=true to execute.',
+        _CONFIRM_DOC_PARAMS,
+        ['number_or_id'],
+    ),
+    _tool('list_bills', 'List recent bills (accounts payable).', _LIMIT_PARAMS),
+    _tool('list_unread_notifications', 'List unread notifications for the current user.', _LIMIT_PARAMS),
+    _tool('mark_all_notifications_read', 'Mark all unread notifications as read for the current user.'),
+    _tool(
+        'search_library_documents',
+        'Search documents in the Document Library by title/description/filename.',
+        {'query': {'type': 'string'}, **_LIMIT_PARAMS},
+    ),
+    _tool(
+        'create_library_project',
+        'Create a Document Library project.',
+        {'name': {'type': 'string'}},
+        ['name'],
+    ),
+    _tool(
+        'email_library_document',
+        'Email a Document Library document as an attachment.',
+        {
+            'document_id': {'type': 'integer'},
+            'to_email': {'type': 'string'},
+            'message': {'type': 'string'},
+        },
+        ['document_id', 'to_email'],
+    ),
+]
+
+
+_SYSTEM_PROMPT = (
+    'You are an assistant inside an accounting, operations, and document library web application. '
+    'You have access to business data in this app for the current logged-in user. '
+    'You must be concise. '
+    'When the user asks about customers, invoices, quotes, bills, meetings, notifications, or documents, '
+    'use the provided tools instead of refusing. '
+    'You can also create customers when asked. '
+    'You can also create invoices when asked. '
+    'You can also email invoices and record payments when asked. '
+    'You can also create, edit, delete, convert, and email quotes when asked (confirm before delete/convert/email). '
+    'If the user mentions a person name while asking for balance, treat it as a CUSTOMER name (not a system user). '
+    'It is allowed to provide customer balances and invoice totals from this app. '
+    'Only say you cannot access something when there is no suitable tool. '
+    'Respond in Spanish when lang starts with es, otherwise English.'
+)
+
+
+# Only answers that do not depend on stored data are cached: records change
+# through regular page routes too, which never invalidate this cache.
+_CACHEABLE_TOOL_TTLS: Dict[str, int] = {
+    'open_section': 300,
+}
+
+_RESPONSE_CACHE_MAX = 256
+_RESPONSE_CACHE: Dict[str, tuple[float, Dict[str, Any]]] = {}
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+
+def _response_cache_key(text: str, lang: str, user: User) -> str:
+    normalized = ' '.join((text or '').strip().lower().split())
+    raw = f"{getattr(user, 'id', '')}|{(lang or '').strip().lower()}|{normalized}"
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _response_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    with _RESPONSE_CACHE_LOCK:
+        entry = _RESPONSE_CACHE.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            _RESPONSE_CACHE.pop(key, None)
+            return None
+        return dict(result)
+
+
+def _response_cache_set(key: str, tool_name: str, result: Dict[str, Any]) -> None:
+    ttl = _CACHEABLE_TOOL_TTLS.get(tool_name)
+    if not ttl:
+        return
+    with _RESPONSE_CACHE_LOCK:
+        if key not in _RESPONSE_CACHE and len(_RESPONSE_CACHE) >= _RESPONSE_CACHE_MAX:
+            _RESPONSE_CACHE.pop(next(iter(_RESPONSE_CACHE)), None)
+        _RESPONSE_CACHE[key] = (time.monotonic() + ttl, dict(result))
+
+
+def _openai_cfg(app) -> Dict[str, Any]:
+    cfg = app.extensions.get('_ai_cfg')
+    if cfg is None:
+        cfg = {
+            'api_key': app.config.get('OPENAI_API_KEY'),
+            'timeout': int(app.config.get('OPENAI_TIMEOUT') or 15),
+            'model': (app.config.get('OPENAI_MODEL') or 'gpt-4o-mini').strip(),
+            'model_fast': (app.config.get('OPENAI_MODEL_FAST') or 'gpt-4o-mini').strip(),
+            'max_tokens': int(app.config.get('OPENAI_MAX_TOKENS') or 250),
+            'max_tokens_fast': int(app.config.get('OPENAI_MAX_TOKENS_FAST') or 80),
+            'default_sender': (app.config.get('MAIL_DEFAULT_SENDER') or '').strip(),
+        }
+        app.extensions['_ai_cfg'] = cfg
+    return cfg
+
+
+def _resolve_sender(user: User) -> str:
+    return (
+        _openai_cfg(current_app._get_current_object())['default_sender']
         or (user.email or '').strip()
         or 'noreply@example.com'
     )
 
-    send_email_with_attachments_sync(
-        subject=subject,
-        sender=sender,
-        recipients=[to_email],
-        text_body=text_body,
-        html_body=html_body,
-        attachments=[(doc.original_filename or 'document', doc.content_type or 'application/octet-stream', data)],
+
+class _OpenAIRetry(Retry):
+    # Without a status_forcelist urllib3 only retries these codes, and only when the
+    # response carries Retry-After, i.e. when OpenAI says the request was not processed
+    RETRY_AFTER_STATUS_CODES = frozenset({429, 503})
+
+
+def _build_openai_session() -> requests.Session:
+    http = requests.Session()
+    # A POST that may have reached the server (read errors, timeouts, other 5xx) is
+    # never resent; only connection failures and explicit 429/503 back-offs are
+    retry = _OpenAIRetry(
+        total=3,
+        connect=3,
+        read=0,
+        other=0,
+        status=2,
+        backoff_factor=0.5,
+        allowed_methods=frozenset({'POST'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
     )
+    http.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry))
+    return http
 
-    return {
-        'speak': 'Correo enviado.' if _is_es(lang) else 'Email sent.',
-        'redirect_url': url_for('office.view_library_document', id=doc.id),
-    }
+
+_OPENAI_SESSION = _build_openai_session()
 
 
 def _openai_request(payload: Dict[str, Any]) -> Dict[str, Any]:
-    api_key = current_app.config.get('OPENAI_API_KEY')
-    timeout = int(current_app.config.get('OPENAI_TIMEOUT') or 15)
+    cfg = _openai_cfg(current_app._get_current_object())
+    api_key = cfg['api_key']
+    timeout = cfg['timeout']
     if not api_key:
         raise RuntimeError('Missing OPENAI_API_KEY')
 
-    res = requests.post(
+    res = _OPENAI_SESSION.post(
         'https://api.openai.com/v1/chat/completions',
-        headers={
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json',
-        },
-        data=json.dumps(payload),
+        headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
+        data=orjson.dumps(payload),
         timeout=timeout,
     )
     res.raise_for_status()
-    return res.json()
+    return orjson.loads(res.content)
 
 
-def run_assistant(text: str, lang: str, user: User) -> Dict[str, Any]:
-    model = (current_app.config.get('OPENAI_MODEL') or 'gpt-4o-mini').strip()
+def _openai_request_stream(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    cfg = _openai_cfg(current_app._get_current_object())
+    api_key = cfg['api_key']
+    timeout = cfg['timeout']
+    if not api_key:
+        raise RuntimeError('Missing OPENAI_API_KEY')
 
+    res = _OPENAI_SESSION.post(
+        'https://api.openai.com/v1/chat/completions',
+        headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
+        data=orjson.dumps({**payload, 'stream': True}),
+        timeout=timeout,
+        stream=True,
+    )
+    try:
+        res.raise_for_status()
+        for line in res.iter_lines():
+            if not line or not line.startswith(b'data:'):
+                continue
+            data = line[5:].strip()
+            if data == b'[DONE]':
+                break
+            yield orjson.loads(data)
+    finally:
+        res.close()
+
+
+_NAV_SECTIONS = {
+    'agenda': 'agenda',
+    'calendario': 'agenda',
+    'meetings': 'agenda',
+    'reuniones': 'agenda',
+    'facturas': 'invoices',
+    'invoices': 'invoices',
+    'notificaciones': 'notifications',
+    'notifications': 'notifications',
+    'dashboard': 'dashboard',
+    'tablero': 'dashboard',
+    'panel': 'dashboard',
+    'inicio': 'dashboard',
+}
+_NAV_RE = re.compile(
+    r'^\s*(?:please\s+|por favor\s+)?(?:abre|abrir|ve a|ir a|open|go to|muestra|show)\s+(?:(?:la|el|las|los|the|my|mis)\s+)?'
+    r'(?P<section>' + '|'.join(_NAV_SECTIONS) + r')\s*[.!?]*\s*$',
+    re.IGNORECASE,
+)
+_OVERDUE_RE = re.compile(
+    r'^\s*(?:(?:cu[aá]ntas|how many|show|muestra|list|lista)\s+)?(?:(?:las|the|my|mis)\s+)?'
+    r'(?:facturas vencidas|overdue invoices)\s*[.!?]*\s*$',
+    re.IGNORECASE,
+)
+
+
+def _assistant_preflight(text: str, lang: str, user: User) -> Optional[Dict[str, Any]]:
+    es = _is_es(lang)
     pending = session.get(_pending_key())
     if pending:
         if _is_affirmative(text):
@@ -2116,629 +2534,219 @@ def run_assistant(text: str, lang: str, user: User) -> Dict[str, Any]:
             name = (pending.get('name') or '').strip()
             args = pending.get('args') or {}
             try:
-                if name == 'create_meeting':
-                    return _tool_create_meeting(args, user, lang)
-                if name == 'create_customer':
-                    return _tool_create_customer(args, lang)
-                if name == 'create_invoice':
-                    return _tool_create_invoice(args, lang)
-                if name == 'create_bill':
-                    return _tool_create_bill(args, lang)
-                if name == 'create_quote':
-                    return _tool_create_quote(args, lang)
-                if name == 'create_purchase_order':
-                    return _tool_create_purchase_order(args, lang)
-                if name == 'record_payment':
-                    return _tool_record_payment(args, lang)
-                if name == 'email_invoice':
-                    return _tool_email_invoice(args, user, lang)
-                if name == 'email_quote':
-                    return _tool_email_quote(args, user, lang)
-                if name == 'email_purchase_order':
-                    return _tool_email_purchase_order(args, user, lang)
-                if name == 'email_library_document':
-                    return _tool_email_library_document(args, user, lang)
-                if name == 'delete_quote':
-                    return _tool_delete_quote(args, lang)
-                if name == 'convert_quote_to_invoice':
-                    return _tool_convert_quote_to_invoice(args, lang)
+                handler = _TOOL_DISPATCH.get(name)
+                if handler:
+                    return handler(args, user, lang)
             except Exception:
                 current_app.logger.exception('Failed to execute confirmed pending action')
                 raise
-            return {'speak': 'Acción no soportada.' if _is_es(lang) else 'Unsupported action.'}
+            return {'speak': 'Acción no soportada.' if es else 'Unsupported action.'}
 
         if _is_negative(text):
             session.pop(_pending_key(), None)
-            return {'speak': 'Cancelado.' if _is_es(lang) else 'Canceled.'}
+            return {'speak': 'Cancelado.' if es else 'Canceled.'}
 
         return {
             'speak': (
                 'Dime "sí" para confirmar o "no" para cancelar.'
-                if _is_es(lang)
+                if es
                 else 'Say "yes" to confirm or "no" to cancel.'
             )
         }
 
-    name_for_balance = None
-    asked_lower = (text or '').lower()
-    if any(k in asked_lower for k in ['balance', 'saldo']):
+    if _BALANCE_RE.search(text or ''):
         name_for_balance = _extract_customer_name_for_balance(text, lang)
         if name_for_balance:
             return _tool_customer_balance({'customer_name': name_for_balance}, lang)
 
-    tools = [
-        {
-            'type': 'function',
-            'function': {
-                'name': 'meetings_today',
-                'description': 'List today meetings from the agenda.',
-                'parameters': {'type': 'object', 'properties': {}, 'additionalProperties': False},
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'customer_balance',
-                'description': 'Get the open balance for a customer by name.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'customer_name': {'type': 'string'}},
-                    'required': ['customer_name'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'overdue_invoices',
-                'description': 'Check how many overdue invoices exist.',
-                'parameters': {'type': 'object', 'properties': {}, 'additionalProperties': False},
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'payments_to_collect_this_week',
-                'description': 'Compute how much should be collected this week (sum of balances for invoices due in next 7 days).',
-                'parameters': {'type': 'object', 'properties': {}, 'additionalProperties': False},
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'open_section',
-                'description': 'Navigate the user to a section of the app (agenda, invoices, notifications, dashboard).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'section': {'type': 'string'}},
-                    'required': ['section'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_meeting',
-                'description': 'Create a meeting in the agenda. Prefer ISO 8601 for start_at/end_at.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'title': {'type': 'string'},
-                        'start_at': {'type': 'string'},
-                        'end_at': {'type': 'string'},
-                        'location': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                        'reminder_minutes': {'type': 'integer'},
-                    },
-                    'required': ['title', 'start_at'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'list_customers',
-                'description': 'List customers.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'limit': {'type': 'integer'}},
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_customer',
-                'description': 'Create a new customer (client).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'name': {'type': 'string'},
-                        'email': {'type': 'string'},
-                        'phone': {'type': 'string'},
-                        'address': {'type': 'string'},
-                        'tax_id': {'type': 'string'},
-                        'credit_limit': {'type': 'number'},
-                    },
-                    'required': ['name'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_invoice',
-                'description': 'Create an invoice for a customer (simple single-line invoice).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'customer_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'description': {'type': 'string'},
-                        'date': {'type': 'string'},
-                        'due_date': {'type': 'string'},
-                        'tax': {'type': 'number'},
-                        'terms': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['customer_name', 'amount'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_bill',
-                'description': 'Create a bill for a vendor (simple single-line bill).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'vendor_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'description': {'type': 'string'},
-                        'date': {'type': 'string'},
-                        'due_date': {'type': 'string'},
-                        'tax': {'type': 'number'},
-                        'terms': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['vendor_name', 'amount'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'email_invoice',
-                'description': 'Email an invoice PDF to a recipient.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'to_email': {'type': 'string'},
-                        'to_name': {'type': 'string'},
-                        'message': {'type': 'string'},
-                        'confirm': {'type': 'boolean'},
-                        'save_contact': {'type': 'boolean'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'email_quote',
-                'description': 'Email a quote PDF to a recipient.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'to_email': {'type': 'string'},
-                        'to_name': {'type': 'string'},
-                        'message': {'type': 'string'},
-                        'confirm': {'type': 'boolean'},
-                        'save_contact': {'type': 'boolean'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'email_purchase_order',
-                'description': 'Email a purchase order (PO) PDF to a recipient.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'to_email': {'type': 'string'},
-                        'to_name': {'type': 'string'},
-                        'message': {'type': 'string'},
-                        'confirm': {'type': 'boolean'},
-                        'save_contact': {'type': 'boolean'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'record_payment',
-                'description': 'Record a customer payment (not tied to a specific invoice).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'customer_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'date': {'type': 'string'},
-                        'payment_method': {'type': 'string'},
-                        'reference': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['customer_name', 'amount'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'list_open_invoices',
-                'description': 'List open invoices (balance > 0).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'limit': {'type': 'integer'}},
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'invoice_summary',
-                'description': 'Get a summary for an invoice by number or id.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'number_or_id': {'type': 'string'}},
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'list_quotes',
-                'description': 'List recent quotes.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'limit': {'type': 'integer'}},
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_quote',
-                'description': 'Create a quote for a customer (simple single-line quote).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'customer_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'description': {'type': 'string'},
-                        'date': {'type': 'string'},
-                        'valid_until': {'type': 'string'},
-                        'tax': {'type': 'number'},
-                        'status': {'type': 'string'},
-                        'terms': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['customer_name', 'amount'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_purchase_order',
-                'description': 'Create a purchase order (simple single-line PO).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'po_type': {'type': 'string', 'description': 'vendor or customer'},
-                        'vendor_name': {'type': 'string'},
-                        'customer_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'description': {'type': 'string'},
-                        'date': {'type': 'string'},
-                        'tax': {'type': 'number'},
-                        'status': {'type': 'string'},
-                        'terms': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['po_type', 'amount'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'edit_quote',
-                'description': 'Edit a quote by number or id (header fields and optionally simple amount/description).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'customer_name': {'type': 'string'},
-                        'amount': {'type': 'number'},
-                        'description': {'type': 'string'},
-                        'date': {'type': 'string'},
-                        'valid_until': {'type': 'string'},
-                        'tax': {'type': 'number'},
-                        'status': {'type': 'string'},
-                        'terms': {'type': 'string'},
-                        'notes': {'type': 'string'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'delete_quote',
-                'description': 'Delete a quote by number or id. Requires confirm=true to execute.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'confirm': {'type': 'boolean'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'convert_quote_to_invoice',
-                'description': 'Convert a quote to an invoice. Requires confirm=true to execute.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'number_or_id': {'type': 'string'},
-                        'confirm': {'type': 'boolean'},
-                    },
-                    'required': ['number_or_id'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'list_bills',
-                'description': 'List recent bills (accounts payable).',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'limit': {'type': 'integer'}},
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'list_unread_notifications',
-                'description': 'List unread notifications for the current user.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'limit': {'type': 'integer'}},
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'mark_all_notifications_read',
-                'description': 'Mark all unread notifications as read for the current user.',
-                'parameters': {'type': 'object', 'properties': {}, 'additionalProperties': False},
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'search_library_documents',
-                'description': 'Search documents in the Document Library by title/description/filename.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'query': {'type': 'string'},
-                        'limit': {'type': 'integer'},
-                    },
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'create_library_project',
-                'description': 'Create a Document Library project.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {'name': {'type': 'string'}},
-                    'required': ['name'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-        {
-            'type': 'function',
-            'function': {
-                'name': 'email_library_document',
-                'description': 'Email a Document Library document as an attachment.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'document_id': {'type': 'integer'},
-                        'to_email': {'type': 'string'},
-                        'message': {'type': 'string'},
-                    },
-                    'required': ['document_id', 'to_email'],
-                    'additionalProperties': False,
-                },
-            },
-        },
-    ]
+    nav = _NAV_RE.match(text or '')
+    if nav:
+        return _tool_open_section(_NAV_SECTIONS[nav.group('section').lower()], lang)
+    if _OVERDUE_RE.match(text or ''):
+        return _tool_overdue_invoices(lang)
+
+    return None
 
-    system = (
-        'You are an assistant inside an accounting, operations, and document library web application. '
-        'You have access to business data in this app for the current logged-in user. '
-        'You must be concise. '
-        'When the user asks about customers, invoices, quotes, bills, meetings, notifications, or documents, '
-        'use the provided tools instead of refusing. '
-        'You can also create customers when asked. '
-        'You can also create invoices when asked. '
-        'You can also email invoices and record payments when asked. '
-        'You can also create, edit, delete, convert, and email quotes when asked (confirm before delete/convert/email). '
-        'If the user mentions a person name while asking for balance, treat it as a CUSTOMER name (not a system user). '
-        'It is allowed to provide customer balances and invoice totals from this app. '
-        'Only say you cannot access something when there is no suitable tool. '
-        'Respond in Spanish when lang starts with es, otherwise English.'
-    )
 
-    payload = {
+_BALANCE_RE = re.compile(r'\b(?:balances?|saldos?)\b', re.IGNORECASE)
+_REFUSAL_RE = re.compile(r"no puedo acceder|no tengo acceso|can(?:not|'t) access", re.IGNORECASE)
+_FAST_INTENT_RE = re.compile(
+    r'\b(abre|abrir|open|ve a|ir a|go to|meetings?|reuniones|reuni[oó]n|agenda|overdue|vencidas?|notifications?|notificaciones)\b'
+)
+_COMPLEX_INTENT_RE = re.compile(
+    r'\b(crea|crear|create|new|nueva?|edita|editar|edit|change|cambia|email|correo|envia|enviar|env[ií]a|send|'
+    r'convert|convierte|convertir|delete|borra|borrar|elimina|eliminar|record|registra|registrar|cotizaci[oó]n|quote)\b'
+)
+
+
+def _assistant_payload(text: str, lang: str) -> Dict[str, Any]:
+    cfg = _openai_cfg(current_app._get_current_object())
+    asked_lower = (text or '').lower()
+    if _FAST_INTENT_RE.search(asked_lower) and not _COMPLEX_INTENT_RE.search(asked_lower):
+        model = cfg['model_fast']
+        max_tokens = cfg['max_tokens_fast']
+    else:
+        model = cfg['model']
+        max_tokens = cfg['max_tokens']
+    return {
         'model': model,
         'messages': [
-            {'role': 'system', 'content': system},
-            {'role': 'user', 'content': text},
+            {'role': 'system', 'content': _SYSTEM_PROMPT},
+            {'role': 'user', 'content': f"[lang={(lang or 'en').strip().lower()}]\n{text}"},
         ],
-        'tools': tools,
+        'tools': _TOOLS_SCHEMA,
         'tool_choice': 'auto',
-        'temperature': 0.2,
-        'max_tokens': int(current_app.config.get('OPENAI_MAX_TOKENS') or 250),
+        'temperature': 0,
+        'max_tokens': max_tokens,
     }
 
-    data = _openai_request(payload)
+
+def _parse_tool_args(args_raw: Any) -> Dict[str, Any]:
+    try:
+        return orjson.loads(args_raw) if isinstance(args_raw, str) else (args_raw or {})
+    except Exception:
+        return {}
+
+
+def _dispatch_tool_call(name: Optional[str], args_raw: Any, cache_key: Optional[str], user: User, lang: str) -> Dict[str, Any]:
+    es = _is_es(lang)
+    args = _parse_tool_args(args_raw)
+
+    if name in _confirm_required_tool_names():
+        session[_pending_key()] = {'name': name, 'args': args}
+        readback = _format_action_readback(name, args, lang)
+        tail = (' ¿Confirmas? (sí/no)' if es else ' Do you confirm? (yes/no)')
+        return {'speak': readback + tail}
+
+    handler = _TOOL_DISPATCH.get(name)
+    if handler:
+        result = handler(args, user, lang)
+        if cache_key is not None:
+            _response_cache_set(cache_key, name, result)
+        return result
+
+    return {'speak': 'Acción no soportada.' if es else 'Unsupported action.'}
+
+
+def _dispatch_tool_calls(calls: list[tuple[Optional[str], Any]], cache_key: Optional[str], user: User, lang: str) -> Dict[str, Any]:
+    if len(calls) == 1:
+        return _dispatch_tool_call(calls[0][0], calls[0][1], cache_key, user, lang)
+
+    # Run in the model's order on the request session; only one action can wait for confirmation
+    results: list[Dict[str, Any]] = []
+    for idx, (name, args_raw) in enumerate(calls):
+        results.append(_dispatch_tool_call(name, args_raw, None, user, lang))
+        if name in _confirm_required_tool_names():
+            if idx + 1 < len(calls):
+                results.append({'speak': (
+                    'Las demás acciones no se ejecutaron; pídelas de nuevo después de confirmar.'
+                    if _is_es(lang)
+                    else 'The other requested actions were not run; ask again after confirming.'
+                )})
+            break
+
+    merged: Dict[str, Any] = {'speak': ' '.join((r.get('speak') or '').strip() for r in results).strip()}
+    redirect_url = next((r.get('redirect_url') for r in reversed(results) if r.get('redirect_url')), None)
+    if redirect_url:
+        merged['redirect_url'] = redirect_url
+
+    if cache_key is not None and all(name in _CACHEABLE_TOOL_TTLS for name, _ in calls):
+        shortest_ttl_tool = min((name for name, _ in calls), key=lambda n: _CACHEABLE_TOOL_TTLS[n])
+        _response_cache_set(cache_key, shortest_ttl_tool, merged)
+    return merged
+
+
+def run_assistant(text: str, lang: str, user: User) -> Dict[str, Any]:
+    early = _assistant_preflight(text, lang, user)
+    if early is not None:
+        return early
+
+    cache_key = _response_cache_key(text, lang, user)
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    return _assistant_reply(text, lang, user, cache_key)
+
+
+def _assistant_reply(text: str, lang: str, user: User, cache_key) -> Dict[str, Any]:
+    data = _openai_request(_assistant_payload(text, lang))
     choice = (data.get('choices') or [{}])[0]
     message = choice.get('message') or {}
 
     tool_calls = message.get('tool_calls') or []
     if tool_calls:
-        call = tool_calls[0]
-        fn = (call.get('function') or {})
-        name = fn.get('name')
-        args_raw = fn.get('arguments') or '{}'
-        try:
-            args = json.loads(args_raw) if isinstance(args_raw, str) else (args_raw or {})
-        except Exception:
-            args = {}
-
-        if name in _confirm_required_tool_names():
-            session[_pending_key()] = {'name': name, 'args': args}
-            readback = _format_action_readback(name, args, lang)
-            tail = (' ¿Confirmas? (sí/no)' if _is_es(lang) else ' Do you confirm? (yes/no)')
-            return {'speak': readback + tail}
-
-        if name == 'meetings_today':
-            return _tool_meetings_today(lang)
-        if name == 'overdue_invoices':
-            return _tool_overdue_invoices(lang)
-        if name == 'payments_to_collect_this_week':
-            return _tool_payments_to_collect_this_week(lang)
-        if name == 'open_section':
-            return _tool_open_section(args.get('section') or '', lang)
-        if name == 'create_meeting':
-            return _tool_create_meeting(args, user, lang)
-        if name == 'list_customers':
-            return _tool_list_customers(args, lang)
-        if name == 'create_customer':
-            return _tool_create_customer(args, lang)
-        if name == 'create_invoice':
-            return _tool_create_invoice(args, lang)
-        if name == 'create_bill':
-            return _tool_create_bill(args, lang)
-        if name == 'email_invoice':
-            return _tool_email_invoice(args, user, lang)
-        if name == 'email_purchase_order':
-            return _tool_email_purchase_order(args, user, lang)
-        if name == 'record_payment':
-            return _tool_record_payment(args, lang)
-        if name == 'customer_balance':
-            return _tool_customer_balance(args, lang)
-        if name == 'list_open_invoices':
-            return _tool_list_open_invoices(args, lang)
-        if name == 'invoice_summary':
-            return _tool_invoice_summary(args, lang)
-        if name == 'list_quotes':
-            return _tool_list_quotes(args, lang)
-        if name == 'create_quote':
-            return _tool_create_quote(args, lang)
-        if name == 'create_purchase_order':
-            return _tool_create_purchase_order(args, lang)
-        if name == 'edit_quote':
-            return _tool_edit_quote(args, lang)
-        if name == 'delete_quote':
-            return _tool_delete_quote(args, lang)
-        if name == 'convert_quote_to_invoice':
-            return _tool_convert_quote_to_invoice(args, lang)
-        if name == 'email_quote':
-            return _tool_email_quote(args, user, lang)
-        if name == 'list_bills':
-            return _tool_list_bills(args, lang)
-        if name == 'list_unread_notifications':
-            return _tool_list_unread_notifications(args, user, lang)
-        if name == 'mark_all_notifications_read':
-            return _tool_mark_all_notifications_read(args, user, lang)
-        if name == 'search_library_documents':
-            return _tool_search_library_documents(args, lang)
-        if name == 'create_library_project':
-            return _tool_create_library_project(args, lang)
-        if name == 'email_library_document':
-            return _tool_email_library_document(args, user, lang)
-
-        return {'speak': 'Acción no soportada.' if _is_es(lang) else 'Unsupported action.'}
+        calls = [((c.get('function') or {}).get('name'), (c.get('function') or {}).get('arguments') or '{}') for c in tool_calls]
+        return _dispatch_tool_calls(calls, cache_key, user, lang)
 
     content = (message.get('content') or '').strip()
     if not content:
         return {'speak': 'No entendí.' if _is_es(lang) else "I didn't understand."}
 
-    refusal_markers = [
-        'no puedo acceder',
-        'no puedo acceder a',
-        'no tengo acceso',
-        'i cannot access',
-        "i can't access",
-        'cannot access',
-        'can\'t access',
-    ]
-    lowered = content.lower()
-    if any(m in lowered for m in refusal_markers):
-        asked = (text or '').lower()
-        if any(k in asked for k in ['balance', 'saldo']):
-            name = _extract_customer_name_for_balance(text, lang)
-            if name:
-                return _tool_customer_balance({'customer_name': name}, lang)
+    if _REFUSAL_RE.search(content) and _BALANCE_RE.search(text or ''):
+        name = _extract_customer_name_for_balance(text, lang)
+        if name:
+            return _tool_customer_balance({'customer_name': name}, lang)
 
     return {'speak': content}
+
+
+def _collect_tool_deltas(tool_parts: Dict[int, Dict[str, str]], delta: Dict[str, Any]) -> None:
+    for tc in delta.get('tool_calls') or []:
+        part = tool_parts.setdefault(int(tc.get('index') or 0), {'name': '', 'arguments': ''})
+        fn = tc.get('function') or {}
+        part['name'] += fn.get('name') or ''
+        part['arguments'] += fn.get('arguments') or ''
+
+
+def _tool_calls_from_parts(tool_parts: Dict[int, Dict[str, str]]) -> list[tuple[Optional[str], Any]]:
+    return [(tool_parts[i]['name'], tool_parts[i]['arguments'] or '{}') for i in sorted(tool_parts)]
+
+
+def _stream_content(
+    first: str,
+    chunks: Iterator[Dict[str, Any]],
+    tool_parts: Dict[int, Dict[str, str]],
+    user: User,
+    lang: str,
+) -> Iterator[Union[str, Dict[str, Any]]]:
+    yield first
+    for chunk in chunks:
+        delta = ((chunk.get('choices') or [{}])[0]).get('delta') or {}
+        _collect_tool_deltas(tool_parts, delta)
+        content = delta.get('content')
+        if content:
+            yield content
+    # Tool calls can follow the text in the same response; run them once it has ended
+    # and hand their result over as the final item
+    if tool_parts:
+        yield _dispatch_tool_calls(_tool_calls_from_parts(tool_parts), None, user, lang)
+
+
+def run_assistant_stream(text: str, lang: str, user: User) -> Union[Dict[str, Any], Iterator[Union[str, Dict[str, Any]]]]:
+    early = _assistant_preflight(text, lang, user)
+    if early is not None:
+        return early
+
+    cache_key = _response_cache_key(text, lang, user)
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Balance questions need the refusal fallback, which only works on the assembled reply
+    if _BALANCE_RE.search(text or ''):
+        return _assistant_reply(text, lang, user, cache_key)
+
+    chunks = _openai_request_stream(_assistant_payload(text, lang))
+    tool_parts: Dict[int, Dict[str, str]] = {}
+    for chunk in chunks:
+        delta = ((chunk.get('choices') or [{}])[0]).get('delta') or {}
+        _collect_tool_deltas(tool_parts, delta)
+        content = delta.get('content')
+        if content and not tool_parts:
+            return _stream_content(content, chunks, tool_parts, user, lang)
+
+    if tool_parts:
+        return _dispatch_tool_calls(_tool_calls_from_parts(tool_parts), cache_key, user, lang)
+
+    return {'speak': 'No entendí.' if _is_es(lang) else "I didn't understand."}
@@ -3,34 +3,41 @@ from wtforms import StringField, TextAreaField, SubmitField, IntegerField, Selec
 from wtforms.fields import DateTimeLocalField
 from wtforms.validators import DataRequired, Optional, Length, NumberRange, Email
 
+_REQ = DataRequired()
+_OPT = Optional()
+_EMAIL = Email()
+_LEN_50 = Length(max=50)
+_LEN_120 = Length(max=120)
+_LEN_200 = Length(max=200)
+
 
 class MeetingForm(FlaskForm):
-    title = StringField('Title', validators=[DataRequired(), Length(max=200)])
-    start_at = DateTimeLocalField('Start', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
-    end_at = DateTimeLocalField('End', format='%Y-%m-%dT%H:%M', validators=[Optional()])
-    location = StringField('Location', validators=[Optional(), Length(max=200)])
-    reminder_minutes = IntegerField('Reminder (minutes before)', validators=[Optional(), NumberRange(min=0, max=10080)])
-    notes = TextAreaField('Notes', validators=[Optional()])
+    title = StringField('Title', validators=[_REQ, _LEN_200])
+    start_at = DateTimeLocalField('Start', format='%Y-%m-%dT%H:%M', validators=[_REQ])
+    end_at = DateTimeLocalField('End', format='%Y-%m-%dT%H:%M', validators=[_OPT])
+    location = StringField('Location', validators=[_OPT, _LEN_200])
+    reminder_minutes = IntegerField('Reminder (minutes before)', validators=[_OPT, NumberRange(min=0, max=10080)])
+    notes = TextAreaField('Notes', validators=[_OPT])
     submit = SubmitField('Save Meeting')
 
 
 class ProjectForm(FlaskForm):
-    name = StringField('Project Name', validators=[DataRequired(), Length(max=120)])
+    name = StringField('Project Name', validators=[_REQ, _LEN_120])
     submit = SubmitField('Save Project')
 
 
 class LibraryDocumentForm(FlaskForm):
-    owner_id = SelectField('Owner', coerce=int, validators=[DataRequired()])
-    category = SelectField('Category', choices=[('project', 'Project'), ('personal', 'Personal')], validators=[DataRequired()])
-    project_id = SelectField('Project (if category is Project)', coerce=int, validators=[Optional()])
-    title = StringField('Title', validators=[DataRequired(), Length(max=200)])
-    description = TextAreaField('Description', validators=[Optional()])
+    owner_id = SelectField('Owner', coerce=int, validators=[_REQ])
+    category = SelectField('Category', choices=[('project', 'Project'), ('personal', 'Personal')], validators=[_REQ])
+    project_id = SelectField('Project (if category is Project)', coerce=int, validators=[_OPT])
+    title = StringField('Title', validators=[_REQ, _LEN_200])
+    description = TextAreaField('Description', validators=[_OPT])
     submit = SubmitField('Save Document')
 
 
 class EmailLibraryDocumentForm(FlaskForm):
-    to_email = StringField('To', validators=[DataRequired(), Email(), Length(max=120)])
-    message = TextAreaField('Message', validators=[Optional()])
+    to_email = StringField('To', validators=[_REQ, _EMAIL, _LEN_120])
+    message = TextAreaField('Message', validators=[_OPT])
     submit = SubmitField('Send')
 
 
@@ -42,20 +49,20 @@ class AdminSettingsForm(FlaskForm):
     show_marketing_landing = SelectField(
         'Public Marketing Landing Page',
         choices=[('off', 'Hide'), ('on', 'Show')],
-        validators=[DataRequired()],
+        validators=[_REQ],
     )
-    company_name = StringField('Company Name', validators=[Optional(), Length(max=120)])
-    company_address = TextAreaField('Company Address', validators=[Optional()])
-    company_phone = StringField('Company Phone', validators=[Optional(), Length(max=50)])
-    company_phone_1 = StringField('Company Phone 1', validators=[Optional(), Length(max=50)])
-    company_phone_2 = StringField('Company Phone 2', validators=[Optional(), Length(max=50)])
-    company_phone_3 = StringField('Company Phone 3', validators=[Optional(), Length(max=50)])
-    company_fax = StringField('Company Fax', validators=[Optional(), Length(max=50)])
-    company_email = StringField('Company Email', validators=[Optional(), Email(), Length(max=120)])
-    company_email_1 = StringField('Company Email 1', validators=[Optional(), Email(), Length(max=120)])
-    company_email_2 = StringField('Company Email 2', validators=[Optional(), Email(), Length(max=120)])
-    company_email_3 = StringField('Company Email 3', validators=[Optional(), Email(), Length(max=120)])
-    company_logo_path = StringField('Company Logo Path', validators=[Optional(), Length(max=200)])
-    invoice_important_note = TextAreaField('Invoice IMPORTANT NOTE (default)', validators=[Optional()])
-    quote_important_note = TextAreaField('Quote IMPORTANT NOTE (default)', validators=[Optional()])
+    company_name = StringField('Company Name', validators=[_OPT, _LEN_120])
+    company_address = TextAreaField('Company Address', validators=[_OPT])
+    company_phone = StringField('Company Phone', validators=[_OPT, _LEN_50])
+    company_phone_1 = StringField('Company Phone 1', validators=[_OPT, _LEN_50])
+    company_phone_2 = StringField('Company Phone 2', validators=[_OPT, _LEN_50])
+    company_phone_3 = StringField('Company Phone 3', validators=[_OPT, _LEN_50])
+    company_fax = StringField('Company Fax', validators=[_OPT, _LEN_50])
+    company_email = StringField('Company Email', validators=[_OPT, _EMAIL, _LEN_120])
+    company_email_1 = StringField('Company Email 1', validators=[_OPT, _EMAIL, _LEN_120])
+    company_email_2 = StringField('Company Email 2', validators=[_OPT, _EMAIL, _LEN_120])
+    company_email_3 = StringField('Company Email 3', validators=[_OPT, _EMAIL, _LEN_120])
+    company_logo_path = StringField('Company Logo Path', validators=[_OPT, _LEN_200])
+    invoice_important_note = TextAreaField('Invoice IMPORTANT NOTE (default)', validators=[_OPT])
+    quote_important_note = TextAreaField('Quote IMPORTANT NOTE (default)', validators=[_OPT])
     submit = SubmitField('Save Settings')
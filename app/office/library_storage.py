@@ -1,24 +1,33 @@
 import os
-import uuid
+import shutil
 from pathlib import Path
+from typing import Optional
 
 from flask import current_app
 from werkzeug.utils import secure_filename
 
 
-def _allowed_extension(filename: str) -> bool:
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _allowed_extension(filename: str) -> Optional[str]:
     if not filename or '.' not in filename:
-        return False
+        return None
     ext = filename.rsplit('.', 1)[1].lower().strip()
-    allowed = set(current_app.config.get('DOCUMENT_LIBRARY_ALLOWED_EXTENSIONS') or [])
-    return ext in allowed
+    if ext not in current_app.config['DOCUMENT_LIBRARY_ALLOWED_EXTENSIONS_SET']:
+        return None
+    return ext
 
 
 def ensure_library_folder() -> str:
+    folder = current_app.extensions.get('_library_folder')
+    if folder:
+        return folder
     folder = current_app.config.get('DOCUMENT_LIBRARY_FOLDER')
     if not folder:
         folder = os.path.join(current_app.static_folder, 'uploads', 'library')
     Path(folder).mkdir(parents=True, exist_ok=True)
+    current_app.extensions['_library_folder'] = folder
     return folder
 
 
@@ -27,21 +36,18 @@ def save_uploaded_file(uploaded_file):
         raise ValueError('No file provided.')
 
     original = secure_filename(uploaded_file.filename)
-    if not _allowed_extension(original):
+    ext = _allowed_extension(original)
+    if not ext:
         raise ValueError('File type not allowed.')
 
-    ext = original.rsplit('.', 1)[1].lower()
-    stored = f"{uuid.uuid4().hex}.{ext}"
+    stored = f"{os.urandom(16).hex()}.{ext}"
 
     folder = ensure_library_folder()
     abs_path = os.path.join(folder, stored)
-    uploaded_file.save(abs_path)
-
-    size_bytes = None
-    try:
-        size_bytes = os.path.getsize(abs_path)
-    except Exception:
-        pass
+    fd = os.open(abs_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    with os.fdopen(fd, 'wb', buffering=_UPLOAD_CHUNK_SIZE) as out:
+        shutil.copyfileobj(uploaded_file.stream, out, _UPLOAD_CHUNK_SIZE)
+        size_bytes = out.tell()
 
     return {
         'original_filename': original,
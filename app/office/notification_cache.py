@@ -0,0 +1,35 @@
+import threading
+import time
+
+from sqlalchemy import func
+
+from app import db
+from app.models import Notification
+
+
+_UNREAD_COUNT_TTL = 30
+_unread_counts = {}
+_unread_counts_lock = threading.Lock()
+
+
+def get_unread_count(user_id: int) -> int:
+    now = time.monotonic()
+    with _unread_counts_lock:
+        cached = _unread_counts.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    count = (
+        db.session.query(func.count(Notification.id))
+        .filter(Notification.user_id == user_id, Notification.read_at.is_(None))
+        .scalar()
+    ) or 0
+    with _unread_counts_lock:
+        _unread_counts[user_id] = (now + _UNREAD_COUNT_TTL, count)
+    return count
+
+
+def invalidate_unread_count(*user_ids: int) -> None:
+    with _unread_counts_lock:
+        for user_id in user_ids:
+            _unread_counts.pop(user_id, None)
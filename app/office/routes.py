@@ -1,104 +1,282 @@
 from datetime import datetime, timedelta
+import json
+import mimetypes
 import os
-
-from flask import render_template, redirect, url_for, flash, request, jsonify, current_app, send_file, session
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import click
+from flask import Response, has_request_context, render_template, redirect, url_for, flash, request, jsonify, current_app, g, send_file, session, stream_with_context
 from flask_login import login_required, current_user
 
 from app import db
+from app.choice_cache import owner_choices, project_choices
 from app.auth.email import send_email_with_attachments_sync
 from app.models import AppSetting, Meeting, Notification, Invoice, User, Project, LibraryDocument
 from app.office import bp
 from app.office.forms import MeetingForm, ProjectForm, LibraryDocumentForm, EmailLibraryDocumentForm, DeleteForm, AdminSettingsForm
-from app.office.ai_assistant import run_assistant
+from app.office.ai_assistant import run_assistant, run_assistant_stream, utc_today_bounds
 from app.office.library_storage import save_uploaded_file, get_document_abs_path, delete_document_file
-from sqlalchemy import inspect, text
+from app.office.notification_cache import get_unread_count, invalidate_unread_count
+from sqlalchemy import and_, cast, exists, func, literal, null, or_, select, text, true, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import raiseload, selectinload
 
 
 @bp.app_context_processor
 def inject_office_nav():
     if not current_user.is_authenticated:
         return {}
-    unread_count = Notification.query.filter_by(user_id=current_user.id).filter(Notification.read_at.is_(None)).count()
+    unread_count = g.get('_unread_count_cached')
+    if unread_count is None:
+        unread_count = get_unread_count(current_user.id)
+        g._unread_count_cached = unread_count
     return {
         'unread_notifications': unread_count,
     }
 
 
-def _ensure_notifications():
-    if not current_user.is_authenticated:
-        return
+def _meeting_reminder_due(now):
+    if db.engine.dialect.name == 'postgresql':
+        return Meeting.start_at <= literal(now) + func.make_interval(0, 0, 0, 0, 0, Meeting.reminder_minutes)
+    return func.julianday(Meeting.start_at) - func.julianday(now) <= Meeting.reminder_minutes / 1440.0
 
-    now = datetime.utcnow()
 
-    upcoming = Meeting.query.filter(Meeting.start_at >= now, Meeting.start_at <= now + timedelta(days=7)).order_by(Meeting.start_at.asc()).all()
-    for meeting in upcoming:
-        if meeting.reminder_minutes is None:
-            continue
-        remind_at = meeting.start_at - timedelta(minutes=int(meeting.reminder_minutes))
-        if remind_at <= now <= meeting.start_at:
-            exists = Notification.query.filter_by(
-                user_id=current_user.id,
-                ref_type='meeting',
-                ref_id=meeting.id,
-                type='meeting_reminder',
-            ).first()
-            if exists:
-                continue
-            notif = Notification(
-                user_id=current_user.id,
-                type='meeting_reminder',
-                title='Meeting Reminder',
-                body=f"{meeting.title} at {meeting.start_at.strftime('%Y-%m-%d %H:%M')}",
-                link=url_for('office.meetings'),
-                severity='info',
-                ref_type='meeting',
-                ref_id=meeting.id,
-            )
-            db.session.add(notif)
+def _not_yet_notified(ref_type, ref_id, notif_type):
+    return ~exists().where(
+        Notification.user_id == User.id,
+        Notification.ref_type == ref_type,
+        Notification.ref_id == ref_id,
+        Notification.type == notif_type,
+    )
+
+
+def _notification_insert():
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(Notification.__table__)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(Notification.__table__)
+    else:
+        return Notification.__table__.insert()
+    return stmt.on_conflict_do_nothing(index_elements=['user_id', 'ref_type', 'ref_id', 'type'])
 
-    overdue_invoices = Invoice.query.filter(Invoice.due_date.isnot(None)).all()
+
+def _notification_link(endpoint, **values):
+    # Links are stored as paths; the scheduler has no request for url_for to build them from
+    if has_request_context():
+        return url_for(endpoint, **values)
+    adapter = current_app.url_map.bind('localhost', script_name=current_app.config.get('APPLICATION_ROOT') or '/')
+    return adapter.build(endpoint, values)
+
+
+def _ensure_notifications(user_ids):
+    if not user_ids:
+        return
+
+    now = datetime.utcnow()
     today = now.date()
-    for inv in overdue_invoices:
-        if inv.balance <= 0.01:
-            continue
-        if inv.due_date and inv.due_date < today:
-            exists = Notification.query.filter_by(
-                user_id=current_user.id,
-                ref_type='invoice',
-                ref_id=inv.id,
-                type='invoice_overdue',
-            ).first()
-            if exists:
-                continue
-            notif = Notification(
-                user_id=current_user.id,
-                type='invoice_overdue',
-                title='Invoice Overdue',
-                body=f"Invoice {inv.number} is overdue. Balance ${float(inv.balance or 0):,.2f}",
-                link=url_for('ar.view_invoice', id=inv.id),
-                severity='warning',
-                ref_type='invoice',
-                ref_id=inv.id,
-            )
-            db.session.add(notif)
+    candidates = union_all(
+        select(
+            User.id.label('user_id'),
+            literal('meeting').label('kind'),
+            Meeting.id.label('ref_id'),
+            Meeting.title.label('label'),
+            Meeting.start_at.label('start_at'),
+            cast(null(), Invoice.total.type).label('balance'),
+        )
+        .select_from(User)
+        .join(Meeting, true())
+        .where(
+            User.id.in_(user_ids),
+            Meeting.start_at >= now,
+            Meeting.start_at <= now + timedelta(days=7),
+            Meeting.reminder_minutes.isnot(None),
+            _meeting_reminder_due(now),
+            _not_yet_notified('meeting', Meeting.id, 'meeting_reminder'),
+        ),
+        select(
+            User.id,
+            literal('invoice'),
+            Invoice.id,
+            Invoice.number,
+            cast(null(), Meeting.start_at.type),
+            Invoice.balance,
+        )
+        .select_from(User)
+        .join(Invoice, true())
+        .where(
+            User.id.in_(user_ids),
+            Invoice.due_date.isnot(None),
+            Invoice.due_date < today,
+            Invoice.balance > 0.01,
+            _not_yet_notified('invoice', Invoice.id, 'invoice_overdue'),
+        ),
+    )
+    rows = db.session.execute(candidates).all()
+    if not rows:
+        return
 
+    meetings_link = _notification_link('office.meetings')
+    pending = []
+    for user_id, kind, ref_id, label, start_at, balance in rows:
+        if kind == 'meeting':
+            pending.append({
+                'user_id': user_id,
+                'type': 'meeting_reminder',
+                'title': 'Meeting Reminder',
+                'body': f"{label} at {start_at.strftime('%Y-%m-%d %H:%M')}",
+                'link': meetings_link,
+                'severity': 'info',
+                'ref_type': 'meeting',
+                'ref_id': ref_id,
+            })
+        else:
+            pending.append({
+                'user_id': user_id,
+                'type': 'invoice_overdue',
+                'title': 'Invoice Overdue',
+                'body': f"Invoice {label} is overdue. Balance ${float(balance or 0):,.2f}",
+                'link': _notification_link('ar.view_invoice', id=ref_id),
+                'severity': 'warning',
+                'ref_type': 'invoice',
+                'ref_id': ref_id,
+            })
+
+    db.session.execute(_notification_insert(), pending)
     db.session.commit()
+    invalidate_unread_count(*{row['user_id'] for row in pending})
+
+
+def _ensure_notifications_for_all_users():
+    _ensure_notifications([user_id for (user_id,) in db.session.query(User.id).all()])
+
+
+# Arbitrary constant shared by every process; pg_try_advisory_lock keys are bigint
+_NOTIFICATION_SCHEDULER_LOCK_KEY = 0x4E4F5449
+
+
+def _try_scheduler_lock(conn) -> bool:
+    # Session-level advisory lock: held for as long as the scheduler's connection stays open
+    if conn.dialect.name != 'postgresql':
+        return True
+    locked = bool(conn.execute(
+        text('SELECT pg_try_advisory_lock(:key)'), {'key': _NOTIFICATION_SCHEDULER_LOCK_KEY}
+    ).scalar())
+    conn.commit()
+    return locked
+
+
+def _run_notification_pass(app):
+    # A fresh app context gets its own session, removed on teardown, so a pass never
+    # touches the session of whoever invoked the command
+    with app.app_context():
+        try:
+            _ensure_notifications_for_all_users()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Notification scheduler run failed')
+
+
+@bp.cli.command('notification-scheduler')
+@click.option('--once', is_flag=True, help='Run a single pass and exit (for cron).')
+@click.option('--interval', type=int, default=None, help='Seconds between passes.')
+def notification_scheduler(once, interval):
+    """Generate meeting and overdue-invoice reminders for all users."""
+    app = current_app._get_current_object()
+    interval = interval or int(app.config.get('NOTIFICATION_SCHEDULER_INTERVAL') or 60)
+    with db.engine.connect() as lock_conn:
+        locked = False
+        while True:
+            locked = locked or _try_scheduler_lock(lock_conn)
+            if locked:
+                _run_notification_pass(app)
+            elif once:
+                app.logger.info('Notification scheduler lock is held by another process; skipping')
+            if once:
+                return
+            time.sleep(interval)
+
+
+_ENSURE_NOTIFICATIONS_INTERVAL = 60
+_ENSURE_NOTIFICATIONS_SKIP_ENDPOINTS = frozenset({
+    'static',
+    'office.assistant_status',
+    'office.assistant_command',
+    'office.assistant_stream',
+    'office.download_library_document',
+    'ar.invoice_pdf',
+    'ar.quote_pdf',
+    'ap.view_check_pdf',
+})
+_last_ensure_ts = {}
+_last_ensure_lock = threading.Lock()
+
+
+def _claim_ensure_slot(user_id):
+    now = time.monotonic()
+    with _last_ensure_lock:
+        last = _last_ensure_ts.get(user_id)
+        if last is not None and now - last < _ENSURE_NOTIFICATIONS_INTERVAL:
+            return False
+        if len(_last_ensure_ts) > 1000:
+            cutoff = now - _ENSURE_NOTIFICATIONS_INTERVAL
+            for uid in [uid for uid, ts in _last_ensure_ts.items() if ts < cutoff]:
+                del _last_ensure_ts[uid]
+        _last_ensure_ts[user_id] = now
+        return True
 
 
 @bp.before_app_request
 def before_app_request():
+    if current_app.config.get('NOTIFICATION_SCHEDULER_ENABLED'):
+        return
+    if request.endpoint in _ENSURE_NOTIFICATIONS_SKIP_ENDPOINTS or request.endpoint is None:
+        return
+    if request.accept_mimetypes.best == 'application/json':
+        return
+    if not current_user.is_authenticated:
+        return
+    if not _claim_ensure_slot(current_user.id):
+        return
     try:
-        _ensure_notifications()
+        _ensure_notifications([current_user.id])
     except Exception:
         db.session.rollback()
 
 
+_MEETINGS_PER_PAGE = 50
+_MEETINGS_LOOKBACK_DAYS = 30
+
+
 @bp.route('/meetings')
 @login_required
 def meetings():
     now = datetime.utcnow()
-    meeting_list = Meeting.query.order_by(Meeting.start_at.asc()).all()
-    return render_template('office/meetings.html', title='Agenda', meetings=meeting_list, now=now)
+    page = request.args.get('page', 1, type=int)
+    # ?lookback=N shows meetings from the last N days onward; ?lookback=0 shows all of them
+    lookback_days = request.args.get('lookback', _MEETINGS_LOOKBACK_DAYS, type=int)
+    if lookback_days < 0:
+        lookback_days = _MEETINGS_LOOKBACK_DAYS
+    q = Meeting.query
+    if lookback_days:
+        q = q.filter(Meeting.start_at >= now - timedelta(days=lookback_days))
+    pagination = (
+        q.order_by(Meeting.start_at.asc())
+        .paginate(page=page, per_page=_MEETINGS_PER_PAGE, error_out=False)
+    )
+    return render_template(
+        'office/meetings.html',
+        title='Agenda',
+        meetings=pagination.items,
+        pagination=pagination,
+        lookback_days=lookback_days,
+        default_lookback_days=_MEETINGS_LOOKBACK_DAYS,
+        now=now,
+    )
 
 
 def _can_edit_document(doc: LibraryDocument) -> bool:
@@ -116,7 +294,11 @@ def library():
     category = (request.args.get('category') or '').strip().lower() or None
     project_id = request.args.get('project_id', type=int)
 
-    q = LibraryDocument.query
+    q = LibraryDocument.query.options(
+        selectinload(LibraryDocument.owner),
+        selectinload(LibraryDocument.project),
+        raiseload('*'),
+    )
     if owner_id:
         q = q.filter(LibraryDocument.owner_id == owner_id)
     if category in ('project', 'personal'):
@@ -124,15 +306,17 @@ def library():
     if project_id:
         q = q.filter(LibraryDocument.project_id == project_id)
 
-    documents = q.order_by(LibraryDocument.created_at.desc()).limit(200).all()
+    documents, next_url, first_url = _keyset_page(q, LibraryDocument)
 
-    owners = User.query.order_by(User.username.asc()).all()
-    projects = Project.query.filter_by(active=True).order_by(Project.name.asc()).all()
+    owners = db.session.query(User.id, User.username).order_by(User.username.asc()).all()
+    projects = db.session.query(Project.id, Project.name).filter_by(active=True).order_by(Project.name.asc()).all()
 
     return render_template(
         'office/library.html',
         title='Document Library',
         documents=documents,
+        next_url=next_url,
+        first_url=first_url,
         owners=owners,
         projects=projects,
         selected_owner_id=owner_id,
@@ -174,12 +358,9 @@ def create_library_project():
 @bp.route('/library/upload', methods=['GET', 'POST'])
 @login_required
 def upload_library_document():
-    owners = User.query.order_by(User.username.asc()).all()
-    projects = Project.query.filter_by(active=True).order_by(Project.name.asc()).all()
-
     form = LibraryDocumentForm()
-    form.owner_id.choices = [(u.id, u.username) for u in owners]
-    form.project_id.choices = [(0, '-- None --')] + [(p.id, p.name) for p in projects]
+    form.owner_id.choices = owner_choices()
+    form.project_id.choices = project_choices()
 
     if request.method == 'GET':
         form.owner_id.data = current_user.id
@@ -248,6 +429,16 @@ def download_library_document(id):
     if not os.path.exists(abs_path):
         flash('File not found on server.', 'danger')
         return redirect(url_for('office.view_library_document', id=doc.id))
+
+    accel_prefix = current_app.config.get('DOCUMENT_LIBRARY_X_ACCEL_PREFIX')
+    if accel_prefix:
+        resp = Response(mimetype=(doc.content_type or mimetypes.guess_type(abs_path)[0] or 'application/octet-stream'))
+        resp.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(doc.stored_filename)}"
+        resp.headers.set('Content-Disposition', 'attachment', filename=(doc.original_filename or 'document'))
+        return resp
+
+    # send_file already answers conditional and Range requests, and hands the
+    # file to the front server itself when USE_X_SENDFILE is set
     return send_file(abs_path, as_attachment=True, download_name=(doc.original_filename or 'document'))
 
 
@@ -259,13 +450,10 @@ def edit_library_document(id):
         flash('You do not have permission to edit this document.', 'warning')
         return redirect(url_for('office.view_library_document', id=doc.id))
 
-    owners = User.query.order_by(User.username.asc()).all()
-    projects = Project.query.filter_by(active=True).order_by(Project.name.asc()).all()
-
     form = LibraryDocumentForm(obj=doc)
     form.submit.label.text = 'Save Changes'
-    form.owner_id.choices = [(u.id, u.username) for u in owners]
-    form.project_id.choices = [(0, '-- None --')] + [(p.id, p.name) for p in projects]
+    form.owner_id.choices = owner_choices()
+    form.project_id.choices = project_choices()
 
     if request.method == 'GET':
         form.owner_id.data = doc.owner_id
@@ -325,13 +513,6 @@ def email_library_document(id):
             flash('File not found on server.', 'danger')
             return redirect(url_for('office.view_library_document', id=doc.id))
 
-        try:
-            with open(abs_path, 'rb') as f:
-                data = f.read()
-        except Exception:
-            flash('Unable to read file for email.', 'danger')
-            return redirect(url_for('office.view_library_document', id=doc.id))
-
         subject = f"Document: {doc.title}"
         sender = current_app.config.get('MAIL_DEFAULT_SENDER') or current_app.config.get('ADMINS')[0]
         recipients = [form.to_email.data]
@@ -346,7 +527,7 @@ def email_library_document(id):
                 recipients=recipients,
                 text_body=text_body,
                 html_body=f"<p>{text_body}</p>",
-                attachments=[(doc.original_filename or 'document', doc.content_type or 'application/octet-stream', data)],
+                attachments=[(doc.original_filename or 'document', doc.content_type or 'application/octet-stream', Path(abs_path))],
             )
         except Exception as e:
             flash(str(e) or 'Email send failed.', 'danger')
@@ -362,8 +543,7 @@ def email_library_document(id):
 @login_required
 def create_owner_questions_agenda_item():
     title = 'Owner Questions: Email/SMS AI Assistant'
-    existing = Meeting.query.filter_by(title=title).order_by(Meeting.start_at.desc()).first()
-    if existing:
+    if db.session.query(exists().where(Meeting.title == title)).scalar():
         flash('Owner questions already added to Agenda.', 'info')
         return redirect(url_for('office.meetings'))
 
@@ -424,11 +604,75 @@ def create_meeting():
     return render_template('office/create_meeting.html', title='Create Meeting', form=form)
 
 
+_KEYSET_PAGE_SIZE = 50
+# Cursor value for rows without created_at; they sort before every dated row
+_NULL_CURSOR = 'none'
+
+
+def _keyset_page(query, model, per_page=_KEYSET_PAGE_SIZE):
+    cursor = request.args.get('cursor')
+    cursor_id = request.args.get('cursor_id', type=int)
+    paged = False
+    if cursor and cursor_id:
+        if cursor == _NULL_CURSOR:
+            query = query.filter(
+                or_(
+                    and_(model.created_at.is_(None), model.id < cursor_id),
+                    model.created_at.isnot(None),
+                )
+            )
+            paged = True
+        else:
+            try:
+                cursor_at = datetime.fromisoformat(cursor)
+            except ValueError:
+                cursor_at = None
+            if cursor_at is not None:
+                query = query.filter(
+                    or_(
+                        model.created_at < cursor_at,
+                        and_(model.created_at == cursor_at, model.id < cursor_id),
+                    )
+                )
+                paged = True
+
+    # NULLS FIRST is PostgreSQL's own DESC order, so the (created_at, id) indexes still
+    # serve it; spelling it out gives SQLite the same order
+    rows = query.order_by(model.created_at.desc().nulls_first(), model.id.desc()).limit(per_page + 1).all()
+    next_url = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        args = request.args.to_dict()
+        args.update(
+            cursor=last.created_at.isoformat() if last.created_at is not None else _NULL_CURSOR,
+            cursor_id=last.id,
+        )
+        next_url = url_for(request.endpoint, **args)
+
+    first_url = None
+    if paged:
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        args.pop('cursor_id', None)
+        first_url = url_for(request.endpoint, **args)
+    return rows, next_url, first_url
+
+
 @bp.route('/notifications')
 @login_required
 def notifications():
-    notif_list = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).limit(200).all()
-    return render_template('office/notifications.html', title='Notifications', notifications=notif_list)
+    notif_list, next_url, first_url = _keyset_page(
+        Notification.query.filter_by(user_id=current_user.id),
+        Notification,
+    )
+    return render_template(
+        'office/notifications.html',
+        title='Notifications',
+        notifications=notif_list,
+        next_url=next_url,
+        first_url=first_url,
+    )
 
 
 @bp.route('/instructions')
@@ -443,58 +687,95 @@ def voice_commands():
     return render_template('office/voice_commands.html', title='Voice Commands')
 
 
-def _get_app_setting(key: str) -> str:
+def _get_app_settings(keys) -> dict:
     try:
-        if not inspect(db.engine).has_table('app_setting'):
-            return ''
-        row = AppSetting.query.filter_by(key=key).first()
-        return (row.value or '').strip() if row else ''
+        if not AppSetting.table_exists():
+            return {}
+        rows = AppSetting.query.filter(AppSetting.key.in_(list(keys))).all()
+        return {r.key: (r.value or '').strip() for r in rows}
     except Exception:
         db.session.rollback()
-        return ''
+        return {}
+
+
+def _app_setting_upsert():
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(AppSetting.__table__)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(AppSetting.__table__)
+    else:
+        return None
+    return stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'value': stmt.excluded.value, 'updated_at': stmt.excluded.updated_at},
+        where=AppSetting.__table__.c.value.is_distinct_from(stmt.excluded.value),
+    )
+
+
+def _write_app_settings(values: dict) -> None:
+    now = datetime.utcnow()
+    stmt = _app_setting_upsert()
+    if stmt is not None:
+        db.session.execute(stmt, [
+            {'key': key, 'value': (value or '').strip(), 'updated_at': now}
+            for key, value in values.items()
+        ])
+        db.session.commit()
+        return
+
+    rows = {r.key: r for r in AppSetting.query.filter(AppSetting.key.in_(list(values))).all()}
+    for key, value in values.items():
+        value = (value or '').strip()
+        row = rows.get(key)
+        if row is None:
+            db.session.add(AppSetting(key=key, value=value, updated_at=now))
+        elif (row.value or '') != value:
+            row.value = value
+            row.updated_at = now
+    db.session.commit()
 
 
-def _set_app_setting(key: str, value: str):
+def _set_app_settings(values: dict):
     try:
-        if not inspect(db.engine).has_table('app_setting'):
+        if not AppSetting.table_exists():
             return True, ''
-        row = AppSetting.query.filter_by(key=key).first()
-        if row is None:
-            row = AppSetting(key=key)
-            db.session.add(row)
-        row.value = (value or '').strip()
-        row.updated_at = datetime.utcnow()
-        db.session.commit()
+        _write_app_settings(values)
         return True, ''
     except Exception as e:
         db.session.rollback()
-        try:
-            msg = (str(e) or '').strip().lower()
-            is_trunc = (
-                'stringdatarighttruncation' in msg
-                or 'value too long for type character varying(200)' in msg
-                or 'character varying(200)' in msg
-            )
-            if is_trunc and db.engine.dialect.name == 'postgresql':
+        msg = (str(e) or '').strip()
+        is_trunc = 'stringdatarighttruncation' in msg.lower() or 'character varying(200)' in msg
+        if is_trunc and db.engine.dialect.name == 'postgresql':
+            try:
                 db.session.execute(text('ALTER TABLE app_setting ALTER COLUMN value TYPE TEXT'))
-                db.session.commit()
-
-                row = AppSetting.query.filter_by(key=key).first()
-                if row is None:
-                    row = AppSetting(key=key)
-                    db.session.add(row)
-                row.value = (value or '').strip()
-                row.updated_at = datetime.utcnow()
-                db.session.commit()
+                _write_app_settings(values)
                 return True, ''
-        except Exception:
-            db.session.rollback()
-        msg = (str(e) or '').strip()
+            except Exception:
+                db.session.rollback()
         if msg:
             return False, f"Unable to save settings. {msg}"
         return False, 'Unable to save settings. Database update failed.'
 
 
+_SETTINGS_FORM_KEYS = (
+    'company_name',
+    'company_address',
+    'company_phone',
+    'company_phone_1',
+    'company_phone_2',
+    'company_phone_3',
+    'company_fax',
+    'company_email',
+    'company_email_1',
+    'company_email_2',
+    'company_email_3',
+    'company_logo_path',
+    'invoice_important_note',
+    'quote_important_note',
+)
+
+
 @bp.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
@@ -505,52 +786,21 @@ def settings():
     form = AdminSettingsForm()
 
     if request.method == 'GET':
-        current_val = _get_app_setting('show_marketing_landing').lower()
-        enabled = current_val in ('1', 'true', 't', 'yes', 'y', 'on')
+        values = _get_app_settings(('show_marketing_landing',) + _SETTINGS_FORM_KEYS)
+        enabled = AppSetting.parse_bool(values.get('show_marketing_landing'))
         form.show_marketing_landing.data = 'on' if enabled else 'off'
-
-        form.company_name.data = _get_app_setting('company_name')
-        form.company_address.data = _get_app_setting('company_address')
-        form.company_phone.data = _get_app_setting('company_phone')
-        form.company_phone_1.data = _get_app_setting('company_phone_1')
-        form.company_phone_2.data = _get_app_setting('company_phone_2')
-        form.company_phone_3.data = _get_app_setting('company_phone_3')
-        form.company_fax.data = _get_app_setting('company_fax')
-        form.company_email.data = _get_app_setting('company_email')
-        form.company_email_1.data = _get_app_setting('company_email_1')
-        form.company_email_2.data = _get_app_setting('company_email_2')
-        form.company_email_3.data = _get_app_setting('company_email_3')
-        form.company_logo_path.data = _get_app_setting('company_logo_path')
-        form.invoice_important_note.data = _get_app_setting('invoice_important_note')
-        form.quote_important_note.data = _get_app_setting('quote_important_note')
+        for key in _SETTINGS_FORM_KEYS:
+            getattr(form, key).data = values.get(key, '')
 
     if form.validate_on_submit():
         sel = (form.show_marketing_landing.data or 'off').strip().lower()
-        ok, err = _set_app_setting('show_marketing_landing', 'on' if sel == 'on' else 'off')
+        values = {'show_marketing_landing': AppSetting.format_bool(sel == 'on')}
+        for key in _SETTINGS_FORM_KEYS:
+            values[key] = getattr(form, key).data or ''
+        ok, err = _set_app_settings(values)
         if not ok:
             flash(err, 'danger')
             return render_template('office/settings.html', title='Settings', form=form)
-
-        for k, v in [
-            ('company_name', form.company_name.data or ''),
-            ('company_address', form.company_address.data or ''),
-            ('company_phone', form.company_phone.data or ''),
-            ('company_phone_1', form.company_phone_1.data or ''),
-            ('company_phone_2', form.company_phone_2.data or ''),
-            ('company_phone_3', form.company_phone_3.data or ''),
-            ('company_fax', form.company_fax.data or ''),
-            ('company_email', form.company_email.data or ''),
-            ('company_email_1', form.company_email_1.data or ''),
-            ('company_email_2', form.company_email_2.data or ''),
-            ('company_email_3', form.company_email_3.data or ''),
-            ('company_logo_path', form.company_logo_path.data or ''),
-            ('invoice_important_note', form.invoice_important_note.data or ''),
-            ('quote_important_note', form.quote_important_note.data or ''),
-        ]:
-            ok, err = _set_app_setting(k, v)
-            if not ok:
-                flash(err, 'danger')
-                return render_template('office/settings.html', title='Settings', form=form)
         flash('Settings saved.', 'success')
         return redirect(url_for('office.settings'))
 
@@ -563,20 +813,131 @@ def mark_notification_read(id):
     notif = Notification.query.filter_by(id=id, user_id=current_user.id).first_or_404()
     notif.read_at = datetime.utcnow()
     db.session.commit()
+    invalidate_unread_count(current_user.id)
     return redirect(request.referrer or url_for('office.notifications'))
 
 
+try:
+    _ROUTES_MTIME = os.path.getmtime(__file__)
+except Exception:
+    _ROUTES_MTIME = None
+
+_ASSISTANT_STATUS_MAX_AGE = 10
+
+
 @bp.route('/assistant/status', methods=['GET'])
 def assistant_status():
-    try:
-        routes_mtime = os.path.getmtime(__file__)
-    except Exception:
-        routes_mtime = None
-    return jsonify({
+    resp = jsonify({
         'openai_enabled': bool(current_app.config.get('OPENAI_API_KEY')),
         'pid': os.getpid(),
-        'routes_mtime': routes_mtime,
+        'routes_mtime': _ROUTES_MTIME,
     })
+    resp.cache_control.public = True
+    resp.cache_control.max_age = _ASSISTANT_STATUS_MAX_AGE
+    return resp
+
+
+def _openai_error_result(error, is_es):
+    msg = str(error) or 'unknown error'
+    msg = msg.replace('\n', ' ').strip()
+    if len(msg) > 180:
+        msg = msg[:180] + '...'
+    dbg = f" (pid={os.getpid()})"
+    return {'speak': (f'Error de OpenAI: {msg}{dbg}' if is_es else f'OpenAI error: {msg}{dbg}')}
+
+
+def _sse_event(data):
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _phrase_group(name, *phrases):
+    return f"(?P<{name}>{'|'.join(map(re.escape, phrases))})"
+
+
+_INTENT_GROUPS = {
+    'open_invoices': ('open_invoices', False),
+    'open_invoices_es': ('open_invoices', True),
+    'invoices_exact': ('open_invoices', False),
+    'facturas_exact': ('open_invoices', True),
+    'open_agenda': ('open_agenda', False),
+    'open_agenda_es': ('open_agenda', True),
+    'agenda': ('agenda', False),
+    'agenda_es': ('agenda', True),
+    'overdue': ('overdue', False),
+    'overdue_es': ('overdue', True),
+    'notifications': ('notifications', False),
+    'notifications_es': ('notifications', True),
+    'dashboard': ('dashboard', False),
+    'dashboard_es': ('dashboard', True),
+}
+# The lookahead makes every match zero-width, so finditer also reports phrases that
+# overlap an earlier one ("ir a facturas vencidas" matches open_invoices_es and
+# overdue_es); _INTENT_ORDER then picks the winner, as the old if/elif chain did
+_INTENT_RE = re.compile('(?=(?:' + '|'.join([
+    _phrase_group('open_invoices', 'open invoices', 'go to invoices'),
+    _phrase_group('open_invoices_es', 'abrir facturas', 'ir a facturas'),
+    r'(?P<invoices_exact>^invoices$)',
+    r'(?P<facturas_exact>^facturas$)',
+    _phrase_group('open_agenda', 'open agenda', 'go to agenda'),
+    _phrase_group('open_agenda_es', 'abrir agenda', 'ir a agenda'),
+    _phrase_group('overdue_es', 'facturas vencidas', 'facturas atrasadas', 'facturas en mora', 'facturas tarde'),
+    _phrase_group('agenda', 'agenda', 'meetings', 'meeting today', 'today meetings'),
+    _phrase_group('agenda_es', 'reuniones', 'reunión', 'reunion'),
+    _phrase_group('overdue', 'overdue', 'past due', 'late invoices'),
+    _phrase_group('notifications', 'notifications'),
+    _phrase_group('notifications_es', 'notificaciones'),
+    _phrase_group('dashboard', 'dashboard'),
+    _phrase_group('dashboard_es', 'tablero', 'panel', 'inicio'),
+]) + '))', re.IGNORECASE)
+_LANG_WORDS = {
+    **dict.fromkeys(('en', 'english', 'inglés', 'ingles'), 'en'),
+    **dict.fromkeys(('es', 'spanish', 'español', 'espanol'), 'es'),
+}
+_INTENT_ORDER = ('agenda', 'overdue', 'open_invoices', 'open_agenda', 'notifications', 'dashboard')
+
+
+def _cmd_agenda(is_es):
+    start, end = utc_today_bounds()
+    meetings = (
+        db.session.query(Meeting.title, Meeting.start_at)
+        .filter(Meeting.start_at >= start, Meeting.start_at < end)
+        .order_by(Meeting.start_at.asc())
+        .limit(5)
+        .all()
+    )
+    if not meetings:
+        return {'speak': 'No tienes reuniones hoy.' if is_es else 'You have no meetings today.'}
+    parts = []
+    for title, start_at in meetings:
+        parts.append(f"{title} at {start_at.strftime('%H:%M')}")
+    if is_es:
+        speak = 'Hoy tienes: ' + '; '.join(parts)
+    else:
+        speak = 'Today you have: ' + '; '.join(parts)
+    return {'speak': speak, 'redirect_url': url_for('office.meetings')}
+
+
+def _cmd_overdue(is_es):
+    today = datetime.utcnow().date()
+    n = (
+        db.session.query(func.count(Invoice.id))
+        .filter(Invoice.due_date.isnot(None), Invoice.due_date < today, Invoice.balance > 0.01)
+        .scalar()
+    )
+    if n == 0:
+        return {'speak': 'No tienes facturas vencidas.' if is_es else 'You have no overdue invoices.'}
+    speak = f"Tienes {n} facturas vencidas." if is_es else f"You have {n} overdue invoices."
+    return {'speak': speak, 'redirect_url': url_for('ar.invoices')}
+
+
+_INTENT_HANDLERS = {
+    'agenda': _cmd_agenda,
+    'overdue': _cmd_overdue,
+    'open_invoices': lambda is_es: {'speak': 'Abriendo facturas.' if is_es else 'Opening invoices.', 'redirect_url': url_for('ar.invoices')},
+    'open_agenda': lambda is_es: {'speak': 'Abriendo agenda.' if is_es else 'Opening agenda.', 'redirect_url': url_for('office.meetings')},
+    'notifications': lambda is_es: {'speak': 'Abriendo notificaciones.' if is_es else 'Opening notifications.', 'redirect_url': url_for('office.notifications')},
+    'dashboard': lambda is_es: {'speak': 'Abriendo tablero.' if is_es else 'Opening dashboard.', 'redirect_url': url_for('main.dashboard')},
+}
 
 
 @bp.route('/assistant/command', methods=['POST'])
@@ -584,7 +945,6 @@ def assistant_status():
 def assistant_command():
     payload = request.get_json(silent=True) or {}
     raw_text = (payload.get('text') or '').strip()
-    text = raw_text.lower()
     lang = (payload.get('lang') or '').strip().lower()
 
     if not lang:
@@ -592,11 +952,7 @@ def assistant_command():
         lang = stored_lang
 
     if not lang and raw_text:
-        lowered = (raw_text or '').strip().lower()
-        if lowered in ('en', 'english', 'inglés', 'ingles'):
-            lang = 'en'
-        elif lowered in ('es', 'spanish', 'español', 'espanol'):
-            lang = 'es'
+        lang = _LANG_WORDS.get(raw_text.lower(), '')
 
     if not lang:
         return jsonify({'speak': 'Choose language: English or Español.'})
@@ -611,6 +967,8 @@ def assistant_command():
 
     if should_greet and not raw_text:
         return jsonify({'speak': ('Hola. ¿En qué te puedo ayudar hoy?' if is_es else 'Hi. How can I help you today?')})
+    if not raw_text:
+        return jsonify({'speak': 'Di un comando.' if is_es else 'Say a command.'})
     pid = os.getpid()
 
     if current_app.config.get('OPENAI_API_KEY'):
@@ -622,51 +980,65 @@ def assistant_command():
             return jsonify(result)
         except Exception as e:
             db.session.rollback()
-            msg = str(e) or 'unknown error'
-            msg = msg.replace('\n', ' ').strip()
-            if len(msg) > 180:
-                msg = msg[:180] + '...'
-            dbg = f" (pid={pid})"
-            return jsonify({'speak': (f'Error de OpenAI: {msg}{dbg}' if is_es else f'OpenAI error: {msg}{dbg}')})
+            return jsonify(_openai_error_result(e, is_es))
 
-    now = datetime.utcnow()
+    matched = set()
+    for m in _INTENT_RE.finditer(raw_text):
+        intent, es_only = _INTENT_GROUPS[m.lastgroup]
+        if is_es or not es_only:
+            matched.add(intent)
+    for intent in _INTENT_ORDER:
+        if intent in matched:
+            return jsonify(_INTENT_HANDLERS[intent](is_es))
 
-    if any(k in text for k in ['agenda', 'meetings', 'meeting today', 'today meetings']) or (is_es and any(k in text for k in ['reuniones', 'reunión', 'reunion', 'reuniones hoy', 'reuniones de hoy', 'reunion hoy', 'reunión hoy'])):
-        start = datetime(now.year, now.month, now.day)
-        end = start + timedelta(days=1)
-        meetings = Meeting.query.filter(Meeting.start_at >= start, Meeting.start_at < end).order_by(Meeting.start_at.asc()).all()
-        if not meetings:
-            return jsonify({'speak': 'No tienes reuniones hoy.' if is_es else 'You have no meetings today.'})
-        parts = []
-        for m in meetings[:5]:
-            parts.append(f"{m.title} at {m.start_at.strftime('%H:%M')}")
-        if is_es:
-            speak = 'Hoy tienes: ' + '; '.join(parts)
-        else:
-            speak = 'Today you have: ' + '; '.join(parts)
-        return jsonify({'speak': speak, 'redirect_url': url_for('office.meetings')})
+    openai_enabled = bool(current_app.config.get('OPENAI_API_KEY'))
+    dbg = f" (openai={int(openai_enabled)}, pid={pid})"
+    return jsonify({'speak': ("No entendí. Prueba: 'reuniones hoy' o 'facturas vencidas'." if is_es else "I didn't understand. Try: 'today's meetings' or 'overdue invoices'.") + dbg})
 
-    if any(k in text for k in ['overdue', 'past due', 'late invoices']) or (is_es and any(k in text for k in ['facturas vencidas', 'facturas atrasadas', 'facturas en mora', 'facturas tarde'])):
-        today = now.date()
-        invoices = Invoice.query.filter(Invoice.due_date.isnot(None)).all()
-        overdue = [inv for inv in invoices if inv.due_date and inv.due_date < today and inv.balance > 0.01]
-        if not overdue:
-            return jsonify({'speak': 'No tienes facturas vencidas.' if is_es else 'You have no overdue invoices.'})
-        speak = f"Tienes {len(overdue)} facturas vencidas." if is_es else f"You have {len(overdue)} overdue invoices."
-        return jsonify({'speak': speak, 'redirect_url': url_for('ar.invoices')})
 
-    if 'open invoices' in text or 'go to invoices' in text or 'invoices' == text or (is_es and (text == 'facturas' or 'abrir facturas' in text or 'ir a facturas' in text)):
-        return jsonify({'speak': 'Abriendo facturas.' if is_es else 'Opening invoices.', 'redirect_url': url_for('ar.invoices')})
+@bp.route('/assistant/stream', methods=['POST'])
+@login_required
+def assistant_stream():
+    payload = request.get_json(silent=True) or {}
+    raw_text = (payload.get('text') or '').strip()
+    lang = ((payload.get('lang') or '').strip() or (session.get('assistant_lang') or '').strip()).lower()
 
-    if 'open agenda' in text or 'go to agenda' in text or (is_es and ('abrir agenda' in text or 'ir a agenda' in text or text == 'agenda')):
-        return jsonify({'speak': 'Abriendo agenda.' if is_es else 'Opening agenda.', 'redirect_url': url_for('office.meetings')})
+    if not raw_text or not lang or not session.get('assistant_greeted') or not current_app.config.get('OPENAI_API_KEY'):
+        result = assistant_command().get_json()
+        return Response(_sse_event({**result, 'done': True}), mimetype='text/event-stream')
 
-    if 'notifications' in text or (is_es and 'notificaciones' in text):
-        return jsonify({'speak': 'Abriendo notificaciones.' if is_es else 'Opening notifications.', 'redirect_url': url_for('office.notifications')})
+    session['assistant_lang'] = lang
+    is_es = lang.startswith('es')
+    try:
+        result = run_assistant_stream(raw_text, lang, current_user)
+    except Exception as e:
+        db.session.rollback()
+        result = _openai_error_result(e, is_es)
 
-    if 'dashboard' in text or (is_es and any(k in text for k in ['tablero', 'panel', 'inicio'])):
-        return jsonify({'speak': 'Abriendo tablero.' if is_es else 'Opening dashboard.', 'redirect_url': url_for('main.dashboard')})
+    if isinstance(result, dict):
+        return Response(_sse_event({**result, 'done': True}), mimetype='text/event-stream')
 
-    openai_enabled = bool(current_app.config.get('OPENAI_API_KEY'))
-    dbg = f" (openai={int(openai_enabled)}, pid={pid})"
-    return jsonify({'speak': ("No entendí. Prueba: 'reuniones hoy' o 'facturas vencidas'." if is_es else "I didn't understand. Try: 'today's meetings' or 'overdue invoices'.") + dbg})
+    def generate():
+        parts = []
+        final = {}
+        try:
+            for delta in result:
+                # Tool calls that followed the text arrive last, already dispatched
+                if isinstance(delta, dict):
+                    final = delta
+                    continue
+                parts.append(delta)
+                yield _sse_event({'delta': delta})
+        except Exception as e:
+            current_app.logger.exception('Assistant stream interrupted')
+            if not parts:
+                yield _sse_event({**_openai_error_result(e, is_es), 'done': True})
+                return
+        speak = ' '.join(p for p in (''.join(parts).strip(), (final.get('speak') or '').strip()) if p)
+        yield _sse_event({**final, 'speak': speak, 'done': True})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
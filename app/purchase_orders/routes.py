@@ -1,22 +1,33 @@
 from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import zip_longest
+import re
 
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
 
 from app import db
-from app.models import Customer, Vendor, PurchaseOrder, PurchaseOrderItem
+from app.choice_cache import customer_choices, vendor_choices
+from app.models import Customer, PurchaseOrder, PurchaseOrderItem, Vendor
 from app.purchase_orders import bp
 from app.purchase_orders.forms import PurchaseOrderForm, DeleteForm
 
 
+_NON_DIGIT_RE = re.compile(r'\D')
+_CENTS = Decimal('0.01')
+_SELECT_CHOICE = (0, '-- Select --')
+
+
 def _digits_only(value: str) -> str:
-    raw = (value or '').strip()
-    digits = ''.join([c for c in raw if c.isdigit()])
-    return digits
+    return _NON_DIGIT_RE.sub('', value or '')
 
 
 def _next_po_number() -> str:
-    last = PurchaseOrder.query.order_by(PurchaseOrder.id.desc()).first()
+    last = db.session.execute(
+        select(PurchaseOrder.id, PurchaseOrder.number).order_by(PurchaseOrder.id.desc()).limit(1)
+    ).first()
     if not last or not last.number:
         return '0001'
     try:
@@ -27,19 +38,121 @@ def _next_po_number() -> str:
         return f"{(last.id + 1):04d}"
 
 
+_CREATE_TEMPLATE = 'po/create_purchase_order.html'
+_EDIT_TEMPLATE = 'po/edit_purchase_order.html'
+_ITEM_ROWS_MIN = 10
+_ITEM_ROWS_MAX = 30
+_MIN_QUANTITY = Decimal('0.01')
+
+
+def _submitted_items():
+    return [
+        {'description': description, 'quantity': quantity, 'unit_price': unit_price}
+        for description, quantity, unit_price in zip_longest(
+            request.form.getlist('item_description'),
+            request.form.getlist('item_quantity'),
+            request.form.getlist('item_unit_price'),
+            fillvalue='',
+        )
+    ]
+
+
+def _item_inputs(items):
+    items = list(items)[:_ITEM_ROWS_MAX]
+    return items + [{}] * (_ITEM_ROWS_MIN - len(items))
+
+
+def _parse_amount(raw, label, minimum):
+    raw = (raw or '').strip()
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f'Each PO item {label} must be a number.')
+    if not value.is_finite() or value < minimum:
+        raise ValueError(f'Each PO item {label} must be at least {minimum}.')
+    return value
+
+
+def _collect_items(items):
+    if len(items) > _ITEM_ROWS_MAX:
+        raise ValueError(f'A PO can have at most {_ITEM_ROWS_MAX} items.')
+
+    item_rows = []
+    subtotal = Decimal('0')
+    for item in items:
+        description = (item['description'] or '').strip()
+        qty = _parse_amount(item['quantity'], 'quantity', _MIN_QUANTITY)
+        unit_price = _parse_amount(item['unit_price'], 'unit price', Decimal('0'))
+
+        if not description and qty is None and unit_price is None:
+            continue
+        if not description:
+            raise ValueError('Each PO item must include a description.')
+        if len(description) > 200:
+            raise ValueError('PO item descriptions are limited to 200 characters.')
+        if qty is None:
+            raise ValueError('Each PO item must include a quantity.')
+        if unit_price is None:
+            raise ValueError('Each PO item must include a unit price.')
+
+        amount = (qty * unit_price).quantize(_CENTS, rounding=ROUND_HALF_UP)
+        subtotal += amount
+        item_rows.append({'description': description, 'quantity': qty, 'unit_price': unit_price, 'amount': amount})
+
+    if not item_rows:
+        raise ValueError('Add at least one PO item.')
+    return item_rows, subtotal
+
+
+def _resolve_party(form):
+    if form.po_type.data == 'vendor':
+        if not form.vendor_id.data:
+            raise ValueError('Select a vendor for a vendor PO.')
+        return form.vendor_id.data, None
+    if not form.customer_id.data:
+        raise ValueError('Select a customer for a customer PO.')
+    return None, form.customer_id.data
+
+
 @bp.route('/purchase-orders')
 @login_required
 def purchase_orders():
-    po_list = PurchaseOrder.query.order_by(PurchaseOrder.date.desc()).all()
+    page = request.args.get('page', 1, type=int)
+    pagination = (
+        PurchaseOrder.query.options(
+            load_only(
+                PurchaseOrder.id,
+                PurchaseOrder.number,
+                PurchaseOrder.po_type,
+                PurchaseOrder.date,
+                PurchaseOrder.total,
+                PurchaseOrder.status,
+                PurchaseOrder.vendor_id,
+                PurchaseOrder.customer_id,
+            ),
+            selectinload(PurchaseOrder.vendor).load_only(Vendor.name),
+            selectinload(PurchaseOrder.customer).load_only(Customer.name),
+        )
+        .order_by(PurchaseOrder.date.desc(), PurchaseOrder.id.desc())
+        .paginate(page=page, per_page=current_app.config['ITEMS_PER_PAGE'], error_out=False)
+    )
     delete_form = DeleteForm()
-    return render_template('po/purchase_orders.html', title='Purchase Orders', purchase_orders=po_list, delete_form=delete_form)
+    return render_template(
+        'po/purchase_orders.html',
+        title='Purchase Orders',
+        purchase_orders=pagination.items,
+        pagination=pagination,
+        delete_form=delete_form,
+    )
 
 
 @bp.route('/purchase-order/<int:id>')
 @login_required
 def view_purchase_order(id):
-    po = PurchaseOrder.query.get_or_404(id)
-    items = po.items.order_by(PurchaseOrderItem.id.asc()).all()
+    po = PurchaseOrder.query.options(selectinload(PurchaseOrder.items)).get_or_404(id)
+    items = po.items
     delete_form = DeleteForm()
     return render_template('po/view_purchase_order.html', title=f'Purchase Order {po.number}', purchase_order=po, items=items, delete_form=delete_form)
 
@@ -47,12 +160,10 @@ def view_purchase_order(id):
 @bp.route('/purchase-order/create', methods=['GET', 'POST'])
 @login_required
 def create_purchase_order():
-    customers = Customer.query.order_by(Customer.name.asc()).all()
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
-
     form = PurchaseOrderForm()
-    form.customer_id.choices = [(0, '-- Select --')] + [(c.id, c.name) for c in customers]
-    form.vendor_id.choices = [(0, '-- Select --')] + [(v.id, v.name) for v in vendors]
+    form.customer_id.choices = [_SELECT_CHOICE, *customer_choices()]
+    form.vendor_id.choices = [_SELECT_CHOICE, *vendor_choices()]
+    items = _submitted_items() if request.method == 'POST' else []
 
     if request.method == 'GET':
         form.date.data = date.today()
@@ -60,57 +171,19 @@ def create_purchase_order():
         form.po_type.data = 'vendor'
 
     if form.validate_on_submit():
-        item_rows = []
-        subtotal = 0.0
-        for item_form in form.items:
-            description = (item_form.form.description.data or '').strip()
-            qty = item_form.form.quantity.data
-            unit_price = item_form.form.unit_price.data
-
-            is_blank = (not description) and (qty is None) and (unit_price is None)
-            if is_blank:
-                continue
-
-            if not description:
-                flash('Each PO item must include a description.', 'danger')
-                return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-
-            if qty is None:
-                flash('Each PO item must include a quantity.', 'danger')
-                return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-
-            if unit_price is None:
-                flash('Each PO item must include a unit price.', 'danger')
-                return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-
-            amount = float(qty) * float(unit_price)
-            subtotal += amount
-            item_rows.append({'description': description, 'quantity': qty, 'unit_price': unit_price, 'amount': amount})
-
-        if not item_rows:
-            flash('Add at least one PO item.', 'danger')
-            return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-
-        tax = float(form.tax.data or 0)
+        try:
+            item_rows, subtotal = _collect_items(items)
+            vendor_id, customer_id = _resolve_party(form)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return render_template(_CREATE_TEMPLATE, title='Create Purchase Order', form=form, items=_item_inputs(items))
+
+        tax = form.tax.data or Decimal('0')
         total = subtotal + tax
 
-        po_type = form.po_type.data
-        vendor_id = form.vendor_id.data or 0
-        customer_id = form.customer_id.data or 0
-        if po_type == 'vendor':
-            if vendor_id == 0:
-                flash('Select a vendor for a vendor PO.', 'danger')
-                return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-            customer_id = None
-        else:
-            if customer_id == 0:
-                flash('Select a customer for a customer PO.', 'danger')
-                return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
-            vendor_id = None
-
         po = PurchaseOrder(
             number=_next_po_number(),
-            po_type=po_type,
+            po_type=form.po_type.data,
             date=form.date.data,
             vendor_id=vendor_id,
             customer_id=customer_id,
@@ -120,91 +193,46 @@ def create_purchase_order():
             status=form.status.data,
             terms=form.terms.data,
             notes=form.notes.data,
+            items=[PurchaseOrderItem(**row) for row in item_rows],
         )
         db.session.add(po)
 
-        for row in item_rows:
-            db.session.add(
-                PurchaseOrderItem(
-                    purchase_order=po,
-                    description=row['description'],
-                    quantity=row['quantity'],
-                    unit_price=row['unit_price'],
-                    amount=row['amount'],
-                )
-            )
-
         db.session.commit()
         flash('Purchase order created.', 'success')
         return redirect(url_for('po.view_purchase_order', id=po.id))
 
-    return render_template('po/create_purchase_order.html', title='Create Purchase Order', form=form)
+    return render_template(_CREATE_TEMPLATE, title='Create Purchase Order', form=form, items=_item_inputs(items))
 
 
 @bp.route('/purchase-order/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_purchase_order(id):
-    po = PurchaseOrder.query.get_or_404(id)
-
-    customers = Customer.query.order_by(Customer.name.asc()).all()
-    vendors = Vendor.query.order_by(Vendor.name.asc()).all()
+    po = PurchaseOrder.query.options(selectinload(PurchaseOrder.items)).get_or_404(id)
 
     form = PurchaseOrderForm(obj=po)
-    form.customer_id.choices = [(0, '-- Select --')] + [(c.id, c.name) for c in customers]
-    form.vendor_id.choices = [(0, '-- Select --')] + [(v.id, v.name) for v in vendors]
+    form.customer_id.choices = [_SELECT_CHOICE, *customer_choices()]
+    form.vendor_id.choices = [_SELECT_CHOICE, *vendor_choices()]
 
-    if request.method == 'GET':
+    if request.method == 'POST':
+        items = _submitted_items()
+    else:
+        items = [{'description': i.description, 'quantity': i.quantity, 'unit_price': i.unit_price} for i in po.items]
         form.po_type.data = po.po_type
         form.customer_id.data = po.customer_id or 0
         form.vendor_id.data = po.vendor_id or 0
-        existing_items = po.items.order_by(PurchaseOrderItem.id.asc()).all()
-        for idx, item in enumerate(existing_items[: len(form.items)]):
-            form.items[idx].form.description.data = item.description
-            form.items[idx].form.quantity.data = item.quantity
-            form.items[idx].form.unit_price.data = item.unit_price
 
     if form.validate_on_submit():
-        item_rows = []
-        subtotal = 0.0
-        for item_form in form.items:
-            description = (item_form.form.description.data or '').strip()
-            qty = item_form.form.quantity.data
-            unit_price = item_form.form.unit_price.data
-
-            is_blank = (not description) and (qty is None) and (unit_price is None)
-            if is_blank:
-                continue
-
-            if not description or qty is None or unit_price is None:
-                flash('Each PO item must include description, quantity, and unit price.', 'danger')
-                return render_template('po/edit_purchase_order.html', title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po)
-
-            amount = float(qty) * float(unit_price)
-            subtotal += amount
-            item_rows.append({'description': description, 'quantity': qty, 'unit_price': unit_price, 'amount': amount})
-
-        if not item_rows:
-            flash('Add at least one PO item.', 'danger')
-            return render_template('po/edit_purchase_order.html', title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po)
-
-        tax = float(form.tax.data or 0)
+        try:
+            item_rows, subtotal = _collect_items(items)
+            vendor_id, customer_id = _resolve_party(form)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return render_template(_EDIT_TEMPLATE, title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po, items=_item_inputs(items))
+
+        tax = form.tax.data or Decimal('0')
         total = subtotal + tax
 
-        po_type = form.po_type.data
-        vendor_id = form.vendor_id.data or 0
-        customer_id = form.customer_id.data or 0
-        if po_type == 'vendor':
-            if vendor_id == 0:
-                flash('Select a vendor for a vendor PO.', 'danger')
-                return render_template('po/edit_purchase_order.html', title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po)
-            customer_id = None
-        else:
-            if customer_id == 0:
-                flash('Select a customer for a customer PO.', 'danger')
-                return render_template('po/edit_purchase_order.html', title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po)
-            vendor_id = None
-
-        po.po_type = po_type
+        po.po_type = form.po_type.data
         po.date = form.date.data
         po.vendor_id = vendor_id
         po.customer_id = customer_id
@@ -215,27 +243,14 @@ def edit_purchase_order(id):
         po.terms = form.terms.data
         po.notes = form.notes.data
 
-        existing_items = po.items.all()
-        for item in existing_items:
-            db.session.delete(item)
-        db.session.flush()
-
-        for row in item_rows:
-            db.session.add(
-                PurchaseOrderItem(
-                    purchase_order=po,
-                    description=row['description'],
-                    quantity=row['quantity'],
-                    unit_price=row['unit_price'],
-                    amount=row['amount'],
-                )
-            )
+        # delete-orphan removes the replaced items on flush
+        po.items = [PurchaseOrderItem(**row) for row in item_rows]
 
         db.session.commit()
         flash('Purchase order updated.', 'success')
         return redirect(url_for('po.view_purchase_order', id=po.id))
 
-    return render_template('po/edit_purchase_order.html', title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po)
+    return render_template(_EDIT_TEMPLATE, title=f'Edit Purchase Order {po.number}', form=form, purchase_order=po, items=_item_inputs(items))
 
 
 @bp.route('/purchase-order/<int:id>/delete', methods=['POST'])
@@ -247,9 +262,6 @@ def delete_purchase_order(id):
         flash('Unable to delete purchase order.', 'danger')
         return redirect(url_for('po.view_purchase_order', id=po.id))
 
-    items = po.items.all()
-    for item in items:
-        db.session.delete(item)
     db.session.delete(po)
     db.session.commit()
     flash('Purchase order deleted.', 'success')
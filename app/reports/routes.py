@@ -1,71 +1,79 @@
-from datetime import date
+from datetime import date, timedelta
 
 from flask import render_template
 from flask_login import login_required
+from sqlalchemy import case, func, nulls_first, or_, select
 
+from app import db
 from app.reports import bp
-from app.models import Invoice
+from app.models import Customer, Invoice, Payment
 
 
-@bp.route('/ar-aging')
-@login_required
-def ar_aging():
-    today = date.today()
-    open_invoices = Invoice.query.all()
+_AGING_BUCKETS = ('current', '1_30', '31_60', '61_90', '90_plus')
 
-    buckets = {
-        'current': 0.0,
-        '1_30': 0.0,
-        '31_60': 0.0,
-        '61_90': 0.0,
-        '90_plus': 0.0,
-        'total': 0.0,
-    }
 
-    by_customer = {}
+def _aging_bucket(due, today):
+    return case(
+        (or_(due.is_(None), due >= today), 'current'),
+        (due >= today - timedelta(days=30), '1_30'),
+        (due >= today - timedelta(days=60), '31_60'),
+        (due >= today - timedelta(days=90), '61_90'),
+        else_='90_plus',
+    )
+
+
+def _compute_ar_aging(today):
+    due = func.coalesce(Invoice.due_date, Invoice.date)
+    open_invoices = (
+        select(
+            Invoice.customer_id.label('customer_id'),
+            _aging_bucket(due, today).label('bucket'),
+            Invoice.balance.label('balance'),
+        )
+        .where(Invoice.balance > 0.01)
+        .subquery()
+    )
+    totals = db.session.execute(
+        select(open_invoices.c.customer_id, open_invoices.c.bucket, func.sum(open_invoices.c.balance))
+        .group_by(open_invoices.c.customer_id, open_invoices.c.bucket)
+    ).all()
 
-    for inv in open_invoices:
-        balance = float(inv.balance or 0)
-        if balance <= 0.01:
-            continue
-
-        due = inv.due_date or inv.date
-        days_past_due = (today - due).days if due else 0
-
-        if days_past_due <= 0:
-            bucket_key = 'current'
-        elif days_past_due <= 30:
-            bucket_key = '1_30'
-        elif days_past_due <= 60:
-            bucket_key = '31_60'
-        elif days_past_due <= 90:
-            bucket_key = '61_90'
-        else:
-            bucket_key = '90_plus'
+    buckets = dict.fromkeys(_AGING_BUCKETS + ('total',), 0.0)
+    by_customer = {}
 
+    for customer_id, bucket_key, balance in totals:
+        balance = float(balance or 0)
         buckets[bucket_key] += balance
         buckets['total'] += balance
 
-        customer = inv.customer
-        customer_key = customer.id if customer else inv.customer_id
-        if customer_key not in by_customer:
-            by_customer[customer_key] = {
-                'customer': customer,
-                'current': 0.0,
-                '1_30': 0.0,
-                '31_60': 0.0,
-                '61_90': 0.0,
-                '90_plus': 0.0,
-                'total': 0.0,
-            }
-
-        by_customer[customer_key][bucket_key] += balance
-        by_customer[customer_key]['total'] += balance
-
-    customer_rows = sorted(
-        by_customer.values(),
-        key=lambda r: (r['customer'].name.lower() if r['customer'] and r['customer'].name else '')
+        row = by_customer.get(customer_id)
+        if row is None:
+            row = by_customer[customer_id] = dict.fromkeys(_AGING_BUCKETS + ('total',), 0.0)
+        row[bucket_key] += balance
+        row['total'] += balance
+
+    customers = (
+        db.session.query(Customer.id, Customer.name)
+        .filter(Customer.id.in_([k for k in by_customer if k is not None]))
+        .order_by(nulls_first(func.lower(Customer.name)))
+        .all()
     )
+    customer_rows = []
+    for customer in customers:
+        row = by_customer.pop(customer.id)
+        row['customer'] = customer
+        customer_rows.append(row)
+    for row in by_customer.values():
+        row['customer'] = None
+    customer_rows[:0] = by_customer.values()
+    return buckets, customer_rows
+
+
+@bp.route('/ar-aging')
+@login_required
+def ar_aging():
+    today = date.today()
+    buckets, customer_rows = _compute_ar_aging(today)
 
     return render_template(
         'reports/ar_aging.html',
@@ -0,0 +1,138 @@
+import os
+
+from flask import current_app
+from sqlalchemy import exists, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models import User, AppSetting
+
+
+# (setting key, environment variable, fallback when the variable is unset or blank)
+_COMPANY_SETTING_SPECS = (
+    ('company_name', 'COMPANY_NAME', 'Diego Soto & Associates'),
+    ('company_address', 'COMPANY_ADDRESS', ''),
+    ('company_phone', 'COMPANY_PHONE', ''),
+    ('company_phone_1', 'COMPANY_PHONE_1', ''),
+    ('company_phone_2', 'COMPANY_PHONE_2', ''),
+    ('company_phone_3', 'COMPANY_PHONE_3', ''),
+    ('company_fax', 'COMPANY_FAX', ''),
+    ('company_email', 'COMPANY_EMAIL', ''),
+    ('company_email_1', 'COMPANY_EMAIL_1', ''),
+    ('company_email_2', 'COMPANY_EMAIL_2', ''),
+    ('company_email_3', 'COMPANY_EMAIL_3', ''),
+    ('company_logo_path', 'COMPANY_LOGO_PATH', 'static/img/logo.png'),
+    ('invoice_important_note', 'INVOICE_IMPORTANT_NOTE', ''),
+    ('quote_important_note', 'QUOTE_IMPORTANT_NOTE', ''),
+)
+
+_LEGACY_LOGO_PATHS = frozenset((
+    'static/img/logo.jpeg',
+    'static/img/logo.jpg',
+    '/static/img/logo.jpeg',
+    '/static/img/logo.jpg',
+))
+
+
+def _env(name: str, default: str = '') -> str:
+    value = os.environ.get(name)
+    return (value.strip() if value else '') or default
+
+
+def _app_setting_insert_missing():
+    # ON CONFLICT DO NOTHING keeps seeding idempotent if two deploys race on the same keys
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(AppSetting.__table__)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(AppSetting.__table__)
+    else:
+        return None
+    return stmt.on_conflict_do_nothing(index_elements=['key'])
+
+
+def ensure_owner_user():
+    # Flushes only; the caller commits the owner and the company settings together
+    owner_username = _env('OWNER_USERNAME', 'admin')
+    owner_email = _env('OWNER_EMAIL', 'admin@example.com')
+    # Only an explicit OWNER_PASSWORD re-checks the stored hash; the default just seeds a new owner
+    owner_password = _env('OWNER_PASSWORD')
+
+    if not owner_password and db.session.scalar(select(exists().where(
+        User.username == owner_username,
+        User.email == owner_email,
+        User.is_admin.is_(True),
+    ))):
+        print("Owner user already exists.")
+        return
+
+    user = db.session.query(User).filter_by(username=owner_username).first()
+    if user is None:
+        user = User(username=owner_username, email=owner_email, is_admin=True)
+        user.set_password(owner_password or 'admin123')
+        db.session.add(user)
+        db.session.flush()
+        print("Owner user created!")
+        return
+
+    changed = False
+    if (user.email or '') != owner_email:
+        user.email = owner_email
+        changed = True
+    if not user.is_admin:
+        user.is_admin = True
+        changed = True
+    if owner_password and not user.check_password(owner_password):
+        user.set_password(owner_password)
+        changed = True
+    if changed:
+        db.session.flush()
+        print("Owner user updated!")
+    else:
+        print("Owner user already exists.")
+
+
+def ensure_company_settings() -> None:
+    if not AppSetting.table_exists():
+        return
+
+    defaults = {key: _env(env_name, fallback) for key, env_name, fallback in _COMPANY_SETTING_SPECS}
+    existing_rows = {
+        row.key: row for row in db.session.query(AppSetting).filter(AppSetting.key.in_(list(defaults)))
+    }
+
+    new_rows = []
+    updates = []
+    for key, val in defaults.items():
+        row = existing_rows.get(key)
+        if row is None:
+            new_rows.append({'key': key, 'value': val})
+            continue
+        existing = (row.value or '').strip()
+        if (not existing) and val:
+            updates.append((row, val))
+        elif key == 'company_logo_path' and val and existing.lower() in _LEGACY_LOGO_PATHS:
+            updates.append((row, val))
+
+    # Steady-state deploys stop here: no SAVEPOINT, no writes
+    if not new_rows and not updates:
+        return
+
+    # Only the writes go into the SAVEPOINT: on Postgres a failed statement aborts the
+    # whole transaction, and rolling back to the savepoint keeps the caller's owner-user
+    # changes committable
+    try:
+        with db.session.begin_nested():
+            # updated_at comes from the column's utcnow default and onupdate
+            for row, val in updates:
+                row.value = val
+            if new_rows:
+                stmt = _app_setting_insert_missing()
+                if stmt is not None:
+                    db.session.execute(stmt, new_rows)
+                else:
+                    db.session.add_all([AppSetting(**values) for values in new_rows])
+    except DBAPIError:
+        # The database rejected the writes; anything else is a bug and should fail the deploy
+        current_app.logger.exception('Failed to seed company settings')
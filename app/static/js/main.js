@@ -337,16 +337,48 @@
     }
   }
 
-  async function sendCommand(text, lang) {
-    const res = await fetch('/office/assistant/command', {
+  async function sendCommand(text, lang, onDelta) {
+    const res = await fetch('/office/assistant/stream', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
       body: JSON.stringify({ text, lang })
     });
     if (!res.ok) {
       throw new Error('Request failed');
     }
-    return await res.json();
+
+    let streamed = '';
+    let result = null;
+    function handleEvent(raw) {
+      const line = raw.split('\n').find((l) => l.startsWith('data:'));
+      if (!line) return;
+      const event = JSON.parse(line.slice(5).trim());
+      if (event.delta) {
+        streamed += event.delta;
+        if (onDelta) onDelta(streamed);
+      }
+      if (event.done) result = event;
+    }
+
+    if (!res.body || !res.body.getReader) {
+      (await res.text()).split('\n\n').forEach(handleEvent);
+    } else {
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buffer.indexOf('\n\n')) >= 0) {
+          handleEvent(buffer.slice(0, idx));
+          buffer = buffer.slice(idx + 2);
+        }
+      }
+      if (buffer.trim()) handleEvent(buffer);
+    }
+    return result || { speak: streamed };
   }
 
   function initVoice() {
@@ -515,7 +547,9 @@
       statusEl.textContent = 'Thinking...';
       busy = true;
       try {
-        const data = await sendCommand(finalText, activeLang);
+        const data = await sendCommand(finalText, activeLang, (partial) => {
+          responseEl.value = partial;
+        });
         const speakText = data.speak || '';
         responseEl.value = speakText;
         statusEl.textContent = 'Done.';
@@ -683,7 +717,9 @@
       busy = true;
       try {
         const activeLang = resolveLang();
-        const data = await sendCommand(text, activeLang);
+        const data = await sendCommand(text, activeLang, (partial) => {
+          responseEl.value = partial;
+        });
         const speakText = data.speak || '';
 
         const questions = extractNumberedQuestions(speakText);
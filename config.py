@@ -1,33 +1,40 @@
 import os
+import re
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'), override=False)
 load_dotenv(os.path.join(basedir, 'app', '.env'), override=False)
 
+# postgres://, postgresql:// and postgresql+psycopg2:// all go through psycopg 3
+_POSTGRES_URL_RE = re.compile(r'^postgres(?:ql)?(?:\+psycopg2?)?://')
+
+_TRUE_VALUES = frozenset(('1', 'true', 't', 'yes', 'y', 'on'))
+_FALSE_VALUES = frozenset(('0', 'false', 'f', 'no', 'n', 'off', ''))
+
 
 def _env_bool(name: str, default: bool = False) -> bool:
     val = os.environ.get(name)
     if val is None:
         return default
     val = val.strip().lower()
-    if val in ('1', 'true', 't', 'yes', 'y', 'on'):
+    if val in _TRUE_VALUES:
         return True
-    if val in ('0', 'false', 'f', 'no', 'n', 'off', ''):
+    if val in _FALSE_VALUES:
         return False
     return default
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     _database_url = os.environ.get('DATABASE_URL')
-    if _database_url and _database_url.startswith('postgresql+psycopg2://'):
-        _database_url = 'postgresql+psycopg://' + _database_url[len('postgresql+psycopg2://'):]
-    if _database_url and _database_url.startswith('postgres://'):
-        _database_url = 'postgresql+psycopg://' + _database_url[len('postgres://'):]
-    elif _database_url and _database_url.startswith('postgresql://') and '+psycopg' not in _database_url and '+psycopg2' not in _database_url:
-        _database_url = 'postgresql+psycopg://' + _database_url[len('postgresql://'):]
+    if _database_url:
+        _database_url = _POSTGRES_URL_RE.sub('postgresql+psycopg://', _database_url, count=1)
     SQLALCHEMY_DATABASE_URI = _database_url or 'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True, 'pool_recycle': 1800}
+    if SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+        SQLALCHEMY_ENGINE_OPTIONS.update(pool_size=10, max_overflow=20)
     
     # Email configuration
     MAIL_SERVER = (os.environ.get('MAIL_SERVER') or '').strip() or None
@@ -65,6 +72,9 @@ class Config:
         'zip',
     }
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 250) * 1024 * 1024
+    # Hand library downloads to the front proxy: Apache/lighttpd (X-Sendfile) or nginx (X-Accel-Redirect prefix of an internal location)
+    USE_X_SENDFILE = _env_bool('USE_X_SENDFILE', default=False)
+    DOCUMENT_LIBRARY_X_ACCEL_PREFIX = (os.environ.get('DOCUMENT_LIBRARY_X_ACCEL_PREFIX') or '').strip() or None
     
     # Report configuration
     REPORTS_FOLDER = os.path.join(basedir, 'app/static/reports')
@@ -72,11 +82,24 @@ class Config:
     # OpenAI assistant configuration
     OPENAI_API_KEY = (os.environ.get('OPENAI_API_KEY') or '').strip() or None
     OPENAI_MODEL = (os.environ.get('OPENAI_MODEL') or 'gpt-4o-mini').strip()
+    OPENAI_MODEL_FAST = (os.environ.get('OPENAI_MODEL_FAST') or 'gpt-4o-mini').strip()
     OPENAI_TIMEOUT = int(os.environ.get('OPENAI_TIMEOUT') or 15)
     OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS') or 250)
+    OPENAI_MAX_TOKENS_FAST = int(os.environ.get('OPENAI_MAX_TOKENS_FAST') or 80)
+
+    # Set when a `flask office notification-scheduler` process is deployed; web requests then
+    # stop generating reminders themselves
+    NOTIFICATION_SCHEDULER_ENABLED = _env_bool('NOTIFICATION_SCHEDULER_ENABLED', default=False)
+    # Seconds between scheduler passes
+    NOTIFICATION_SCHEDULER_INTERVAL = int(os.environ.get('NOTIFICATION_SCHEDULER_INTERVAL') or 60)
 
     ENABLE_REGISTRATION = _env_bool('ENABLE_REGISTRATION', default=False)
 
     OWNER_USERNAME = (os.environ.get('OWNER_USERNAME') or '').strip() or None
     OWNER_EMAIL = (os.environ.get('OWNER_EMAIL') or '').strip() or None
     OWNER_PASSWORD = (os.environ.get('OWNER_PASSWORD') or '').strip() or None
+
+
+class ScriptConfig(Config):
+    # One-shot scripts (init_db, predeploy): close connections on release instead of pooling them
+    SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': NullPool}
@@ -1,15 +1,18 @@
+from sqlalchemy import exists, select
+
 from app import create_app, db
 from app.models import User
+from config import ScriptConfig
+
 
 def init_db():
-    app = create_app()
+    app = create_app(ScriptConfig)
     with app.app_context():
         # Create all database tables
         db.create_all()
         
         # Create admin user if it doesn't exist
-        admin = User.query.filter_by(username='admin').first()
-        if admin is None:
+        if not db.session.scalar(select(exists().where(User.username == 'admin'))):
             admin = User(username='admin', email='admin@diego-soto.com', is_admin=True)
             admin.set_password('admin123')
             db.session.add(admin)
@@ -0,0 +1,33 @@
+"""Index invoice.due_date and payment.invoice_id
+
+Revision ID: 5e1d2c3b4a6f
+Revises: 0f2c1a9b3e7d, 7b8c9d0e1f2a
+Create Date: 2026-01-20 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1d2c3b4a6f'
+down_revision = ('0f2c1a9b3e7d', '7b8c9d0e1f2a')
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('invoice', 'ix_invoice_due_date'):
+        op.create_index(op.f('ix_invoice_due_date'), 'invoice', ['due_date'], unique=False)
+    if not _has_index('payment', 'ix_payment_invoice_id'):
+        op.create_index(op.f('ix_payment_invoice_id'), 'payment', ['invoice_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_payment_invoice_id'), table_name='payment')
+    op.drop_index(op.f('ix_invoice_due_date'), table_name='invoice')
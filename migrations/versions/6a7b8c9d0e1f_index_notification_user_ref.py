@@ -0,0 +1,35 @@
+"""Composite index on notification (user_id, ref_type, ref_id, type)
+
+Revision ID: 6a7b8c9d0e1f
+Revises: 5e1d2c3b4a6f
+Create Date: 2026-01-21 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a7b8c9d0e1f'
+down_revision = '5e1d2c3b4a6f'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('notification', 'ix_notification_user_ref'):
+        op.create_index(
+            'ix_notification_user_ref',
+            'notification',
+            ['user_id', 'ref_type', 'ref_id', 'type'],
+            unique=False,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_notification_user_ref', table_name='notification')
@@ -0,0 +1,66 @@
+"""Unique notification ref index and partial unread index
+
+Revision ID: 7c8d9e0f1a2b
+Revises: 6a7b8c9d0e1f
+Create Date: 2026-01-22 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c8d9e0f1a2b'
+down_revision = '6a7b8c9d0e1f'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE FROM notification
+        WHERE user_id IS NOT NULL AND ref_type IS NOT NULL AND ref_id IS NOT NULL AND type IS NOT NULL
+          AND id NOT IN (
+            SELECT keep_id FROM (
+              SELECT MIN(id) AS keep_id
+              FROM notification
+              WHERE user_id IS NOT NULL AND ref_type IS NOT NULL AND ref_id IS NOT NULL AND type IS NOT NULL
+              GROUP BY user_id, ref_type, ref_id, type
+            ) AS keep
+          )
+        """
+    )
+    if _has_index('notification', 'ix_notification_user_ref'):
+        op.drop_index('ix_notification_user_ref', table_name='notification')
+    op.create_index(
+        'ix_notification_user_ref',
+        'notification',
+        ['user_id', 'ref_type', 'ref_id', 'type'],
+        unique=True,
+    )
+    if not _has_index('notification', 'ix_notification_user_unread'):
+        op.create_index(
+            'ix_notification_user_unread',
+            'notification',
+            ['user_id'],
+            unique=False,
+            postgresql_where=sa.text('read_at IS NULL'),
+            sqlite_where=sa.text('read_at IS NULL'),
+        )
+
+
+def downgrade():
+    op.drop_index('ix_notification_user_unread', table_name='notification')
+    op.drop_index('ix_notification_user_ref', table_name='notification')
+    op.create_index(
+        'ix_notification_user_ref',
+        'notification',
+        ['user_id', 'ref_type', 'ref_id', 'type'],
+        unique=False,
+    )
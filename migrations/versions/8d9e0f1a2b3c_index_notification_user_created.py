@@ -0,0 +1,35 @@
+"""Composite index on notification (user_id, created_at, id)
+
+Revision ID: 8d9e0f1a2b3c
+Revises: 7c8d9e0f1a2b
+Create Date: 2026-01-23 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d9e0f1a2b3c'
+down_revision = '7c8d9e0f1a2b'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('notification', 'ix_notification_user_created'):
+        op.create_index(
+            'ix_notification_user_created',
+            'notification',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    op.drop_index('ix_notification_user_created', table_name='notification')
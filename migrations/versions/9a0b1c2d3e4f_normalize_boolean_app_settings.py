@@ -0,0 +1,40 @@
+"""Normalize boolean app settings to '1'/'0'
+
+Revision ID: 9a0b1c2d3e4f
+Revises: 8d9e0f1a2b3c
+Create Date: 2026-01-24 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a0b1c2d3e4f'
+down_revision = '8d9e0f1a2b3c'
+branch_labels = None
+depends_on = None
+
+
+_BOOL_KEYS = ('show_marketing_landing',)
+_TRUE_VALUES = ('1', 'true', 't', 'yes', 'y', 'on')
+
+
+def upgrade():
+    app_setting = sa.table('app_setting', sa.column('key', sa.String), sa.column('value', sa.Text))
+    normalized = sa.func.lower(sa.func.trim(sa.func.coalesce(app_setting.c.value, '')))
+    op.execute(
+        app_setting.update()
+        .where(app_setting.c.key.in_(_BOOL_KEYS))
+        .values(value=sa.case((normalized.in_(_TRUE_VALUES), '1'), else_='0'))
+    )
+
+
+def downgrade():
+    app_setting = sa.table('app_setting', sa.column('key', sa.String), sa.column('value', sa.Text))
+    op.execute(
+        app_setting.update()
+        .where(app_setting.c.key.in_(_BOOL_KEYS))
+        .values(value=sa.case((app_setting.c.value == '1', 'on'), else_='off'))
+    )
@@ -0,0 +1,30 @@
+"""Functional index on lower(customer.name)
+
+Revision ID: ab1c2d3e4f50
+Revises: 9a0b1c2d3e4f
+Create Date: 2026-01-25 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ab1c2d3e4f50'
+down_revision = '9a0b1c2d3e4f'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('customer', 'ix_customer_lower_name'):
+        op.create_index('ix_customer_lower_name', 'customer', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_customer_lower_name', table_name='customer')
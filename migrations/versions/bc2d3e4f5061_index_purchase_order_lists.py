@@ -0,0 +1,38 @@
+"""Composite indexes for purchase order listing and item loads
+
+Revision ID: bc2d3e4f5061
+Revises: ab1c2d3e4f50
+Create Date: 2026-01-26 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc2d3e4f5061'
+down_revision = 'ab1c2d3e4f50'
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = (
+    ('purchase_order', 'ix_purchase_order_date_id', ['date', 'id']),
+    ('purchase_order_item', 'ix_purchase_order_item_po_id_id', ['purchase_order_id', 'id']),
+)
+
+
+def _has_index(table, name):
+    return any(ix.get('name') == name for ix in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    for table, name, columns in _INDEXES:
+        if not _has_index(table, name):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, _columns in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Server-side default for app_setting.updated_at
+
+Revision ID: cd3e4f506172
+Revises: bc2d3e4f5061
+Create Date: 2026-01-27 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cd3e4f506172'
+down_revision = 'bc2d3e4f5061'
+branch_labels = None
+depends_on = None
+
+
+def _utc_now_default():
+    # The app stores naive UTC timestamps; PostgreSQL's now() would be server-local time
+    if op.get_bind().dialect.name == 'postgresql':
+        return sa.text("timezone('utc', now())")
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def upgrade():
+    with op.batch_alter_table('app_setting') as batch_op:
+        batch_op.alter_column(
+            'updated_at',
+            existing_type=sa.DateTime(),
+            server_default=_utc_now_default(),
+            existing_nullable=True,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('app_setting') as batch_op:
+        batch_op.alter_column(
+            'updated_at',
+            existing_type=sa.DateTime(),
+            server_default=None,
+            existing_nullable=True,
+        )
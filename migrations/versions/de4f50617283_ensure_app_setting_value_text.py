@@ -0,0 +1,42 @@
+"""Ensure app_setting.value is Text
+
+Revision ID: de4f50617283
+Revises: cd3e4f506172
+Create Date: 2026-01-28 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'de4f50617283'
+down_revision = 'cd3e4f506172'
+branch_labels = None
+depends_on = None
+
+
+def _value_is_text():
+    for column in sa.inspect(op.get_bind()).get_columns('app_setting'):
+        if column['name'] == 'value':
+            return isinstance(column['type'], sa.Text)
+    return True
+
+
+def upgrade():
+    # Databases created with db.create_all() or stamped past 7b8c9d0e1f2a may still have VARCHAR(200)
+    if _value_is_text():
+        return
+    with op.batch_alter_table('app_setting') as batch_op:
+        batch_op.alter_column(
+            'value',
+            existing_type=sa.String(length=200),
+            type_=sa.Text(),
+            existing_nullable=True,
+        )
+
+
+def downgrade():
+    # 7b8c9d0e1f2a owns the Text type; nothing to undo here
+    pass
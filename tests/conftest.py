@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test'
+    # isolation_level=None turns off pysqlite's own transaction handling, which breaks
+    # SAVEPOINT; the begin listener below emits BEGIN instead (SQLAlchemy's pysqlite recipe)
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'check_same_thread': False, 'isolation_level': None}}
+    WTF_CSRF_ENABLED = False
+    NOTIFICATION_SCHEDULER_ENABLED = False
+    OPENAI_API_KEY = None
+
+
+def _emit_begin(conn):
+    conn.exec_driver_sql('BEGIN')
+
+
+@pytest.fixture
+def app(tmp_path):
+    # A database file rather than one shared in-memory connection, so separate
+    # connections get separate transactions, as they do on PostgreSQL
+    config = type('FileTestConfig', (TestConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"})
+    app = create_app(config)
+    with app.app_context():
+        event.listen(db.engine, 'begin', _emit_begin)
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='owner', email='owner@example.com', is_admin=True)
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def logged_in(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+    return client
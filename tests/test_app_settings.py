@@ -0,0 +1,21 @@
+from app import db
+from app.models import AppSetting
+from app.office.routes import _write_app_settings
+
+
+def _rows():
+    db.session.expire_all()
+    return {row.key: (row.value, row.updated_at) for row in AppSetting.query}
+
+
+def test_write_app_settings_upserts_only_changed_values(app):
+    _write_app_settings({'company_name': ' Acme ', 'company_fax': '555'})
+    first = _rows()
+
+    _write_app_settings({'company_name': 'Acme', 'company_fax': '556'})
+    second = _rows()
+
+    assert first['company_name'][0] == 'Acme'
+    assert second['company_name'] == first['company_name']
+    assert second['company_fax'][0] == '556'
+    assert second['company_fax'][1] >= first['company_fax'][1]
@@ -0,0 +1,174 @@
+import logging
+import smtplib
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Customer, Invoice, LibraryDocument
+from app.office import ai_assistant
+
+
+REFUSAL = {'choices': [{'message': {'content': "Sorry, I can't access your accounting data."}}]}
+
+
+@pytest.fixture
+def no_stream(monkeypatch):
+    def fail(payload):
+        raise AssertionError('balance questions must not be streamed')
+
+    monkeypatch.setattr(ai_assistant, '_openai_request_stream', fail)
+
+
+@pytest.fixture
+def acme(app):
+    customer = Customer(name='Acme Corp')
+    db.session.add(customer)
+    db.session.flush()
+    db.session.add(Invoice(number='INV-10', customer_id=customer.id, total=Decimal('125.50')))
+    db.session.commit()
+    return customer
+
+
+def test_stream_answers_balance_question_with_balance(app, user, acme, no_stream, monkeypatch):
+    monkeypatch.setattr(ai_assistant, '_openai_request', lambda payload: REFUSAL)
+
+    with app.test_request_context():
+        result = ai_assistant.run_assistant_stream('What is the balance for Acme Corp?', 'en', user)
+
+    assert isinstance(result, dict)
+    assert '$125.50' in result['speak']
+
+
+def test_stream_does_not_stream_balance_questions(app, user, no_stream, monkeypatch):
+    monkeypatch.setattr(ai_assistant, '_openai_request', lambda payload: REFUSAL)
+
+    with app.test_request_context():
+        result = ai_assistant.run_assistant_stream('show me all balances', 'en', user)
+        expected = ai_assistant.run_assistant('show me all balances', 'en', user)
+
+    assert isinstance(result, dict)
+    assert result == expected
+
+
+def test_tool_calls_run_in_model_order_and_report_skipped_actions(app, user, monkeypatch):
+    ran = []
+
+    def tool(label):
+        def handler(args, user, lang):
+            ran.append(label)
+            return {'speak': label}
+        return handler
+
+    monkeypatch.setitem(ai_assistant._TOOL_DISPATCH, 'open_section', tool('open'))
+    monkeypatch.setitem(ai_assistant._TOOL_DISPATCH, 'list_customers', tool('customers'))
+    calls = [
+        ('list_customers', '{}'),
+        ('open_section', '{"section": "invoices"}'),
+        ('create_customer', '{"name": "Acme"}'),
+        ('create_meeting', '{"title": "Kickoff"}'),
+    ]
+
+    with app.test_request_context():
+        result = ai_assistant._dispatch_tool_calls(calls, 'key', user, 'en')
+        pending = ai_assistant.session[ai_assistant._pending_key()]
+
+    assert ran == ['customers', 'open']
+    assert pending['name'] == 'create_customer'
+    assert result['speak'].startswith('customers open')
+    assert 'not run' in result['speak']
+
+
+def test_stream_runs_tool_calls_that_follow_text(app, user, monkeypatch):
+    def delta(**fields):
+        return {'choices': [{'delta': fields}]}
+
+    chunks = [
+        delta(content='Opening invoices.'),
+        delta(tool_calls=[{'index': 0, 'function': {'name': 'open_section', 'arguments': '{"sec'}}]),
+        delta(tool_calls=[{'index': 0, 'function': {'arguments': 'tion": "invoices"}'}}]),
+    ]
+    monkeypatch.setattr(ai_assistant, '_openai_request_stream', lambda payload: iter(chunks))
+    monkeypatch.setitem(
+        ai_assistant._TOOL_DISPATCH,
+        'open_section',
+        lambda args, user, lang: {'speak': 'Done.', 'redirect_url': '/' + args['section']},
+    )
+
+    with app.test_request_context():
+        items = list(ai_assistant.run_assistant_stream('where do I see what customers owe me?', 'en', user))
+
+    assert items == ['Opening invoices.', {'speak': 'Done.', 'redirect_url': '/invoices'}]
+
+
+def test_financial_answers_are_not_cached(app, user, acme):
+    with app.test_request_context():
+        ai_assistant._dispatch_tool_call('customer_balance', '{"customer_name": "Acme Corp"}', 'balance', user, 'en')
+        ai_assistant._dispatch_tool_call('open_section', '{"section": "invoices"}', 'section', user, 'en')
+
+        assert ai_assistant._response_cache_get('balance') is None
+        assert ai_assistant._response_cache_get('section')['redirect_url'].endswith('/invoices')
+
+
+@pytest.fixture
+def library_doc(app):
+    doc = LibraryDocument(title='Contract', original_filename='contract.pdf', stored_filename='contract.pdf')
+    db.session.add(doc)
+    db.session.commit()
+    return doc.id
+
+
+@pytest.mark.parametrize('first_error, expected_calls', [
+    (ConnectionRefusedError(), 2),
+    (smtplib.SMTPDataError(451, b'try later'), 1),
+])
+def test_library_email_retries_only_refused_connections(app, library_doc, monkeypatch, caplog, first_error, expected_calls):
+    calls = []
+
+    def send(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError('Email send failed') from first_error
+
+    monkeypatch.setattr(ai_assistant, 'send_email_with_attachments_sync', send)
+    monkeypatch.setattr(ai_assistant.time, 'sleep', lambda seconds: None)
+
+    with caplog.at_level(logging.ERROR):
+        ai_assistant._send_library_document_email(app, library_doc, 'to@example.com', 'Contract', 'Hi', '<p>Hi</p>', 'me@example.com')
+
+    assert len(calls) == expected_calls
+    assert ('failed after 1 attempt' in caplog.text) == (expected_calls == 1)
+
+
+@pytest.mark.parametrize('status, has_retry_after, retried', [
+    (429, True, True),
+    (503, True, True),
+    (429, False, False),
+    (503, False, False),
+    (500, True, False),
+    (502, False, False),
+    (413, True, False),
+])
+def test_openai_posts_are_retried_only_when_asked_to_back_off(status, has_retry_after, retried):
+    retry = ai_assistant._OPENAI_SESSION.get_adapter('https://api.openai.com').max_retries
+
+    assert retry.is_retry('POST', status, has_retry_after) is retried
+    assert retry.read == 0
+
+
+def test_email_invoice_saves_the_contact_email(app, user, acme, monkeypatch):
+    sent = []
+    monkeypatch.setattr(ai_assistant, 'send_email_with_attachments_sync', lambda **kwargs: sent.append(kwargs))
+    monkeypatch.setattr(ai_assistant, '_build_invoice_pdf', lambda invoice, items: b'%PDF')
+
+    with app.test_request_context():
+        result = ai_assistant._tool_email_invoice(
+            {'number_or_id': 'INV-10', 'to_email': 'billing@acme.test', 'confirm': True, 'save_contact': True},
+            user,
+            'en',
+        )
+
+    db.session.expire_all()
+    assert result['speak'] == 'Email sent.'
+    assert sent[0]['recipients'] == ['billing@acme.test']
+    assert db.session.get(Customer, acme.id).email == 'billing@acme.test'
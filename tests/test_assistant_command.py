@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize('text, lang, speak', [
+    ('ir a facturas vencidas', 'es', 'No tienes facturas vencidas.'),
+    ('abrir facturas', 'es', 'Abriendo facturas.'),
+    ('facturas', 'es', 'Abriendo facturas.'),
+    ('facturas', 'en', None),
+    ('open agenda', 'en', 'You have no meetings today.'),
+    ('go to invoices', 'en', 'Opening invoices.'),
+    ('show late invoices on the dashboard', 'en', 'You have no overdue invoices.'),
+    ('abrir panel de notificaciones', 'es', 'Abriendo notificaciones.'),
+])
+def test_local_intents_keep_their_priority(app, logged_in, text, lang, speak):
+    result = logged_in.post('/office/assistant/command', json={'text': text, 'lang': lang}).get_json()
+
+    if speak is None:
+        assert not result.get('redirect_url')
+    else:
+        assert result['speak'] == speak
@@ -0,0 +1,36 @@
+import pytest
+
+from app import db
+from app import choice_cache
+from app.models import Customer
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    choice_cache._choices.clear()
+    yield
+    choice_cache._choices.clear()
+
+
+def test_choices_are_cleared_after_commit(app):
+    assert choice_cache.customer_choices() == ()
+
+    db.session.add(Customer(name='Acme Corp'))
+    db.session.flush()
+    assert choice_cache.customer_choices() == ()
+
+    db.session.commit()
+    assert [name for _, name in choice_cache.customer_choices()] == ['Acme Corp']
+
+
+def test_rolled_back_changes_keep_the_cache(app):
+    db.session.add(Customer(name='Acme Corp'))
+    db.session.commit()
+    cached = choice_cache.customer_choices()
+
+    db.session.add(Customer(name='Globex'))
+    db.session.flush()
+    db.session.rollback()
+
+    assert choice_cache.customer_choices() is cached
+    assert choice_cache._STALE_KEYS not in db.session.info
@@ -0,0 +1,27 @@
+import base64
+from pathlib import Path
+
+import pytest
+
+from app.auth import email
+
+
+def test_path_attachment_mapping_is_closed_after_use(tmp_path):
+    path = tmp_path / 'invoice.pdf'
+    path.write_bytes(b'%PDF-1.4 test')
+
+    with email._attachment_data(path) as view:
+        assert bytes(view) == b'%PDF-1.4 test'
+
+    with pytest.raises(ValueError):
+        bytes(view)
+
+
+@pytest.mark.parametrize('size', [0, 1, email._ATTACHMENT_CHUNK_SIZE + 1])
+def test_chunked_base64_matches_whole_file(tmp_path, size):
+    data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    path = Path(tmp_path / 'doc.bin')
+    path.write_bytes(data)
+
+    assert email._ATTACHMENT_CHUNK_SIZE % 3 == 0
+    assert email._attachment_b64(path) == base64.b64encode(data).decode('ascii')
@@ -0,0 +1,60 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app import db
+from app.lazy_load_guard import NPlusOneError
+from app.models import Bill, Customer, Invoice, Payment, Quote, Vendor, VendorPayment
+
+
+@pytest.fixture
+def ledger(app):
+    customers = [Customer(name='Acme Corp'), Customer(name='Globex')]
+    vendors = [Vendor(name='Initech'), Vendor(name='Umbrella')]
+    db.session.add_all(customers + vendors)
+    db.session.flush()
+    for n, (customer, vendor) in enumerate(zip(customers, vendors), start=1):
+        invoice = Invoice(number=f'INV-{n}', customer_id=customer.id, date=date.today(), total=Decimal('100.00'))
+        bill = Bill(number=f'BILL-{n}', vendor_id=vendor.id, date=date.today(), total=Decimal('40.00'))
+        db.session.add_all([invoice, bill, Quote(number=f'Q-{n}', customer_id=customer.id, date=date.today())])
+        db.session.flush()
+        db.session.add(Payment(customer_id=customer.id, invoice_id=invoice.id, amount=Decimal('10.00'), date=date.today()))
+        db.session.add(VendorPayment(vendor_id=vendor.id, bill_id=bill.id, amount=Decimal('5.00'), date=date.today()))
+    db.session.commit()
+    # Start each request from an empty identity map, as a real request would
+    db.session.expunge_all()
+
+
+def test_guard_raises_on_repeated_lazy_load(app, ledger):
+    with app.test_request_context():
+        invoices = Invoice.query.order_by(Invoice.id).all()
+        assert invoices[0].customer.name == 'Acme Corp'
+        with pytest.raises(NPlusOneError):
+            invoices[1].customer
+
+
+
+def test_guard_ignores_core_dml(app, ledger):
+    with app.test_request_context():
+        db.session.execute(insert(Customer), [{'name': 'Hooli'}])
+        db.session.execute(update(Customer).where(Customer.name == 'Hooli').values(name='Hooli XYZ'))
+        db.session.execute(delete(Customer).where(Customer.name == 'Hooli XYZ'))
+        db.session.commit()
+
+    assert db.session.query(Customer).filter(Customer.name.like('Hooli%')).count() == 0
+
+
+@pytest.mark.parametrize('path', [
+    '/dashboard',
+    '/ar/invoices',
+    '/ar/quotes',
+    '/ar/payments',
+    '/ap/bills',
+    '/ap/payments',
+])
+def test_list_pages_do_not_lazy_load_per_row(logged_in, ledger, path):
+    db.session.expunge_all()
+    response = logged_in.get(path)
+    assert response.status_code == 200
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Meeting
+
+
+@pytest.fixture
+def meetings(app):
+    now = datetime.utcnow()
+    db.session.add_all([
+        Meeting(title='Old kickoff', start_at=now - timedelta(days=90)),
+        Meeting(title='Weekly sync', start_at=now - timedelta(days=2)),
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_meetings_default_to_the_recent_window(logged_in, meetings):
+    page = logged_in.get('/office/meetings').get_data(as_text=True)
+
+    assert 'Weekly sync' in page
+    assert 'Old kickoff' not in page
+    assert 'Show all meetings' in page
+
+
+@pytest.mark.parametrize('lookback', [0, 120])
+def test_meetings_lookback_reaches_older_meetings(logged_in, meetings, lookback):
+    page = logged_in.get(f'/office/meetings?lookback={lookback}').get_data(as_text=True)
+
+    assert 'Weekly sync' in page
+    assert 'Old kickoff' in page
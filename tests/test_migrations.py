@@ -0,0 +1,90 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+
+VERSIONS = Path(__file__).resolve().parent.parent / 'migrations' / 'versions'
+
+
+def _upgrade(conn, revision):
+    path = next(VERSIONS.glob(f'{revision}_*.py'))
+    spec = importlib.util.spec_from_file_location(f'migration_{revision}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with Operations.context(MigrationContext.configure(conn)):
+        module.upgrade()
+
+
+@pytest.fixture
+def conn():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as conn:
+        yield conn
+    engine.dispose()
+
+
+def test_7c8d_dedupes_notifications_before_the_unique_index(conn):
+    conn.exec_driver_sql(
+        'CREATE TABLE notification (id INTEGER PRIMARY KEY, user_id INTEGER, type VARCHAR(50), '
+        'ref_type VARCHAR(50), ref_id INTEGER, read_at DATETIME)'
+    )
+    conn.exec_driver_sql('CREATE INDEX ix_notification_user_ref ON notification (user_id, ref_type, ref_id, type)')
+    conn.exec_driver_sql(
+        "INSERT INTO notification (id, user_id, type, ref_type, ref_id) VALUES "
+        "(1, 1, 'invoice_overdue', 'invoice', 7), (2, 1, 'invoice_overdue', 'invoice', 7), "
+        "(3, 2, 'invoice_overdue', 'invoice', 7), (4, 1, 'note', NULL, NULL), (5, 1, 'note', NULL, NULL)"
+    )
+
+    _upgrade(conn, '7c8d9e0f1a2b')
+
+    assert [row.id for row in conn.execute(sa.text('SELECT id FROM notification ORDER BY id'))] == [1, 3, 4, 5]
+    indexes = {ix['name']: ix for ix in sa.inspect(conn).get_indexes('notification')}
+    assert indexes['ix_notification_user_ref']['unique']
+    assert 'ix_notification_user_unread' in indexes
+
+
+def _app_setting_table(conn, value_type='TEXT'):
+    conn.exec_driver_sql(
+        f'CREATE TABLE app_setting (id INTEGER PRIMARY KEY, key VARCHAR(80) UNIQUE, value {value_type}, updated_at DATETIME)'
+    )
+
+
+def _settings(conn):
+    return dict(conn.execute(sa.text('SELECT key, value FROM app_setting')).all())
+
+
+@pytest.mark.parametrize('stored, normalized', [
+    (' Yes ', '1'),
+    ('on', '1'),
+    ('TRUE', '1'),
+    ('1', '1'),
+    ('off', '0'),
+    ('', '0'),
+    (None, '0'),
+])
+def test_9a0b_normalizes_boolean_settings(conn, stored, normalized):
+    _app_setting_table(conn)
+    conn.execute(
+        sa.text('INSERT INTO app_setting (key, value) VALUES (:key, :value)'),
+        [{'key': 'show_marketing_landing', 'value': stored}, {'key': 'company_name', 'value': 'on'}],
+    )
+
+    _upgrade(conn, '9a0b1c2d3e4f')
+
+    assert _settings(conn) == {'show_marketing_landing': normalized, 'company_name': 'on'}
+
+
+@pytest.mark.parametrize('value_type', ['VARCHAR(200)', 'TEXT'])
+def test_de4f_leaves_app_setting_value_as_text(conn, value_type):
+    _app_setting_table(conn, value_type)
+    conn.execute(sa.text("INSERT INTO app_setting (key, value) VALUES ('invoice_important_note', :value)"), {'value': 'x' * 500})
+
+    _upgrade(conn, 'de4f50617283')
+
+    columns = {column['name']: column['type'] for column in sa.inspect(conn).get_columns('app_setting')}
+    assert isinstance(columns['value'], sa.Text)
+    assert _settings(conn) == {'invoice_important_note': 'x' * 500}
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from app import db
+from app.models import Invoice, Meeting, Notification, Payment
+from app.office.routes import _ensure_notifications, _keyset_page, _notification_insert
+
+
+def _notifications(user_id):
+    return sorted(
+        (n.type, n.ref_type, n.ref_id)
+        for n in Notification.query.filter_by(user_id=user_id)
+    )
+
+
+def test_ensure_notifications_creates_due_reminders_once(app, user):
+    now = datetime.utcnow()
+    soon = Meeting(title='Site visit', start_at=now + timedelta(minutes=30), reminder_minutes=60)
+    later = Meeting(title='Quarterly review', start_at=now + timedelta(days=3), reminder_minutes=60)
+    overdue = Invoice(number='INV-1', due_date=date.today() - timedelta(days=5), total=Decimal('100.00'))
+    paid = Invoice(number='INV-2', due_date=date.today() - timedelta(days=5), total=Decimal('50.00'))
+    db.session.add_all([soon, later, overdue, paid])
+    db.session.flush()
+    db.session.add(Payment(invoice_id=paid.id, amount=Decimal('50.00'), date=date.today()))
+    db.session.commit()
+
+    with app.test_request_context():
+        _ensure_notifications([user.id])
+        _ensure_notifications([user.id])
+
+    assert _notifications(user.id) == [
+        ('invoice_overdue', 'invoice', overdue.id),
+        ('meeting_reminder', 'meeting', soon.id),
+    ]
+
+
+def test_ensure_notifications_ignores_empty_user_list(app, user):
+    db.session.add(Invoice(number='INV-3', due_date=date.today() - timedelta(days=1), total=Decimal('10.00')))
+    db.session.commit()
+
+    with app.test_request_context():
+        _ensure_notifications([])
+
+    assert _notifications(user.id) == []
+
+
+def test_scheduler_command_runs_a_single_pass(app, user):
+    user_id = user.id
+    db.session.add(Invoice(number='INV-4', due_date=date.today() - timedelta(days=1), total=Decimal('10.00')))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['office', 'notification-scheduler', '--once'])
+
+    assert result.exit_code == 0, result.output
+    assert [t for t, _, _ in _notifications(user_id)] == ['invoice_overdue']
+    assert Notification.query.filter_by(user_id=user_id).one().link.endswith('/ar/invoice/1')
+    # The pass ran in its own app context, so the caller's session and objects survive
+    assert user.username == 'owner'
+
+
+def test_keyset_pages_reach_rows_without_created_at(app, user):
+    db.session.add_all([
+        Notification(user_id=user.id, type='note', ref_type='test', ref_id=i, created_at=datetime(2024, 1, 1 + i % 3))
+        for i in range(7)
+    ])
+    db.session.commit()
+    undated = [n.id for n in Notification.query.filter(Notification.ref_id < 3)]
+    Notification.query.filter(Notification.id.in_(undated)).update({'created_at': None}, synchronize_session=False)
+    db.session.commit()
+
+    seen = []
+    url = '/office/notifications'
+    while url:
+        with app.test_request_context(url):
+            rows, url, _ = _keyset_page(Notification.query.filter_by(user_id=user.id), Notification, per_page=2)
+        seen.extend(n.id for n in rows)
+
+    assert sorted(seen) == sorted(n.id for n in Notification.query)
+    assert seen[:len(undated)] == sorted(undated, reverse=True)
+
+
+def test_notification_insert_ignores_existing_refs(app, user):
+    row = {'user_id': user.id, 'type': 'invoice_overdue', 'ref_type': 'invoice', 'ref_id': 7, 'title': 'First'}
+    db.session.execute(_notification_insert(), [row])
+    db.session.execute(_notification_insert(), [{**row, 'title': 'Second'}, {**row, 'ref_id': 8}])
+    db.session.commit()
+
+    assert sorted((n.ref_id, n.title) for n in Notification.query) == [(7, 'First'), (8, 'First')]
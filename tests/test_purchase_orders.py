@@ -0,0 +1,87 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import PurchaseOrder, PurchaseOrderItem, Vendor
+from app.purchase_orders import routes
+
+
+def _item(description='', quantity='', unit_price=''):
+    return {'description': description, 'quantity': quantity, 'unit_price': unit_price}
+
+
+def test_collect_items_skips_blank_rows_and_rounds_amounts():
+    rows, subtotal = routes._collect_items([_item('Paper', '3', '1.255'), _item(), _item('Ink', '1', '10')])
+
+    assert [row['description'] for row in rows] == ['Paper', 'Ink']
+    assert rows[0]['amount'] == Decimal('3.77')
+    assert subtotal == Decimal('13.77')
+
+
+@pytest.mark.parametrize('items, message', [
+    ([_item()], 'at least one'),
+    ([_item('Paper', '', '1')], 'quantity'),
+    ([_item('Paper', '0', '1')], 'at least 0.01'),
+    ([_item('', '1', '1')], 'description'),
+    ([_item('Paper', '1', 'abc')], 'must be a number'),
+    ([_item('Paper', '1', '1')] * (routes._ITEM_ROWS_MAX + 1), 'at most'),
+])
+def test_collect_items_rejects_invalid_rows(items, message):
+    with pytest.raises(ValueError, match=message):
+        routes._collect_items(items)
+
+
+def test_submitted_items_pads_short_columns(app):
+    data = {'item_description': ['Paper', 'Ink'], 'item_quantity': ['2'], 'item_unit_price': ['1', '5']}
+    with app.test_request_context(method='POST', data=data):
+        assert routes._submitted_items() == [_item('Paper', '2', '1'), _item('Ink', '', '5')]
+
+
+@pytest.fixture
+def purchase_order(app):
+    vendor = Vendor(name='Paper Co')
+    po = PurchaseOrder(
+        number='0001',
+        po_type='vendor',
+        date=date(2024, 1, 2),
+        vendor=vendor,
+        status='draft',
+        items=[PurchaseOrderItem(description='Old', quantity=1, unit_price=2, amount=2)],
+    )
+    db.session.add(po)
+    db.session.commit()
+    ids = po.id, vendor.id
+    db.session.expunge_all()
+    return ids
+
+
+def test_edit_replaces_items(logged_in, purchase_order):
+    po_id, vendor_id = purchase_order
+    response = logged_in.post(f'/po/purchase-order/{po_id}/edit', data={
+        'po_type': 'vendor',
+        'date': '2024-01-03',
+        'vendor_id': vendor_id,
+        'customer_id': 0,
+        'status': 'sent',
+        'item_description': ['Paper', 'Ink'],
+        'item_quantity': ['2', '1'],
+        'item_unit_price': ['1.50', '4'],
+    })
+
+    assert response.status_code == 302
+    db.session.expunge_all()
+    items = db.session.query(PurchaseOrderItem).order_by(PurchaseOrderItem.id).all()
+    assert [(i.purchase_order_id, i.description) for i in items] == [(po_id, 'Paper'), (po_id, 'Ink')]
+    assert db.session.get(PurchaseOrder, po_id).total == Decimal('7.00')
+
+
+def test_delete_removes_items(logged_in, purchase_order):
+    po_id, _ = purchase_order
+    response = logged_in.post(f'/po/purchase-order/{po_id}/delete')
+
+    assert response.status_code == 302
+    db.session.expunge_all()
+    assert db.session.get(PurchaseOrder, po_id) is None
+    assert db.session.query(PurchaseOrderItem).count() == 0
@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+from app import db
+from app.models import Customer, Invoice
+
+
+def test_ar_aging_shows_invoices_committed_after_the_first_view(app, logged_in):
+    assert logged_in.get('/reports/ar-aging').status_code == 200
+
+    customer = Customer(name='Acme Corp')
+    db.session.add(customer)
+    db.session.flush()
+    db.session.add(Invoice(number='INV-1', customer_id=customer.id, total=Decimal('80.00')))
+    db.session.commit()
+    # Expire, not expunge: the fixture's app context is shared, so Flask-Login's cached
+    # current_user must stay attached for the next request
+    db.session.expire_all()
+
+    response = logged_in.get('/reports/ar-aging')
+    assert b'Acme Corp' in response.data
@@ -0,0 +1,72 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db, seed
+from app.models import AppSetting, User
+
+
+def _settings():
+    return {row.key: row.value for row in db.session.query(AppSetting)}
+
+
+def test_company_settings_seed_missing_keys_once(app, monkeypatch):
+    monkeypatch.setenv('COMPANY_NAME', 'Acme Corp')
+    db.session.add(AppSetting(key='company_logo_path', value='static/img/logo.jpg'))
+    db.session.commit()
+
+    seed.ensure_company_settings()
+    db.session.commit()
+    first = _settings()
+    seed.ensure_company_settings()
+    db.session.commit()
+
+    assert first['company_name'] == 'Acme Corp'
+    assert first['company_logo_path'] == 'static/img/logo.png'
+    assert set(first) == {key for key, _, _ in seed._COMPANY_SETTING_SPECS}
+    assert _settings() == first
+
+
+
+def test_company_settings_steady_state_opens_no_savepoint(app, monkeypatch):
+    seed.ensure_company_settings()
+    db.session.commit()
+
+    def fail():
+        raise AssertionError('nothing to write, so no SAVEPOINT either')
+
+    monkeypatch.setattr(db.session, 'begin_nested', fail)
+    seed.ensure_company_settings()
+
+def test_company_settings_failure_keeps_owner_user(app, monkeypatch, caplog):
+    monkeypatch.setattr(seed, '_app_setting_insert_missing', lambda: text('INSERT INTO no_such_table VALUES (:key)'))
+
+    seed.ensure_owner_user()
+    with caplog.at_level(logging.ERROR):
+        seed.ensure_company_settings()
+    db.session.commit()
+
+    assert 'Failed to seed company settings' in caplog.text
+    assert db.session.query(User).filter_by(username='admin', is_admin=True).count() == 1
+    assert _settings() == {}
+
+
+def test_company_settings_are_stamped_in_utc(app):
+    before = datetime.utcnow() - timedelta(seconds=1)
+    seed.ensure_company_settings()
+    db.session.commit()
+
+    stamps = [row.updated_at for row in db.session.query(AppSetting)]
+    assert stamps and all(before <= stamp <= datetime.utcnow() for stamp in stamps)
+
+
+def test_company_settings_programming_errors_propagate(app, monkeypatch):
+    def broken():
+        raise TypeError('bad statement')
+
+    monkeypatch.setattr(seed, '_app_setting_insert_missing', broken)
+
+    with pytest.raises(TypeError):
+        seed.ensure_company_settings()